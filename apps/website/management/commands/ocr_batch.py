@@ -0,0 +1,242 @@
+"""
+Пакетное распознавание сканов СТС: каталог или манифест → JSONL.
+
+Файлы распознаются ограниченным пулом потоков, результат parse_sts
+пишется построчно в JSONL. Повторный запуск с тем же --output пропускает
+уже обработанные файлы.
+
+Запросы к Vision проходят через общий лимит OCR_RATE_LIMIT
+(ocr/ratelimit.py) — тот же, что у веб-воркеров. --rate заменяет его
+скорость для запросов команды; ведро остаётся общим, так что загрузки
+с сайта и пакет делят одну квоту. Отдельного лимита у команды нет.
+
+Примеры:
+    python manage.py ocr_batch /data/sts --output sts.jsonl
+    python manage.py ocr_batch manifest.txt -o sts.jsonl --workers 8 --rate 5
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.website.ocr import (
+    VisionBusyError,
+    get_ocr_backends,
+    mime_from_filename,
+    parse_sts_cached,
+    recognize_text,
+)
+from apps.website.ocr.ratelimit import TokenBucket
+from apps.website.ocr.timing import percentile, stage, stage_stats
+from apps.website.ocr.yandex_vision import get_resilient_caller
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.pdf'}
+
+
+class Command(BaseCommand):
+    """Распознаёт сканы СТС пачкой и пишет результат в JSONL."""
+
+    help = (
+        'Пакетный OCR СТС: каталог или манифест (по пути на строку) → JSONL '
+        'с полями parse_sts и временем на файл. Повторный запуск '
+        'продолжает с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='Каталог со сканами или файл-манифест (путь на строку)',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            required=True,
+            help='JSONL-файл результатов (дописывается)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Параллельных запросов OCR (по умолчанию 4)',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=None,
+            help='Запросов в секунду к Vision вместо OCR_RATE_LIMIT '
+                 '(ведро общее с сайтом), 0 — без ограничения',
+        )
+        parser.add_argument(
+            '--recursive', action='store_true',
+            help='Искать сканы в подкаталогах',
+        )
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Повторить файлы, завершившиеся ошибкой в прошлый раз',
+        )
+
+    def handle(self, *args, **options):
+        if not get_ocr_backends():
+            raise CommandError(
+                'OCR недоступен: настройте YANDEX_VISION_API_KEY '
+                'и YANDEX_FOLDER_ID или OCR_BACKENDS',
+            )
+        paths = self._collect(Path(options['source']), options['recursive'])
+        output = Path(options['output'])
+        done = self._already_done(output, options['retry_failed'])
+        todo = [p for p in paths if str(p) not in done]
+        self.stdout.write(
+            f'Файлов: {len(paths)}, уже обработано: {len(paths) - len(todo)}, '
+            f'в работе: {len(todo)}',
+        )
+        if not todo:
+            return
+
+        workers = max(options['workers'], 1)
+        if options['rate'] is not None:
+            rate = options['rate']
+            get_resilient_caller().limiter = (
+                TokenBucket(rate) if rate > 0 else None
+            )
+        write_lock = threading.Lock()
+        # Не больше 2×workers файлов в очереди пула — манифест может быть
+        # на десятки тысяч строк
+        in_flight = threading.BoundedSemaphore(workers * 2)
+        results: list[dict] = []
+        started = time.monotonic()
+
+        def run(path: Path) -> None:
+            try:
+                record = self._process(path)
+                with write_lock:
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    out.flush()
+                    results.append(record)
+                    self._progress(record, len(results), len(todo))
+            finally:
+                in_flight.release()
+
+        with output.open('a', encoding='utf-8') as out, ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='ocr-batch',
+        ) as pool:
+            try:
+                for path in todo:
+                    in_flight.acquire()
+                    pool.submit(run, path)
+            except KeyboardInterrupt:
+                self.stderr.write('Прервано: дожидаемся запущенных файлов…')
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        self._report(results, time.monotonic() - started)
+
+    def _collect(self, source: Path, recursive: bool) -> list[Path]:
+        """Список сканов из каталога или манифеста."""
+        if source.is_dir():
+            pattern = '**/*' if recursive else '*'
+            return sorted(
+                p for p in source.glob(pattern)
+                if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES
+            )
+        if not source.is_file():
+            raise CommandError(f'Не найден каталог или манифест: {source}')
+        paths = []
+        for line in source.read_text(encoding='utf-8').splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            path = Path(line)
+            if not path.is_absolute():
+                path = source.parent / path
+            paths.append(path)
+        return paths
+
+    def _already_done(self, output: Path, retry_failed: bool) -> set[str]:
+        """Пути, уже записанные в JSONL прошлым запуском."""
+        done: set[str] = set()
+        if not output.exists():
+            return done
+        with output.open(encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Оборванная последняя строка после прерывания
+                    continue
+                if retry_failed and record.get('status') != 'ok':
+                    continue
+                done.add(record.get('path', ''))
+        return done
+
+    def _process(self, path: Path) -> dict:
+        """OCR + парсинг одного файла с замером времени."""
+        record = {'path': str(path), 'status': 'error', 'data': {}}
+        t0 = time.monotonic()
+        waited = 0.0
+        try:
+            with path.open('rb') as image:
+                while True:
+                    t1 = time.monotonic()
+                    try:
+                        ta, err = recognize_text(
+                            image, mime_from_filename(path.name),
+                        )
+                        break
+                    except VisionBusyError as exc:
+                        # Общий лимит занят сайтом — пакет подождёт
+                        time.sleep(exc.retry_after)
+                        waited += time.monotonic() - t1
+                t2 = time.monotonic()
+            record['ocr_ms'] = round((t2 - t1) * 1000, 1)
+            record['wait_ms'] = round(waited * 1000, 1)
+            if ta is None:
+                record['error'] = err or 'Не удалось распознать документ'
+            else:
+                with stage('parse'):
+                    record['data'] = parse_sts_cached(ta)
+                record['parse_ms'] = round((time.monotonic() - t2) * 1000, 1)
+                record['status'] = 'ok'
+        except Exception as exc:
+            record['error'] = str(exc)
+        record['total_ms'] = round((time.monotonic() - t0) * 1000, 1)
+        return record
+
+    def _progress(self, record: dict, done: int, total: int) -> None:
+        if record['status'] == 'ok':
+            vin = record['data'].get('vehicle_vin') or '—'
+            msg = f'ok  VIN {vin}'
+        else:
+            msg = f'ERR {record.get("error", "")[:80]}'
+        self.stdout.write(
+            f'[{done}/{total}] {Path(record["path"]).name}: {msg} '
+            f'({record["total_ms"]:.0f} мс)',
+        )
+
+    def _report(self, results: list[dict], elapsed: float) -> None:
+        """Итог: пропускная способность и перцентили задержки."""
+        ok = sum(1 for r in results if r['status'] == 'ok')
+        ocr_ms = sorted(r['ocr_ms'] for r in results if 'ocr_ms' in r)
+        total_ms = sorted(r['total_ms'] for r in results)
+        self.stdout.write('')
+        self.stdout.write(
+            f'Обработано: {len(results)} (успешно {ok}, ошибок '
+            f'{len(results) - ok}) за {elapsed:.1f} с — '
+            f'{len(results) / elapsed if elapsed else 0:.2f} файл/с',
+        )
+        for title, values in (('OCR', ocr_ms), ('Всего', total_ms)):
+            if not values:
+                continue
+            self.stdout.write(
+                f'{title}, мс: p50 {percentile(values, 50):.0f}, '
+                f'p90 {percentile(values, 90):.0f}, '
+                f'p99 {percentile(values, 99):.0f}, '
+                f'max {values[-1]:.0f}',
+            )
+        # Этапы внутри OCR и разбора (ocr/timing.py): выборка процесса
+        stages = stage_stats()
+        if stages:
+            self.stdout.write('По этапам, мс:')
+        for name, row in stages.items():
+            self.stdout.write(
+                f'  {name}: p50 {row["p50_ms"]:.1f}, '
+                f'p90 {row["p90_ms"]:.1f}, p99 {row["p99_ms"]:.1f} '
+                f'(замеров {row["count"]})',
+            )
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,121 @@
+"""
+Повторный разбор архива ответов OCR СТС: JSONL → JSONL.
+
+Каждая строка входа — ответ Vision ({"result": {"textAnnotation": ...}}),
+запись с ключом "textAnnotation" (scripts/gen_synthetic_sts.py) или
+голый textAnnotation. Строки разбираются пулом процессов
+(parse_sts_many) в исходном порядке; на выходе по строке на каждую
+непустую строку входа: {"line", "status", "data"} или {"line", "status",
+"error"}, где line — номер строки во входном файле (пустые строки
+пропускаются, но учитываются в нумерации).
+
+Примеры:
+    python manage.py reparse_sts archive.jsonl -o parsed.jsonl
+    python manage.py reparse_sts archive.jsonl -o - --workers 8 | jq .data
+    python manage.py reparse_sts archive.jsonl -o vins.jsonl --fields vehicle_vin
+"""
+import json
+import sys
+from collections import deque
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.website.ocr.bulk import DEFAULT_CHUNKSIZE, ParseStats, parse_sts_many
+from apps.website.ocr.sts_parser import FIELDS
+
+# Прогресс в stderr каждые столько документов
+PROGRESS_EVERY = 10000
+
+
+class Command(BaseCommand):
+    """Разбирает заново архив textAnnotation текущей версией парсера."""
+
+    help = (
+        'Повторный parse_sts по архиву ответов OCR (JSONL) пулом процессов; '
+        'результат — JSONL в том же порядке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            help='JSONL с ответами OCR («-» — stdin)',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            required=True,
+            help='JSONL-файл результатов («-» — stdout)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Процессов разбора (по умолчанию — число ядер)',
+        )
+        parser.add_argument(
+            '--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+            help=f'Документов в порции процесса (по умолчанию '
+                 f'{DEFAULT_CHUNKSIZE})',
+        )
+        parser.add_argument(
+            '--fields',
+            help=f'Только эти поля через запятую (из: {", ".join(FIELDS)})',
+        )
+
+    def handle(self, *args, **options):
+        fields = None
+        if options['fields']:
+            fields = [f.strip() for f in options['fields'].split(',')]
+            unknown = set(fields).difference(FIELDS)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные поля: {", ".join(sorted(unknown))}',
+                )
+        source = self._open(options['input'], 'r', sys.stdin)
+        out = self._open(options['output'], 'w', sys.stdout)
+        stats = ParseStats()
+        # Номера непустых строк входа в порядке результатов: parse_sts_many
+        # читает вход с опережением, результат забирает свой номер слева
+        line_numbers: deque[int] = deque()
+
+        def numbered_lines():
+            for line_no, line in enumerate(source, 1):
+                if line.strip():
+                    line_numbers.append(line_no)
+                    yield line
+
+        try:
+            # Строки уходят в пул как есть — json.loads делают процессы пула
+            results = parse_sts_many(
+                numbered_lines(),
+                workers=options['workers'],
+                chunksize=options['chunksize'],
+                stats=stats,
+                fields=fields,
+            )
+            for done, (data, err) in enumerate(results, 1):
+                record = {'line': line_numbers.popleft()}
+                if err is None:
+                    record.update(status='ok', data=data)
+                else:
+                    record.update(status='error', error=err)
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                if done % PROGRESS_EVERY == 0:
+                    self.stderr.write(
+                        f'{done} документов, {stats.docs_per_s:.0f} док/с',
+                    )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if out is not sys.stdout:
+                out.close()
+
+        self.stderr.write(
+            f'Документов: {stats.documents}, ошибок: {stats.errors}, '
+            f'{stats.elapsed:.1f} с — {stats.docs_per_s:.0f} док/с',
+        )
+
+    def _open(self, path: str, mode: str, std):
+        if path == '-':
+            return std
+        try:
+            return open(path, mode, encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f'Не удалось открыть {path}: {exc}')
@@ -1,14 +1,34 @@
 """
 Модуль OCR для распознавания данных из документов СТС/ПТС.
 
-Yandex Vision OCR API → локальный парсер (sts_parser.py).
-Время: 1–3 секунды.
+Бэкенд OCR (Yandex Vision API или локальный Tesseract, см. backends.py)
+→ локальный парсер (sts_parser.py). Время: 1–3 секунды.
 """
 from .yandex_vision import recognize_document, mime_from_filename
-from .sts_parser import parse_sts
+from .backends import OCRBackend, get_ocr_backends, recognize_text
+from .errors import VisionBusyError
+from .sts_parser import (
+    FIELDS,
+    PARSER_VERSION,
+    ParseReport,
+    STSFields,
+    parse_sts,
+)
+from .memo import parse_sts_cached
+from .bulk import parse_sts_many
 
 __all__ = (
     'recognize_document',
     'mime_from_filename',
+    'OCRBackend',
+    'get_ocr_backends',
+    'recognize_text',
+    'VisionBusyError',
+    'FIELDS',
+    'PARSER_VERSION',
+    'ParseReport',
+    'STSFields',
     'parse_sts',
+    'parse_sts_cached',
+    'parse_sts_many',
 )
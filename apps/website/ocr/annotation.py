@@ -0,0 +1,115 @@
+"""
+Разбор ответа Vision OCR: только то, что читает парсер СТС.
+
+Ответ Vision на плотный документ — сотни килобайт JSON: кроме строк
+в нём слова, символы, textSegments, языки, таблицы и markdown. parse_sts
+читает из textAnnotation лишь fullText, entities, размеры страницы
+и текст с boundingBox строк (см. layout.LineLayout).
+
+decode_response() разбирает тело ответа быстрым orjson, если он
+установлен (иначе — стандартный json), и сразу отбрасывает остальное:
+в памяти процесса и в кэше OCR (cache.py) остаётся компактный
+textAnnotation той же формы, который парсер принимает как есть.
+
+orjson — необязательная зависимость: без него разбор медленнее,
+но результат тот же.
+"""
+import json
+from typing import Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover — orjson не установлен
+    orjson = None
+
+
+def loads(data: Union[bytes, str]) -> object:
+    """
+    JSON → объекты Python: orjson, если установлен, иначе json.
+
+    Raises:
+        ValueError: Некорректный JSON (orjson.JSONDecodeError
+            и json.JSONDecodeError — подклассы ValueError).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def compact_annotation(ta: dict) -> dict:
+    """
+    textAnnotation только с полями, нужными парсеру.
+
+    Остаются width, height, fullText, entities (name, text) и блоки
+    со строками: text и boundingBox.vertices. Слова, символы,
+    textSegments, таблицы и markdown отбрасываются, пустые строки —
+    тоже (парсер их всё равно пропускает).
+
+    Args:
+        ta: textAnnotation из ответа Vision OCR.
+
+    Returns:
+        Новый словарь той же формы, что и textAnnotation.
+    """
+    blocks = []
+    for block in ta.get("blocks", ()):
+        lines = [
+            {
+                "text": line["text"],
+                "boundingBox": {
+                    "vertices": line.get("boundingBox", {}).get(
+                        "vertices", [],
+                    ),
+                },
+            }
+            for line in block.get("lines", ())
+            if line.get("text", "").strip()
+        ]
+        if lines:
+            blocks.append({"lines": lines})
+    compact = {
+        "fullText": ta.get("fullText", ""),
+        "entities": [
+            {"name": e.get("name", ""), "text": e.get("text", "")}
+            for e in ta.get("entities", ())
+        ],
+        "blocks": blocks,
+    }
+    for key in ("width", "height"):
+        if key in ta:
+            compact[key] = ta[key]
+    return compact
+
+
+def extract_annotation(data: object) -> Optional[dict]:
+    """textAnnotation из ответа Vision ({"result": {...}} или без него)."""
+    if not isinstance(data, dict):
+        return None
+    result = data.get("result")
+    ta = (
+        result.get("textAnnotation") if isinstance(result, dict) else None
+    ) or data.get("textAnnotation")
+    return ta if isinstance(ta, dict) else None
+
+
+def decode_response(
+    body: Union[bytes, str],
+    compact: bool = True,
+) -> Optional[dict]:
+    """
+    Тело ответа Vision → textAnnotation.
+
+    Args:
+        body: Тело HTTP-ответа.
+        compact: Оставить только поля парсера (compact_annotation).
+
+    Returns:
+        textAnnotation или None, если его нет в ответе.
+
+    Raises:
+        ValueError: Тело — не JSON.
+    """
+    ta = extract_annotation(loads(body))
+    if ta is None or not compact:
+        return ta
+    return compact_annotation(ta)
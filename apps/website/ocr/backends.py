@@ -0,0 +1,347 @@
+"""
+Бэкенды OCR: Yandex Vision и локальный Tesseract.
+
+Каждый бэкенд возвращает textAnnotation в формате Vision (blocks → lines
+с boundingBox, fullText), который понимает parse_sts(). Бэкенды задаются
+настройкой OCR_BACKENDS (например ["yandex", "tesseract"]) и работают
+цепочкой: если первый недоступен или вернул ошибку, пробуется следующий.
+Так OCR продолжает работать, когда Vision лежит или кончилась квота.
+
+pytesseract и Pillow — необязательные зависимости (плюс бинарник
+tesseract с языком rus); без них Tesseract-бэкенд считается недоступным.
+"""
+import io
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from .conf import ocr_setting
+from .errors import VisionBusyError
+from .streaming import ImageSource, rewind
+from .yandex_vision import recognize_document
+
+try:
+    import pytesseract
+except ImportError:  # pragma: no cover — pytesseract не установлен
+    pytesseract = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover — Pillow не установлен
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKENDS = ("yandex",)
+DEFAULT_TESSERACT_LANG = "rus+eng"
+
+# Слова с уверенностью ниже порога (0–100) Tesseract'а отбрасываются
+_TESSERACT_MIN_CONF = 30
+
+
+class OCRBackend(ABC):
+    """
+    Интерфейс бэкенда OCR.
+
+    Подклассы задают name и реализуют available() и recognize().
+    Экземпляры создаются один раз на процесс (get_ocr_backends)
+    и вызываются из разных потоков — состояние запроса в них не хранить.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def available(self) -> bool:
+        """True, если бэкенд настроен и его зависимости установлены."""
+
+    @abstractmethod
+    def recognize(
+        self,
+        image: ImageSource,
+        mime_type: str = "JPEG",
+    ) -> tuple[Optional[dict], Optional[str]]:
+        """
+        Распознаёт текст на изображении.
+
+        Args:
+            image: Байты изображения или файловый объект (читается с начала).
+            mime_type: "JPEG", "PNG" или "PDF".
+
+        Returns:
+            (text_annotation_dict, error_message) — ровно одно из полей None.
+        """
+
+
+class YandexVisionBackend(OCRBackend):
+    """Yandex Vision OCR (кэш, предобработка, повторы — см. yandex_vision)."""
+
+    name = "yandex"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        folder_id: Optional[str] = None,
+    ):
+        if api_key is None:
+            api_key = ocr_setting("YANDEX_VISION_API_KEY", "") or ""
+        if folder_id is None:
+            folder_id = ocr_setting("YANDEX_FOLDER_ID", "") or ""
+        self.api_key = api_key
+        self.folder_id = folder_id
+
+    def available(self) -> bool:
+        return bool(self.api_key and self.folder_id)
+
+    def recognize(self, image, mime_type="JPEG"):
+        return recognize_document(
+            image, self.api_key, self.folder_id, mime_type,
+        )
+
+
+class TesseractBackend(OCRBackend):
+    """
+    Локальный Tesseract: без сети, но заметно хуже Vision на фото СТС.
+
+    Слова Tesseract (image_to_data) группируются в строки и блоки
+    с boundingBox в формате Vision. PDF не поддерживается.
+    """
+
+    name = "tesseract"
+
+    def __init__(self, lang: Optional[str] = None):
+        if lang is None:
+            lang = ocr_setting("OCR_TESSERACT_LANG", DEFAULT_TESSERACT_LANG)
+        self.lang = lang
+        _configure_tesseract()
+
+    def available(self) -> bool:
+        return pytesseract is not None and Image is not None
+
+    def recognize(self, image, mime_type="JPEG"):
+        if mime_type == "PDF":
+            return (None, "Tesseract OCR: PDF не поддерживается")
+        try:
+            data = self._image_to_data(image)
+        except Exception as exc:
+            logger.warning("Tesseract OCR failed: %s", exc)
+            return (None, f"Tesseract OCR: {exc}")
+        finally:
+            rewind(image)
+        ta = tesseract_to_text_annotation(data)
+        if not ta["fullText"]:
+            return (None, "Tesseract OCR: текст не найден")
+        return (ta, None)
+
+    def _image_to_data(self, image: ImageSource) -> dict:
+        """Запускает tesseract и возвращает словарь image_to_data."""
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            fp = io.BytesIO(image)
+        else:
+            image.seek(0)
+            fp = image
+        with Image.open(fp) as img:
+            img = ImageOps.exif_transpose(img).convert("L")
+            return pytesseract.image_to_data(
+                img,
+                lang=self.lang,
+                output_type=pytesseract.Output.DICT,
+            )
+
+
+_tesseract_configured = False
+_tesseract_lock = threading.Lock()
+
+
+def _configure_tesseract() -> None:
+    """
+    Путь к бинарнику из OCR_TESSERACT_CMD — один раз на процесс.
+
+    tesseract_cmd — глобальная переменная pytesseract, её читают все
+    потоки, поэтому она не переписывается при каждом создании бэкенда.
+    """
+    global _tesseract_configured
+    if _tesseract_configured or pytesseract is None:
+        return
+    with _tesseract_lock:
+        if not _tesseract_configured:
+            cmd = ocr_setting("OCR_TESSERACT_CMD", "")
+            if cmd:
+                pytesseract.pytesseract.tesseract_cmd = cmd
+            _tesseract_configured = True
+
+
+def tesseract_to_text_annotation(data: dict) -> dict:
+    """
+    Переводит вывод pytesseract.image_to_data в textAnnotation Vision.
+
+    Args:
+        data: Словарь image_to_data (output_type=Output.DICT): списки
+            block_num, par_num, line_num, left, top, width, height,
+            conf, text.
+
+    Returns:
+        {"width", "height", "blocks": [{"boundingBox", "lines": [{"text",
+        "boundingBox", "words"}]}], "fullText"}.
+    """
+    blocks: dict[int, dict[tuple[int, int], list[dict]]] = {}
+    page_w = page_h = 0
+    for i, text in enumerate(data.get("text", [])):
+        left, top = int(data["left"][i]), int(data["top"][i])
+        right = left + int(data["width"][i])
+        bottom = top + int(data["height"][i])
+        page_w, page_h = max(page_w, right), max(page_h, bottom)
+        text = (text or "").strip()
+        if not text or float(data["conf"][i]) < _TESSERACT_MIN_CONF:
+            continue
+        line_key = (int(data["par_num"][i]), int(data["line_num"][i]))
+        blocks.setdefault(int(data["block_num"][i]), {}).setdefault(
+            line_key, [],
+        ).append({
+            "text": text,
+            "boundingBox": _bbox(left, top, right, bottom),
+        })
+
+    out_blocks = []
+    full_lines = []
+    for block_num in sorted(blocks):
+        lines = []
+        for line_key in sorted(blocks[block_num]):
+            words = blocks[block_num][line_key]
+            line_text = " ".join(w["text"] for w in words)
+            lines.append({
+                "text": line_text,
+                "boundingBox": _merge_bboxes(w["boundingBox"] for w in words),
+                "words": words,
+            })
+            full_lines.append(line_text)
+        out_blocks.append({
+            "boundingBox": _merge_bboxes(ln["boundingBox"] for ln in lines),
+            "lines": lines,
+        })
+    return {
+        "width": str(page_w),
+        "height": str(page_h),
+        "blocks": out_blocks,
+        "fullText": "\n".join(full_lines),
+    }
+
+
+def _bbox(left: int, top: int, right: int, bottom: int) -> dict:
+    """boundingBox Vision: четыре вершины, координаты строками."""
+    return {"vertices": [
+        {"x": str(left), "y": str(top)},
+        {"x": str(left), "y": str(bottom)},
+        {"x": str(right), "y": str(bottom)},
+        {"x": str(right), "y": str(top)},
+    ]}
+
+
+def _merge_bboxes(boxes) -> dict:
+    """Охватывающий прямоугольник нескольких boundingBox."""
+    xs: list[int] = []
+    ys: list[int] = []
+    for box in boxes:
+        for v in box["vertices"]:
+            xs.append(int(v["x"]))
+            ys.append(int(v["y"]))
+    return _bbox(min(xs), min(ys), max(xs), max(ys))
+
+
+_BACKEND_CLASSES: dict[str, type[OCRBackend]] = {
+    YandexVisionBackend.name: YandexVisionBackend,
+    TesseractBackend.name: TesseractBackend,
+}
+
+
+_backends: dict[tuple[str, ...], list[OCRBackend]] = {}
+_backends_lock = threading.Lock()
+
+
+def get_ocr_backends(names=None) -> list[OCRBackend]:
+    """
+    Возвращает доступные бэкенды в порядке цепочки.
+
+    Цепочка собирается один раз на процесс для каждого набора имён
+    (настройки и установленные зависимости за время жизни процесса
+    не меняются); вызывающий получает копию списка.
+
+    Args:
+        names: Имена бэкендов; по умолчанию — настройка OCR_BACKENDS.
+
+    Returns:
+        Список бэкендов, у которых available() == True.
+    """
+    if names is None:
+        names = ocr_setting("OCR_BACKENDS", DEFAULT_BACKENDS)
+    key = tuple(name.strip().lower() for name in names)
+    backends = _backends.get(key)
+    if backends is None:
+        with _backends_lock:
+            backends = _backends.get(key)
+            if backends is None:
+                backends = _backends[key] = _build_backends(key)
+    return list(backends)
+
+
+def _build_backends(names: tuple[str, ...]) -> list[OCRBackend]:
+    """Создаёт бэкенды по именам и оставляет доступные."""
+    backends = []
+    for name in names:
+        cls = _BACKEND_CLASSES.get(name)
+        if cls is None:
+            logger.warning("Unknown OCR backend: %r", name)
+            continue
+        backend = cls()
+        if backend.available():
+            backends.append(backend)
+    return backends
+
+
+def recognize_text(
+    image: ImageSource,
+    mime_type: str = "JPEG",
+    backends: Optional[list[OCRBackend]] = None,
+) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Распознаёт изображение первым сработавшим бэкендом цепочки.
+
+    Args:
+        image: Байты изображения или файловый объект.
+        mime_type: "JPEG", "PNG" или "PDF".
+        backends: Цепочка бэкендов (по умолчанию get_ocr_backends()).
+
+    Returns:
+        (text_annotation_dict, error_message) — при неудаче всех бэкендов
+        возвращается ошибка первого из них.
+
+    Raises:
+        VisionBusyError: Лимит запросов Vision исчерпан, а остальные
+            бэкенды цепочки не справились.
+    """
+    if backends is None:
+        backends = get_ocr_backends()
+    if not backends:
+        return (None, "OCR недоступен: нет настроенных бэкендов")
+    first_err: Optional[str] = None
+    busy: Optional[VisionBusyError] = None
+    for backend in backends:
+        rewind(image)
+        try:
+            ta, err = backend.recognize(image, mime_type)
+        except VisionBusyError as exc:
+            # Лимит запросов — пробуем следующий бэкенд цепочки
+            logger.info("OCR backend %s busy: %s", backend.name, exc)
+            busy = busy or exc
+            continue
+        if ta is not None:
+            if first_err is not None:
+                logger.info("OCR fallback: recognized by %s", backend.name)
+            return (ta, None)
+        logger.warning("OCR backend %s failed: %s", backend.name, err)
+        if first_err is None:
+            first_err = err
+    if busy is not None:
+        raise busy
+    return (None, first_err)
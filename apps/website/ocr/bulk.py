@@ -0,0 +1,184 @@
+"""
+Пакетный разбор сохранённых ответов OCR: parse_sts_many().
+
+После каждого улучшения парсера весь накопленный архив textAnnotation
+нужно разобрать заново. parse_sts в цикле занимает одно ядро;
+parse_sts_many раздаёт документы пулу процессов порциями (chunksize),
+сохраняя исходный порядок.
+
+Вход читается лениво и в работе одновременно не больше 2×workers
+порций — архив может быть больше оперативной памяти. Элементом может
+быть сама строка JSONL (str/bytes): её декодирует процесс пула, и
+основной процесс не становится узким местом на json.loads.
+"""
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Union
+
+from .sts_parser import FIELDS, parse_sts
+
+DEFAULT_CHUNKSIZE = 64
+
+AnnotationItem = Union[dict, str, bytes]
+ParseResult = tuple[Optional[dict], Optional[str]]
+
+
+class ParseStats:
+    """
+    Счётчики пакетного разбора: документы, ошибки, скорость.
+
+    Обновляются по мере выдачи результатов, поэтому их можно читать
+    и во время обхода (прогресс), и после него.
+    """
+
+    __slots__ = ("documents", "errors", "started", "finished")
+
+    def __init__(self):
+        self.documents = 0
+        self.errors = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else time.monotonic()
+        return end - self.started
+
+    @property
+    def docs_per_s(self) -> float:
+        elapsed = self.elapsed
+        return self.documents / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "documents": self.documents,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed, 3),
+            "docs_per_s": round(self.docs_per_s, 1),
+        }
+
+    def _count(self, results: list[ParseResult]) -> list[ParseResult]:
+        self.documents += len(results)
+        self.errors += sum(1 for _, err in results if err is not None)
+        return results
+
+
+def annotation_from_record(record: dict) -> dict:
+    """
+    textAnnotation из записи архива.
+
+    Понимает ответ Vision ({"result": {"textAnnotation": ...}}), запись
+    с ключом "textAnnotation" (synthetic.py) и голый textAnnotation.
+    """
+    if "textAnnotation" in record:
+        return record["textAnnotation"]
+    result = record.get("result")
+    if isinstance(result, dict) and "textAnnotation" in result:
+        return result["textAnnotation"]
+    return record
+
+
+def _parse_one(
+    item: AnnotationItem,
+    fields: Optional[tuple[str, ...]] = None,
+) -> ParseResult:
+    try:
+        if isinstance(item, (str, bytes)):
+            item = json.loads(item)
+        if not isinstance(item, dict):
+            return (None, "Запись не является JSON-объектом")
+        return (parse_sts(annotation_from_record(item), fields=fields), None)
+    except Exception as exc:
+        return (None, f"{type(exc).__name__}: {exc}")
+
+
+def _parse_chunk(
+    chunk: list[AnnotationItem],
+    fields: Optional[tuple[str, ...]] = None,
+) -> list[ParseResult]:
+    """Разбор порции в процессе пула (функция модуля — для pickle)."""
+    return [_parse_one(item, fields) for item in chunk]
+
+
+def _chunked(
+    items: Iterable[AnnotationItem],
+    size: int,
+) -> Iterator[list[AnnotationItem]]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_sts_many(
+    annotations: Iterable[AnnotationItem],
+    workers: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    stats: Optional[ParseStats] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> Iterator[ParseResult]:
+    """
+    Разбирает поток ответов OCR пулом процессов, сохраняя порядок.
+
+    Args:
+        annotations: textAnnotation, записи архива или строки JSONL;
+            может быть генератором.
+        workers: Процессов пула (по умолчанию — число ядер); 0 или 1 —
+            разбор в текущем процессе.
+        chunksize: Документов в одной порции для процесса пула.
+        stats: Счётчики (документов, ошибок, док/с) для отчёта.
+        fields: Только эти поля parse_sts (см. sts_parser.FIELDS).
+
+    Yields:
+        (result, error) для каждого входного документа по порядку —
+        ровно одно из полей None. Ошибка разбора одного документа
+        не останавливает обход.
+
+    Raises:
+        ValueError: В fields есть имя не из FIELDS.
+    """
+    if fields is not None:
+        fields = tuple(fields)
+        unknown = set(fields).difference(FIELDS)
+        if unknown:
+            raise ValueError(
+                f"Неизвестные поля СТС: {', '.join(sorted(unknown))}"
+            )
+    parse_chunk = partial(_parse_chunk, fields=fields)
+    if stats is None:
+        stats = ParseStats()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = _chunked(annotations, max(chunksize, 1))
+    stats.started = time.monotonic()
+    stats.finished = None
+    try:
+        if workers <= 1:
+            for chunk in chunks:
+                yield from stats._count(parse_chunk(chunk))
+            return
+
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(parse_chunk, chunk))
+                # Не читаем вход дальше, пока очередь полна
+                if len(pending) >= workers * 2:
+                    yield from stats._count(pending.popleft().result())
+            while pending:
+                yield from stats._count(pending.popleft().result())
+        finally:
+            # Обход прерван (break, исключение) — лишние порции не нужны
+            pool.shutdown(wait=True, cancel_futures=True)
+    finally:
+        stats.finished = time.monotonic()
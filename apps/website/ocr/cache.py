@@ -0,0 +1,370 @@
+"""
+Кэш результатов Vision OCR по содержимому изображения.
+
+Клиенты часто повторно загружают одно и то же фото СТС (ошибка формы,
+перезагрузка страницы, повтор после проверки конфликтов). Ключ кэша —
+SHA-256 от MIME-типа и байтов изображения, значение — textAnnotation.
+
+Два уровня:
+- локальный LRU процесса (мгновенно, ограничен по числу записей и TTL);
+- общий кэш Django с алиасом «ocr» (файловый/Redis — виден всем
+  gunicorn-воркерам), TTL и MAX_ENTRIES задаются в settings.CACHES.
+
+Здесь же — примитивы для общего состояния в этом кэше (счётчики
+circuit breaker, ведро лимита запросов): shared_lock, shared_add,
+shared_incr. У Redis add() и incr() — одна команда сервера, у
+FileBasedCache — чтение и запись отдельно, поэтому для него
+используется flock на файл в каталоге кэша (файловый кэш и так
+виден только одному хосту).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover — Windows
+    fcntl = None
+
+from .conf import django_cache, ocr_setting
+from .streaming import ImageSource, iter_source_chunks
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_ALIAS = "ocr"
+
+# Версия формата значения: при изменении структуры — сменить префикс
+_KEY_PREFIX = "ocr:ta:v1:"
+
+# Время жизни записи по умолчанию (сутки) и размер локального LRU
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_LOCAL_MAX_ENTRIES = 64
+
+# Блокировка общего состояния: TTL ключа-блокировки на случай падения
+# воркера под ней, пауза между попытками и число попыток (~0,2 с)
+_LOCK_PREFIX = "ocr:lock:v1:"
+_LOCK_TTL = 2
+_LOCK_SPIN = 0.005
+_LOCK_ATTEMPTS = 40
+
+
+def ocr_cache_key(image: ImageSource, mime_type: str) -> str:
+    """
+    Вычисляет ключ кэша по содержимому изображения.
+
+    Args:
+        image: Байты изображения или файловый объект (читается кусками).
+        mime_type: Тип изображения ("JPEG", "PNG", "PDF").
+
+    Returns:
+        Hex-строка SHA-256.
+    """
+    digest = hashlib.sha256()
+    digest.update(mime_type.upper().encode("ascii", "ignore"))
+    digest.update(b"\0")
+    for chunk in iter_source_chunks(image):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRResultCache:
+    """
+    Двухуровневый кэш textAnnotation: LRU процесса + общий кэш Django.
+
+    Потокобезопасен. Возвращаемые словари нельзя изменять — локальный
+    уровень отдаёт один и тот же объект всем читателям. Префикс ключей
+    в общем кэше — key_prefix (подклассы хранят в том же кэше другое).
+    """
+
+    key_prefix = _KEY_PREFIX
+
+    def __init__(
+        self,
+        ttl: int = DEFAULT_TTL,
+        local_max_entries: int = DEFAULT_LOCAL_MAX_ENTRIES,
+        alias: str = OCR_CACHE_ALIAS,
+    ):
+        self.ttl = ttl
+        self.local_max_entries = local_max_entries
+        self.alias = alias
+        self._local: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Возвращает textAnnotation из кэша или None.
+
+        Args:
+            key: Ключ из ocr_cache_key().
+
+        Returns:
+            textAnnotation или None при промахе.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, ta = entry
+                if expires_at > now:
+                    self._local.move_to_end(key)
+                    self.local_hits += 1
+                    return ta
+                del self._local[key]
+
+        ta = None
+        shared = django_cache(self.alias)
+        if shared is not None:
+            try:
+                ta = shared.get(self.key_prefix + key)
+            except Exception as exc:
+                logger.warning("OCR cache read failed: %s", exc)
+
+        with self._lock:
+            if ta is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self._remember(key, ta, now)
+        return ta
+
+    def set(self, key: str, ta: dict) -> None:
+        """
+        Сохраняет textAnnotation в оба уровня кэша.
+
+        Args:
+            key: Ключ из ocr_cache_key().
+            ta: textAnnotation из ответа Vision OCR.
+        """
+        with self._lock:
+            self._remember(key, ta, time.monotonic())
+        shared = django_cache(self.alias)
+        if shared is None:
+            return
+        try:
+            shared.set(self.key_prefix + key, ta, timeout=self.ttl)
+        except Exception as exc:
+            logger.warning("OCR cache write failed: %s", exc)
+
+    def clear_local(self) -> None:
+        """Очищает локальный уровень (общий кэш не трогает)."""
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> dict:
+        """Счётчики попаданий/промахов и размер локального LRU."""
+        with self._lock:
+            return {
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "local_size": len(self._local),
+            }
+
+    def _remember(self, key: str, ta: dict, now: float) -> None:
+        """Кладёт запись в локальный LRU (вызывать под self._lock)."""
+        if self.local_max_entries <= 0:
+            return
+        self._local[key] = (now + self.ttl, ta)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+
+
+_cache: Optional[OCRResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRResultCache]:
+    """
+    Возвращает кэш OCR процесса или None, если кэш отключён.
+
+    Настройки: OCR_CACHE_ENABLED, OCR_CACHE_TTL,
+    OCR_CACHE_LOCAL_MAX_ENTRIES.
+    """
+    global _cache
+    if not ocr_setting("OCR_CACHE_ENABLED", True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OCRResultCache(
+                    ttl=int(ocr_setting("OCR_CACHE_TTL", DEFAULT_TTL)),
+                    local_max_entries=int(ocr_setting(
+                        "OCR_CACHE_LOCAL_MAX_ENTRIES",
+                        DEFAULT_LOCAL_MAX_ENTRIES,
+                    )),
+                )
+    return _cache
+
+
+_warned_non_atomic = False
+
+
+def atomic_cache(shared) -> bool:
+    """
+    Атомарны ли add() и incr() кэша для всех воркеров.
+
+    Redis и Memcached выполняют их одной командой сервера, LocMemCache —
+    под своей блокировкой. FileBasedCache и DatabaseCache читают
+    и пишут отдельно: два воркера могут оба «взять» ключ через add()
+    или потерять инкремент.
+    """
+    from django.core.cache.backends.locmem import LocMemCache
+    from django.core.cache.backends.memcached import BaseMemcachedCache
+    from django.core.cache.backends.redis import RedisCache
+
+    return isinstance(shared, (RedisCache, BaseMemcachedCache, LocMemCache))
+
+
+def _lock_path(alias: str, shared) -> Optional[str]:
+    """Каталог файлового кэша для flock или None (другой бэкенд)."""
+    from django.core.cache.backends.filebased import FileBasedCache
+
+    if fcntl is None or not isinstance(shared, FileBasedCache):
+        return None
+    caches = ocr_setting("CACHES", {})
+    location = caches.get(alias, {}).get("LOCATION")
+    return os.fspath(location) if location else None
+
+
+@contextmanager
+def shared_lock(alias: str, name: str) -> Iterator[bool]:
+    """
+    Межпроцессная блокировка для чтения-изменения-записи в общем кэше.
+
+    FileBasedCache — flock на файл <каталог кэша>/<name>.lock (атомарно
+    для всех воркеров хоста, ждёт освобождения). Redis, Memcached — ключ через add()
+    с TTL. Остальные бэкенды (файловый кэш без fcntl, база данных) —
+    тоже add(), но без гарантий: для общего лимита и breaker нужен
+    Redis (REDIS_URL), о чём пишется предупреждение.
+
+    Args:
+        alias: Алиас кэша.
+        name: Имя блокировки (латиница, без разделителей пути).
+
+    Yields:
+        True, если блокировка взята (ключ — за _LOCK_ATTEMPTS попыток),
+        иначе False — вызывающий решает, выполнять ли операцию без неё.
+    """
+    shared = django_cache(alias)
+    if shared is None:
+        yield False
+        return
+    directory = _lock_path(alias, shared)
+    if directory is not None:
+        with _file_lock(os.path.join(directory, name + ".lock")) as locked:
+            yield locked
+        return
+    if not atomic_cache(shared):
+        _warn_non_atomic(shared)
+
+    key = _LOCK_PREFIX + name
+    locked = False
+    for _ in range(_LOCK_ATTEMPTS):
+        try:
+            locked = shared.add(key, 1, timeout=_LOCK_TTL)
+        except Exception as exc:
+            logger.warning("OCR cache lock %s unavailable: %s", name, exc)
+            break
+        if locked:
+            break
+        time.sleep(_LOCK_SPIN)
+    try:
+        yield locked
+    finally:
+        if locked:
+            try:
+                shared.delete(key)
+            except Exception:
+                pass
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[bool]:
+    """
+    flock(LOCK_EX) на файл path.
+
+    Ждёт без предела: ОС снимает flock при завершении процесса, так что
+    «зависнуть» блокировка не может, а держат её микросекунды.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError as exc:
+        logger.warning("OCR cache lock file unavailable: %s", exc)
+        yield False
+        return
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def _warn_non_atomic(shared) -> None:
+    """Один раз на процесс: общий кэш не даёт атомарных операций."""
+    global _warned_non_atomic
+    if not _warned_non_atomic:
+        _warned_non_atomic = True
+        logger.warning(
+            "OCR cache backend %s has no atomic add()/incr(): rate limit "
+            "and circuit breaker are approximate, set REDIS_URL",
+            type(shared).__name__,
+        )
+
+
+def shared_add(alias: str, key: str, value, timeout: Optional[int]) -> bool:
+    """
+    cache.add(), атомарный и для FileBasedCache (под shared_lock).
+
+    Returns:
+        True, если ключа не было и он записан.
+    """
+    shared = django_cache(alias)
+    if shared is None:
+        return False
+    if atomic_cache(shared):
+        return shared.add(key, value, timeout=timeout)
+    with shared_lock(alias, "state") as locked:
+        return locked and shared.add(key, value, timeout=timeout)
+
+
+def shared_incr(alias: str, key: str, timeout: Optional[int]) -> int:
+    """
+    Увеличивает счётчик в общем кэше (создаёт его с TTL timeout).
+
+    BaseCache.incr() для FileBasedCache — get() и set() со сбросом
+    TTL на значение по умолчанию, поэтому там счётчик меняется
+    под shared_lock и записывается с исходным timeout.
+
+    Returns:
+        Новое значение (0, если общего кэша нет).
+    """
+    shared = django_cache(alias)
+    if shared is None:
+        return 0
+    if atomic_cache(shared):
+        shared.add(key, 0, timeout=timeout)
+        try:
+            return shared.incr(key)
+        except ValueError:
+            # Ключ истёк между add и incr — счёт начинается заново
+            shared.add(key, 1, timeout=timeout)
+            return 1
+    with shared_lock(alias, "state"):
+        # Без блокировки (не взята за отведённое время) — всё равно
+        # считаем: потерянный инкремент лучше пропущенного
+        value = shared.get(key, 0) + 1
+        shared.set(key, value, timeout=timeout)
+    return value
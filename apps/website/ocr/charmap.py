@@ -0,0 +1,144 @@
+"""
+Посимвольные преобразования текста OCR через str.translate.
+
+Транслитерация, гомоглифы и диакритика раньше собирались по символу
+(dict.get + join) или через unicodedata на каждый вызов. Здесь таблицы
+строятся один раз (str.maketrans, в том числе с многосимвольными
+заменами «Щ» → «SHCH»), а str.translate проходит строку за один вызов.
+
+OCR-тире — исключение: translate с таблицей на длинном кириллическом
+тексте (весь fullText) медленнее регулярки в разы, а несколько
+str.replace по редким символам — быстрее обоих.
+
+fold() — общий ключ для сравнения со словарями: без диакритики и
+OCR-тире, в верхнем регистре, с одиночными пробелами. Результаты
+fold, transliterate и decode_homoglyphs кэшируются: марки и модели
+повторяются от документа к документу.
+"""
+import unicodedata
+from functools import lru_cache
+
+# Размер кэшей преобразований коротких строк (марки, модели, слова)
+CACHE_SIZE = 4096
+
+# Транслитерация кириллица → латиница (ГОСТ 7.79-2000 / ISO 9).
+# Последний резерв, когда марки или модели нет в словаре.
+TRANSLIT: dict[str, str] = {
+    "А": "A", "Б": "B", "В": "V", "Г": "G", "Д": "D",
+    "Е": "E", "Ё": "YO", "Ж": "ZH", "З": "Z", "И": "I",
+    "Й": "Y", "К": "K", "Л": "L", "М": "M", "Н": "N",
+    "О": "O", "П": "P", "Р": "R", "С": "S", "Т": "T",
+    "У": "U", "Ф": "F", "Х": "KH", "Ц": "TS", "Ч": "CH",
+    "Ш": "SH", "Щ": "SHCH", "Ъ": "", "Ы": "Y", "Ь": "",
+    "Э": "E", "Ю": "YU", "Я": "YA",
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d",
+    "е": "e", "ё": "yo", "ж": "zh", "з": "z", "и": "i",
+    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n",
+    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch",
+    "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "",
+    "э": "e", "ю": "yu", "я": "ya",
+}
+
+# Latin-гомоглифы кириллицы: OCR читает кириллическую букву как похожую
+# латинскую. Нужны для детекции «ложно-латинских» строк («PEHO» = «РЕНО»).
+HOMOGLYPH_CYR_TO_LAT: dict[str, str] = {
+    "А": "A", "В": "B", "Е": "E", "З": "3", "К": "K",
+    "М": "M", "Н": "H", "О": "O", "Р": "P", "С": "C",
+    "Т": "T", "У": "Y", "Х": "X",
+}
+HOMOGLYPH_LAT_TO_CYR: dict[str, str] = {
+    v: k for k, v in HOMOGLYPH_CYR_TO_LAT.items()
+}
+
+# OCR-артефакты, которые Vision ставит вместо пробела: тире, «№»
+# и «тДЦ» (битая кодировка «№»)
+_DASHES = ("тДЦ", "—", "–", "―", "№")
+
+_TRANSLIT_TABLE = str.maketrans(TRANSLIT)
+_LAT_TO_CYR_TABLE = str.maketrans(HOMOGLYPH_LAT_TO_CYR)
+
+
+class _DiacriticsTable(dict):
+    """
+    Таблица для str.translate: символ → он же без диакритики (NFKD без
+    combining-знаков). Заполняется по мере встречи символов.
+
+    Кириллица не трогается: «Й» и «Ё» — отдельные буквы, а не «И»
+    и «Е» с диакритикой (иначе «ТОЙОТА» не найдётся в словаре).
+    """
+
+    def __missing__(self, code: int):
+        if 0x0400 <= code <= 0x04FF:
+            value = chr(code)
+        else:
+            decomposed = unicodedata.normalize("NFKD", chr(code))
+            value = "".join(
+                c for c in decomposed if not unicodedata.combining(c)
+            )
+        self[code] = value
+        return value
+
+
+_DIACRITICS_TABLE = _DiacriticsTable()
+
+
+def clean_dashes(text: str) -> str:
+    """
+    Заменяет OCR-артефакты (тире, «тДЦ», «№») на пробел.
+
+    Yandex Vision иногда вставляет em-dash, «тДЦ» или «№» вместо пробела.
+    Знак «№» перед 6-цифровым номером СТС — особенность некоторых бланков.
+    """
+    for dash in _DASHES:
+        if dash in text:
+            text = text.replace(dash, " ")
+    return text
+
+
+def strip_diacritics(text: str) -> str:
+    """
+    Убирает диакритику: «PRÍORA» → «PRIORA», «ÑOTION» → «NOTION».
+
+    ASCII-строки возвращаются как есть без прохода по символам.
+    """
+    if text.isascii():
+        return text
+    return text.translate(_DIACRITICS_TABLE)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def transliterate(text: str) -> str:
+    """
+    Транслитерирует кириллицу в латиницу (ГОСТ 7.79-2000), верхний регистр.
+
+    Даёт фонетическое написание, не официальное: «РЕНО» → «RENO».
+    """
+    return text.translate(_TRANSLIT_TABLE).upper()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def decode_homoglyphs(text: str) -> str:
+    """
+    Читает Latin-гомоглифы как кириллицу: «PEHO» → «РЕНО».
+
+    Returns:
+        Кириллический вариант в верхнем регистре, если заменён хотя бы
+        один символ, иначе исходная строка.
+    """
+    upper = text.upper()
+    candidate = upper.translate(_LAT_TO_CYR_TABLE)
+    if candidate != upper:
+        return candidate
+    return text
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def fold(text: str) -> str:
+    """
+    Ключ для сравнения со словарями марок и моделей.
+
+    Без диакритики и OCR-тире, в верхнем регистре, пробелы схлопнуты:
+    «Škoda — » → «SKODA».
+    """
+    return " ".join(strip_diacritics(clean_dashes(text)).upper().split())
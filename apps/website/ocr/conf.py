@@ -0,0 +1,65 @@
+"""
+Доступ к настройкам OCR.
+
+Модули OCR используются не только из Django (views, management-команды),
+но и из отдельных скриптов в scripts/, где settings не сконфигурированы.
+Поэтому все настройки читаются через ocr_setting() с безопасным default.
+"""
+from typing import Any, Optional
+
+# Бюджет parse_sts в веб-запросе по умолчанию, сек
+DEFAULT_PARSE_BUDGET = 0.25
+
+
+def ocr_setting(name: str, default: Any = None) -> Any:
+    """
+    Возвращает значение настройки Django или default.
+
+    Args:
+        name: Имя настройки (например, "OCR_CACHE_TTL").
+        default: Значение, если настройка не задана или Django
+            не сконфигурирован (запуск из скрипта).
+
+    Returns:
+        Значение настройки.
+    """
+    try:
+        from django.conf import settings
+    except ImportError:
+        return default
+    if not settings.configured:
+        return default
+    return getattr(settings, name, default)
+
+
+def django_cache(alias: str):
+    """
+    Возвращает кэш Django по алиасу или None, если кэш недоступен.
+
+    Args:
+        alias: Алиас из settings.CACHES.
+
+    Returns:
+        Объект кэша Django или None (скрипт без Django, алиас не задан).
+    """
+    try:
+        from django.conf import settings
+        from django.core.cache import caches
+    except ImportError:
+        return None
+    if not settings.configured:
+        return None
+    if alias not in getattr(settings, "CACHES", {}):
+        return None
+    return caches[alias]
+
+
+def parse_budget() -> Optional[float]:
+    """
+    Бюджет времени parse_sts для онлайн-запроса (OCR_PARSE_BUDGET).
+
+    Returns:
+        Секунды или None, если бюджет отключён (0 или меньше).
+    """
+    budget = float(ocr_setting("OCR_PARSE_BUDGET", DEFAULT_PARSE_BUDGET))
+    return budget if budget > 0 else None
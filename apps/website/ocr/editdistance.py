@@ -0,0 +1,96 @@
+"""
+Расстояние Левенштейна: бит-параллельный алгоритм Майерса (Хюрё).
+
+Столбец таблицы динамического программирования для шаблона длины m
+хранится как два битовых вектора (шаг +1 и −1 по вертикали), и весь
+столбец пересчитывается десятком операций над int за символ текста:
+O(len(text)) операций вместо O(m·n) клеток. Int в Python неограничен,
+поэтому предела длины нет: длинные названия моделей сравниваются
+так же точно, как короткие.
+
+Matcher разбирает запрос один раз (маски символов) и затем сравнивает
+его с любым числом кандидатов — так устроены levenshtein_many()
+и поиск по BK-дереву (fuzzy.py). Микробенчмарк:
+scripts/bench_editdistance.py.
+"""
+from typing import Iterable
+
+
+class Matcher:
+    """
+    Запрос, подготовленный для многократного сравнения.
+
+    Example:
+        >>> Matcher("TOYOTA").distances(["T0Y0TA", "TOYOTA"])
+        [2, 0]
+    """
+
+    __slots__ = ("query", "_peq", "_mask", "_last")
+
+    def __init__(self, query: str):
+        self.query = query
+        peq: dict[str, int] = {}
+        for i, ch in enumerate(query):
+            peq[ch] = peq.get(ch, 0) | (1 << i)
+        self._peq = peq
+        self._mask = (1 << len(query)) - 1
+        self._last = 1 << (len(query) - 1) if query else 0
+
+    def distance(self, text: str) -> int:
+        """Расстояние Левенштейна от запроса до text."""
+        m = len(self.query)
+        if not m:
+            return len(text)
+        if text == self.query:
+            return 0
+        peq = self._peq
+        mask = self._mask
+        last = self._last
+        pv = mask
+        mv = 0
+        score = m
+        for ch in text:
+            eq = peq.get(ch, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = (ph << 1) | 1
+            mh <<= 1
+            pv = (mh | ~(xv | ph)) & mask
+            mv = ph & xv & mask
+        return score
+
+    def distances(self, texts: Iterable[str]) -> list[int]:
+        """Расстояния до каждого кандидата по порядку."""
+        distance = self.distance
+        return [distance(text) for text in texts]
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Расстояние Левенштейна (вставка, удаление, замена — по 1)."""
+    if a == b:
+        return 0
+    # Шаблон — более длинная строка: итераций столько, сколько символов
+    # в короткой
+    if len(a) < len(b):
+        a, b = b, a
+    return Matcher(a).distance(b)
+
+
+def levenshtein_many(query: str, candidates: Iterable[str]) -> list[int]:
+    """
+    Расстояния от query до каждого кандидата за один разбор запроса.
+
+    Args:
+        query: Искомая строка (например, марка из OCR).
+        candidates: Словарные написания.
+
+    Returns:
+        Список расстояний в порядке candidates.
+    """
+    return Matcher(query).distances(candidates)
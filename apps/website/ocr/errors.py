@@ -0,0 +1,44 @@
+"""
+Исключения модуля OCR.
+"""
+from typing import Optional
+
+
+class VisionError(Exception):
+    """
+    Ошибка вызова Vision OCR.
+
+    Attributes:
+        status: HTTP-статус ответа (None — ответа не было).
+        transient: Временная ошибка (5xx, сбой соединения) — есть смысл
+            повторить запрос.
+        timeout: Vision не ответил за отведённое время.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        transient: bool = False,
+        timeout: bool = False,
+    ):
+        super().__init__(message)
+        self.status = status
+        self.transient = transient
+        self.timeout = timeout
+
+
+class VisionBusyError(Exception):
+    """
+    Лимит запросов к Vision исчерпан — запрос не отправлялся.
+
+    Attributes:
+        retry_after: Через сколько секунд имеет смысл повторить.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            "Сервис распознавания перегружен, "
+            f"повторите через {retry_after} с"
+        )
+        self.retry_after = retry_after
@@ -0,0 +1,126 @@
+"""
+Нечёткий поиск по словарям марок и моделей: BK-дерево.
+
+OCR портит латиницу и кириллицу по букве-две («T0Y0TA», «HYUNDA1»,
+«ОКТАВНЯ»), и без VIN точное совпадение со словарём не находится.
+BK-дерево строится один раз по всем написаниям (канонические названия
+и алиасы) и отвечает «ближайшее написание на расстоянии ≤ k»,
+отсекая по неравенству треугольника ветки, которые заведомо дальше:
+на словаре из сотен слов при k ≤ 2 проверяется лишь их часть.
+Расстояние — бит-параллельный Левенштейн из editdistance.py.
+"""
+from typing import Any, Callable, Iterable, Optional
+
+from .editdistance import Matcher, levenshtein
+
+
+class _Node:
+    __slots__ = ("word", "value", "children")
+
+    def __init__(self, word: str, value: Any):
+        self.word = word
+        self.value = value
+        self.children: dict[int, "_Node"] = {}
+
+
+class BKTree:
+    """
+    BK-дерево: слово → значение, поиск соседей в пределах расстояния.
+
+    Расстояние должно быть метрикой (по умолчанию — Левенштейн):
+    на неравенстве треугольника держится отсечение веток.
+    """
+
+    __slots__ = ("_root", "_distance", "_size")
+
+    def __init__(self, distance: Callable[[str, str], int] = levenshtein):
+        self._root: Optional[_Node] = None
+        self._distance = distance
+        self._size = 0
+
+    @classmethod
+    def from_items(
+        cls,
+        items: Iterable[tuple[str, Any]],
+        distance: Callable[[str, str], int] = levenshtein,
+    ) -> "BKTree":
+        """Дерево из пар (слово, значение); повтор слова не добавляется."""
+        tree = cls(distance)
+        for word, value in items:
+            tree.add(word, value)
+        return tree
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, word: str) -> bool:
+        return any(d == 0 for d, _, _ in self.search(word, 0))
+
+    def add(self, word: str, value: Any = None) -> bool:
+        """
+        Добавляет слово. Возвращает False, если оно уже есть
+        (значение первого добавления сохраняется).
+        """
+        if value is None:
+            value = word
+        if self._root is None:
+            self._root = _Node(word, value)
+            self._size = 1
+            return True
+        node = self._root
+        while True:
+            d = self._distance(word, node.word)
+            if d == 0:
+                return False
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = _Node(word, value)
+                self._size += 1
+                return True
+            node = child
+
+    def search(self, query: str, k: int) -> list[tuple[int, str, Any]]:
+        """
+        Все слова на расстоянии ≤ k от query.
+
+        Returns:
+            [(расстояние, слово, значение)] по возрастанию расстояния.
+        """
+        found = []
+        if self._root is None:
+            return found
+        # Для Левенштейна запрос разбирается один раз на весь обход
+        if self._distance is levenshtein:
+            measure = Matcher(query).distance
+        else:
+            def measure(word: str) -> int:
+                return self._distance(query, word)
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = measure(node.word)
+            if d <= k:
+                found.append((d, node.word, node.value))
+            # Соседи query лежат только в ветках с |d' − d| ≤ k
+            for edge, child in node.children.items():
+                if d - k <= edge <= d + k:
+                    stack.append(child)
+        found.sort(key=lambda item: (item[0], item[1]))
+        return found
+
+    def best(self, query: str, k: int) -> Optional[Any]:
+        """
+        Значение ближайшего слова в пределах k или None.
+
+        None и при неоднозначности: несколько слов на минимальном
+        расстоянии с разными значениями (лучше не исправлять, чем
+        исправить на чужую марку).
+        """
+        found = self.search(query, k)
+        if not found:
+            return None
+        nearest = found[0][0]
+        values = {value for d, _, value in found if d == nearest}
+        if len(values) != 1:
+            return None
+        return values.pop()
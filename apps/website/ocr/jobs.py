@@ -0,0 +1,216 @@
+"""
+Асинхронные задачи OCR: загрузка → job_id → опрос статуса.
+
+Синхронный ocr_sts_view держит gunicorn-воркер на всё время вызова Vision
+(до REQUEST_TIMEOUT секунд). В режиме задач запрос сразу получает job_id,
+а распознавание выполняет ограниченный пул потоков процесса.
+
+Статус задачи хранится в общем кэше «ocr», поэтому опрос статуса может
+обслужить любой воркер, а не только тот, что принял загрузку.
+"""
+import logging
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .backends import recognize_text
+from .cache import OCR_CACHE_ALIAS
+from .conf import django_cache, ocr_setting, parse_budget
+from .errors import VisionBusyError
+from .memo import parse_sts_cached
+from .streaming import ImageSource, iter_source_chunks
+from .timing import collect as collect_timings, stage
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "ocr:job:v1:"
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 16
+DEFAULT_JOB_TTL = 10 * 60
+
+# Копия загрузки для задачи: до 1 МБ в памяти, больше — во временном файле
+_SPOOL_MAX_MEMORY = 1024 * 1024
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+
+
+class OCRJobQueueFull(Exception):
+    """Очередь задач OCR заполнена — новую задачу принять нельзя."""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_init_lock = threading.Lock()
+
+# Статусы задач, если общий кэш недоступен (скрипт без Django)
+_local_jobs: dict[str, dict] = {}
+_local_lock = threading.Lock()
+_LOCAL_MAX_JOBS = 256
+
+
+def _pool() -> tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    """Лениво создаёт пул потоков (после fork gunicorn-воркера)."""
+    global _executor, _slots
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                workers = int(ocr_setting("OCR_JOB_WORKERS", DEFAULT_WORKERS))
+                max_pending = int(ocr_setting(
+                    "OCR_JOB_MAX_PENDING", DEFAULT_MAX_PENDING,
+                ))
+                _slots = threading.BoundedSemaphore(max(max_pending, 1))
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(workers, 1),
+                    thread_name_prefix="ocr-job",
+                )
+    assert _slots is not None
+    return _executor, _slots
+
+
+def _store(job_id: str, state: dict) -> None:
+    """Сохраняет статус задачи в общем кэше (или локально без него)."""
+    shared = django_cache(OCR_CACHE_ALIAS)
+    if shared is not None:
+        ttl = int(ocr_setting("OCR_JOB_TTL", DEFAULT_JOB_TTL))
+        try:
+            shared.set(_KEY_PREFIX + job_id, state, timeout=ttl)
+            return
+        except Exception as exc:
+            logger.warning("OCR job store failed: %s", exc)
+    with _local_lock:
+        _local_jobs[job_id] = state
+        while len(_local_jobs) > _LOCAL_MAX_JOBS:
+            del _local_jobs[next(iter(_local_jobs))]
+
+
+def submit_ocr_job(
+    image: ImageSource,
+    mime_type: str = "JPEG",
+) -> str:
+    """
+    Ставит распознавание СТС в очередь и сразу возвращает job_id.
+
+    Загруженный файл Django удаляет по окончании запроса, поэтому задача
+    получает собственную копию (SpooledTemporaryFile, кусками).
+
+    Args:
+        image: Байты изображения или файловый объект (UploadedFile).
+        mime_type: Тип изображения: "JPEG", "PNG" или "PDF".
+
+    Returns:
+        Идентификатор задачи для get_ocr_job().
+
+    Raises:
+        OCRJobQueueFull: Все слоты очереди заняты.
+    """
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise OCRJobQueueFull()
+    try:
+        spooled = _spool(image)
+    except Exception:
+        slots.release()
+        raise
+    job_id = uuid.uuid4().hex
+    _store(job_id, {"status": STATUS_PENDING})
+    try:
+        executor.submit(_run_job, job_id, spooled, mime_type)
+    except Exception:
+        spooled.close()
+        slots.release()
+        raise
+    return job_id
+
+
+def _spool(image: ImageSource):
+    """Копирует изображение во временный файл задачи."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+    try:
+        for chunk in iter_source_chunks(image):
+            spooled.write(chunk)
+        spooled.seek(0)
+    except Exception:
+        spooled.close()
+        raise
+    return spooled
+
+
+def get_ocr_job(job_id: str) -> Optional[dict]:
+    """
+    Возвращает состояние задачи.
+
+    Args:
+        job_id: Идентификатор из submit_ocr_job().
+
+    Returns:
+        {"status": "pending"} или
+        {"status": "done", "success": bool, "data": dict, "error": str};
+        None — задача не найдена или устарела.
+    """
+    shared = django_cache(OCR_CACHE_ALIAS)
+    if shared is not None:
+        try:
+            state = shared.get(_KEY_PREFIX + job_id)
+            if state is not None:
+                return state
+        except Exception as exc:
+            logger.warning("OCR job read failed: %s", exc)
+    with _local_lock:
+        return _local_jobs.get(job_id)
+
+
+def _run_job(job_id: str, image, mime_type: str) -> None:
+    """Выполняет OCR + парсинг в потоке пула и сохраняет результат."""
+    _, slots = _pool()
+    # Замеры этапов (timing.py) — в поле лога ocr_timings
+    with collect_timings() as timings:
+        try:
+            ta, vision_err = recognize_text(image, mime_type)
+            if ta is not None:
+                with stage("parse"):
+                    form_data = parse_sts_cached(ta, budget=parse_budget())
+                logger.info(
+                    "OCR СТС (job %s): успешно, VIN=%s",
+                    job_id, form_data.get("vehicle_vin", ""),
+                    extra={"ocr_timings": timings.as_dict()},
+                )
+                state = {
+                    "status": STATUS_DONE,
+                    "success": True,
+                    "data": form_data,
+                }
+            else:
+                state = {
+                    "status": STATUS_DONE,
+                    "success": False,
+                    "error": vision_err or "Не удалось распознать документ",
+                    "data": {},
+                }
+        except VisionBusyError as exc:
+            state = {
+                "status": STATUS_DONE,
+                "success": False,
+                "error": str(exc),
+                "retry_after": exc.retry_after,
+                "data": {},
+            }
+        except Exception as exc:
+            logger.error(
+                "Ошибка OCR СТС (job %s): %s", job_id, exc, exc_info=True,
+                extra={"ocr_timings": timings.as_dict()},
+            )
+            state = {
+                "status": STATUS_DONE,
+                "success": False,
+                "error": str(exc),
+                "data": {},
+            }
+    try:
+        _store(job_id, state)
+    finally:
+        image.close()
+        slots.release()
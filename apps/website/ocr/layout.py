@@ -0,0 +1,240 @@
+"""
+Геометрия строк документа: координаты, колонки, поиск соседей.
+
+textAnnotation Vision содержит boundingBox каждой строки. LineLayout
+хранит строки в массивах, упорядоченных по середине строки по Y,
+и отвечает на вопрос «какие строки — значение этой подписи»: справа
+в том же ряду, затем ниже в той же колонке. Ряд подписи находится
+двоичным поиском по массиву середин, без перебора документа.
+
+Прямоугольник строки (x, y, ширина, высота) считается из вершин при
+первом запросе, затрагивающем строку: разбор документа спрашивает
+о соседях пяти-шести подписей, и координаты остальных строк ему
+не нужны. Построение раскладки стоит столько же, сколько прежняя
+сортировка строк по Y.
+
+Если координат в ответе нет, каждая строка считается отдельным рядом
+в порядке чтения: «ниже» — это просто следующие строки.
+"""
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from typing import Iterator, Optional
+
+# Строки в одном ряду, если их середины по Y расходятся меньше чем
+# на эту долю высоты строки
+_ROW_TOLERANCE = 0.6
+
+# Строка в колонке подписи, если перекрывает её по X или её левый край
+# не дальше этой доли ширины страницы от левого края подписи
+_COLUMN_GAP = 0.15
+
+_by_cy = itemgetter(0)
+
+Box = tuple[int, int, int, int]
+
+
+class LineLayout:
+    """
+    Строки документа сверху вниз с прямоугольниками на странице.
+
+    Массивы параллельны: i-я строка — texts[i] с серединой cys[i]
+    по Y и прямоугольником box(i). При равных серединах строки идут
+    в порядке блоков OCR.
+
+    Attributes:
+        texts: Тексты строк.
+        cys: Середины строк по Y (по возрастанию).
+        has_geometry: В ответе были координаты строк.
+        truncated: Строки сверх max_lines были отброшены.
+    """
+
+    __slots__ = (
+        "texts", "cys", "has_geometry", "truncated",
+        "_vertices", "_boxes", "_width",
+    )
+
+    def __init__(
+        self,
+        rows: list[tuple[int, str, list]],
+        width: int = 0,
+        truncated: bool = False,
+    ):
+        rows.sort(key=_by_cy)
+        self.cys: list[int] = [row[0] for row in rows]
+        self.texts: list[str] = [row[1] for row in rows]
+        self._vertices: list[list] = [row[2] for row in rows]
+        self._boxes: list[Optional[Box]] = [None] * len(rows)
+        self.has_geometry = any(self._vertices)
+        self.truncated = truncated
+        self._width = width
+
+    @classmethod
+    def from_text_annotation(
+        cls,
+        ta: dict,
+        max_lines: Optional[int] = None,
+    ) -> "LineLayout":
+        """
+        Строит раскладку из textAnnotation (blocks → lines → boundingBox).
+
+        Пустые строки пропускаются, текст обрезается по краям.
+
+        Args:
+            ta: textAnnotation из ответа Vision OCR.
+            max_lines: Не больше стольких непустых строк (в порядке блоков
+                OCR); остальные отбрасываются (truncated=True).
+        """
+        rows: list[tuple[int, str, list]] = []
+        truncated = False
+        for block in ta.get("blocks", []):
+            for line in block.get("lines", []):
+                text = line.get("text", "").strip()
+                if not text:
+                    continue
+                if max_lines is not None and len(rows) >= max_lines:
+                    truncated = True
+                    break
+                verts = line.get("boundingBox", {}).get("vertices", [])
+                ys = [int(v["y"]) for v in verts if "y" in v]
+                rows.append((sum(ys) // len(ys) if ys else 0, text, verts))
+            if truncated:
+                break
+        return cls(rows, width=_to_int(ta.get("width")), truncated=truncated)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def box(self, index: int) -> Box:
+        """Прямоугольник строки index: (x, y, ширина, высота), px."""
+        box = self._boxes[index]
+        if box is not None:
+            return box
+        verts = self._vertices[index]
+        if len(verts) == 4:
+            # Прямоугольник строки Vision отдаёт обходом вершин: углы 0 и 2
+            # противоположны. Нулевые координаты в JSON опускаются
+            a, c = verts[0], verts[2]
+            x0, x1 = int(a.get("x", 0)), int(c.get("x", 0))
+            y0, y1 = int(a.get("y", 0)), int(c.get("y", 0))
+            box = (min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0))
+        else:
+            xs = [int(v["x"]) for v in verts if "x" in v]
+            ys = [int(v["y"]) for v in verts if "y" in v]
+            x = min(xs) if xs else 0
+            y = min(ys) if ys else 0
+            box = (
+                x,
+                y,
+                max(xs) - x if xs else 0,
+                max(ys) - y if ys else 0,
+            )
+        self._boxes[index] = box
+        return box
+
+    @property
+    def width(self) -> int:
+        """Ширина страницы: из ответа или по правому краю строк."""
+        if not self._width:
+            self._width = max(
+                (x + w for x, _, w, _ in map(self.box, range(len(self)))),
+                default=0,
+            )
+        return self._width
+
+    def right_of(self, index: int) -> list[int]:
+        """
+        Строки ряда подписи index правее неё, ближайшие первыми.
+
+        Args:
+            index: Номер строки-подписи.
+
+        Returns:
+            Номера строк, упорядоченные по X.
+        """
+        x, _, w, h = self.box(index)
+        if h <= 0:
+            return []
+        cy = self.cys[index]
+        tol = max(int(h * _ROW_TOLERANCE), 1)
+        # Значение может начинаться чуть левее правого края подписи:
+        # OCR расширяет рамки строк
+        edge = x + w - h
+        found = [
+            (self.box(j)[0], j)
+            for j in range(
+                bisect_left(self.cys, cy - tol),
+                bisect_right(self.cys, cy + tol),
+            )
+            if j != index and self.box(j)[0] >= edge
+        ]
+        found.sort()
+        return [j for _, j in found]
+
+    def below(self, index: int, rows: int) -> Iterator[int]:
+        """
+        Строки следующих rows рядов под подписью index в её колонке.
+
+        Строки соседней колонки относятся к другой подписи и пропускаются;
+        ряды считаются только по строкам колонки подписи.
+
+        Args:
+            index: Номер строки-подписи.
+            rows: Сколько рядов вниз смотреть.
+
+        Yields:
+            Номера строк по рядам сверху вниз, в ряду — по X. Ряды
+            находятся по мере чтения: остановка на первом подходящем
+            значении не трогает строки ниже.
+        """
+        n = len(self.texts)
+        if rows <= 0:
+            return
+        if not self.has_geometry:
+            yield from range(index + 1, min(index + 1 + rows, n))
+            return
+        left, _, w, h = self.box(index)
+        right = left + w
+        gap = max(self.width * _COLUMN_GAP, 1)
+        cys = self.cys
+        row: list[tuple[int, int]] = []
+        row_cy = row_tol = 0
+        j = bisect_right(cys, cys[index] + max(int(h * _ROW_TOLERANCE), 1))
+        while j < n:
+            x, _, wj, hj = self.box(j)
+            if abs(x - left) > gap and not (x < right and x + wj > left):
+                j += 1
+                continue
+            if row and cys[j] - row_cy > row_tol:
+                row.sort()
+                for _, k in row:
+                    yield k
+                row = []
+                rows -= 1
+                if not rows:
+                    return
+            if not row:
+                row_cy = cys[j]
+                row_tol = max(int(hj * _ROW_TOLERANCE), 1)
+            row.append((x, j))
+            j += 1
+        row.sort()
+        for _, k in row:
+            yield k
+
+    def near(self, index: int, rows: int) -> Iterator[int]:
+        """
+        Строки, где может стоять значение подписи index.
+
+        Сначала справа в том же ряду, затем rows рядов ниже в той же
+        колонке (см. right_of и below).
+        """
+        yield from self.right_of(index)
+        yield from self.below(index, rows)
+
+
+def _to_int(value) -> int:
+    """width/height в ответе Vision — строки; пустое значение → 0."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
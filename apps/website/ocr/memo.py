@@ -0,0 +1,153 @@
+"""
+Мемоизация parse_sts по содержимому textAnnotation.
+
+Повторы загрузки, повторные попытки и пакетные прогоны (ocr_batch)
+отдают парсеру одни и те же textAnnotation. Ключ — дайджест того, что
+парсер читает: fullText, entities, размеры страницы, текст и вершины
+строк (слова и прочие поля ответа на результат не влияют, поэтому
+полный и компактный ответ дают один ключ, см. annotation.py).
+
+В ключ входят sts_parser.PARSER_VERSION и версия справочника марок
+(refdata.data_version): после обновления парсера или данных старые
+записи просто перестают находиться и вытесняются по TTL.
+
+Хранилище — как у кэша OCR (cache.py): LRU процесса + общий кэш Django
+с алиасом «ocr», видимый всем воркерам. Результат, урезанный бюджетом
+времени (ParseReport.skipped), не запоминается.
+"""
+import hashlib
+import threading
+from typing import Optional
+
+from .cache import DEFAULT_TTL, OCRResultCache
+from .conf import ocr_setting
+from .refdata import data_version
+from .sts_parser import PARSER_VERSION, ParseReport, parse_sts
+
+# Записей в LRU процесса: результат разбора — десяток коротких строк
+DEFAULT_LOCAL_MAX_ENTRIES = 512
+
+# Разделители полей дайджеста: в тексте OCR их не бывает
+_FIELD_SEP = "\x1f"
+_RECORD_SEP = "\x1e"
+
+
+def annotation_digest(ta: dict) -> str:
+    """
+    Канонический дайджест textAnnotation для ключа мемоизации.
+
+    Учитывает только входы парсера: fullText, entities, width, height
+    и для каждой строки блоков — текст и вершины boundingBox (одинаково,
+    прислал ли Vision координаты строками или числами).
+
+    Returns:
+        Hex-строка BLAKE2b (160 бит).
+    """
+    # Части собираются в одну строку и хэшируются одним вызовом:
+    # update() на каждую вершину дороже самого хэширования
+    parts = [ta.get("fullText", "")]
+    for entity in ta.get("entities", ()):
+        parts.append(
+            f"{entity.get('name', '')}{_FIELD_SEP}{entity.get('text', '')}"
+        )
+    parts.append(f"{ta.get('width', '')}x{ta.get('height', '')}")
+    for block in ta.get("blocks", ()):
+        for line in block.get("lines", ()):
+            text = line.get("text", "").strip()
+            if not text:
+                continue
+            parts.append(text)
+            for vertex in line.get("boundingBox", {}).get("vertices", ()):
+                # "12" и 12 форматируются одинаково — без int()
+                parts.append(f"{vertex.get('x', 0)},{vertex.get('y', 0)}")
+    digest = hashlib.blake2b(
+        _RECORD_SEP.join(parts).encode("utf-8", "surrogatepass"),
+        digest_size=20,
+    )
+    return digest.hexdigest()
+
+
+class ParseMemo(OCRResultCache):
+    """
+    Кэш результатов parse_sts: LRU процесса + общий кэш Django.
+
+    Значения — словари полей parse_sts; отдаются копией, чтобы
+    вызывающий мог их менять. Счётчики local_hits, shared_hits и misses
+    (stats()) — как у кэша OCR.
+    """
+
+    key_prefix = "ocr:sts:"
+
+    def parse(
+        self,
+        ta: dict,
+        budget: Optional[float] = None,
+        report: Optional[ParseReport] = None,
+    ) -> dict:
+        """
+        parse_sts(ta, budget=..., report=...) через кэш.
+
+        При попадании report не заполняется (разбора не было).
+        """
+        key = (
+            f"v{PARSER_VERSION}.{data_version()}:{annotation_digest(ta)}"
+        )
+        cached = self.get(key)
+        if cached is not None:
+            return dict(cached)
+        if report is None:
+            report = ParseReport()
+        values = parse_sts(ta, budget=budget, report=report)
+        if not report.skipped:
+            self.set(key, dict(values))
+        return values
+
+
+_memo: Optional[ParseMemo] = None
+_memo_lock = threading.Lock()
+
+
+def get_parse_memo() -> Optional[ParseMemo]:
+    """
+    Возвращает кэш разбора процесса или None, если он отключён.
+
+    Настройки: OCR_PARSE_MEMO_ENABLED, OCR_PARSE_MEMO_LOCAL_MAX_ENTRIES;
+    TTL общий с кэшем OCR (OCR_CACHE_TTL).
+    """
+    global _memo
+    if not ocr_setting("OCR_PARSE_MEMO_ENABLED", True):
+        return None
+    if _memo is None:
+        with _memo_lock:
+            if _memo is None:
+                _memo = ParseMemo(
+                    ttl=int(ocr_setting("OCR_CACHE_TTL", DEFAULT_TTL)),
+                    local_max_entries=int(ocr_setting(
+                        "OCR_PARSE_MEMO_LOCAL_MAX_ENTRIES",
+                        DEFAULT_LOCAL_MAX_ENTRIES,
+                    )),
+                )
+    return _memo
+
+
+def parse_sts_cached(
+    ta: dict,
+    budget: Optional[float] = None,
+    report: Optional[ParseReport] = None,
+) -> dict:
+    """
+    parse_sts с мемоизацией (get_parse_memo), если она включена.
+
+    Args:
+        ta: textAnnotation из ответа OCR.
+        budget: Бюджет времени разбора, с (см. parse_sts).
+        report: Куда записать итог разбора (при попадании в кэш
+            остаётся пустым).
+
+    Returns:
+        Поля parse_sts.
+    """
+    memo = get_parse_memo()
+    if memo is None:
+        return parse_sts(ta, budget=budget, report=report)
+    return memo.parse(ta, budget=budget, report=report)
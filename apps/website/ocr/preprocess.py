@@ -0,0 +1,158 @@
+"""
+Подготовка фото СТС перед отправкой в Vision OCR.
+
+Фото с телефона весят 6–10 МБ, в base64 это ~13 МБ JSON на запрос.
+Для распознавания СТС достаточно ~2000 px по длинной стороне, поэтому
+изображение уменьшается, поворачивается по EXIF (EXIF при этом
+отбрасывается) и пережимается в JPEG.
+
+Pillow — необязательная зависимость: без него изображение уходит как есть.
+"""
+import io
+import logging
+import threading
+from typing import Optional
+
+from .conf import ocr_setting
+from .streaming import ImageSource, rewind, source_size
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover — Pillow не установлен
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Длинная сторона после уменьшения: текст СТС (~8 pt) остаётся читаемым
+DEFAULT_MAX_SIDE = 2000
+DEFAULT_JPEG_QUALITY = 85
+
+# Маленькие файлы не трогаем — выигрыш меньше затрат на перекодирование
+MIN_BYTES_TO_PROCESS = 256 * 1024
+
+# Счётчики процесса: сколько изображений обработано и байт сэкономлено
+_totals = {"processed": 0, "bytes_in": 0, "bytes_out": 0}
+_totals_lock = threading.Lock()
+
+
+def preprocess_available() -> bool:
+    """True, если Pillow установлен и предобработка включена."""
+    return Image is not None and bool(
+        ocr_setting("OCR_PREPROCESS_ENABLED", True)
+    )
+
+
+def preprocess_image(
+    image: ImageSource,
+    mime_type: str,
+    max_side: Optional[int] = None,
+    jpeg_quality: Optional[int] = None,
+) -> tuple[ImageSource, str, dict]:
+    """
+    Уменьшает и пережимает изображение для отправки в Vision OCR.
+
+    PDF и небольшие файлы возвращаются без изменений. Если результат
+    не меньше исходника, тоже возвращается исходник (файл — перемотанным
+    в начало).
+
+    Args:
+        image: Исходное изображение: байты или файловый объект.
+        mime_type: "JPEG", "PNG" или "PDF".
+        max_side: Предел длинной стороны, px (OCR_PREPROCESS_MAX_SIDE).
+        jpeg_quality: Качество JPEG (OCR_PREPROCESS_JPEG_QUALITY).
+
+    Returns:
+        (image, mime_type, stats) — stats: applied, original_bytes,
+        processed_bytes, bytes_saved.
+    """
+    original_size = source_size(image)
+    stats = {
+        "applied": False,
+        "original_bytes": original_size,
+        "processed_bytes": original_size,
+        "bytes_saved": 0,
+    }
+    if Image is None or mime_type == "PDF":
+        return (image, mime_type, stats)
+    if original_size < MIN_BYTES_TO_PROCESS:
+        return (image, mime_type, stats)
+
+    if max_side is None:
+        max_side = int(ocr_setting("OCR_PREPROCESS_MAX_SIDE", DEFAULT_MAX_SIDE))
+    if jpeg_quality is None:
+        jpeg_quality = int(ocr_setting(
+            "OCR_PREPROCESS_JPEG_QUALITY", DEFAULT_JPEG_QUALITY,
+        ))
+
+    try:
+        processed = _downscale_to_jpeg(image, max_side, jpeg_quality)
+    except Exception as exc:
+        logger.warning("OCR preprocess failed, sending original: %s", exc)
+        rewind(image)
+        return (image, mime_type, stats)
+
+    rewind(image)
+    if len(processed) >= original_size:
+        return (image, mime_type, stats)
+
+    stats.update({
+        "applied": True,
+        "processed_bytes": len(processed),
+        "bytes_saved": original_size - len(processed),
+    })
+    with _totals_lock:
+        _totals["processed"] += 1
+        _totals["bytes_in"] += original_size
+        _totals["bytes_out"] += len(processed)
+    logger.info(
+        "OCR preprocess: %d → %d bytes (saved %d)",
+        original_size, len(processed), stats["bytes_saved"],
+    )
+    return (processed, "JPEG", stats)
+
+
+def preprocess_totals() -> dict:
+    """Суммарная статистика предобработки в текущем процессе."""
+    with _totals_lock:
+        totals = dict(_totals)
+    totals["bytes_saved"] = totals["bytes_in"] - totals["bytes_out"]
+    return totals
+
+
+def _downscale_to_jpeg(
+    image: ImageSource,
+    max_side: int,
+    jpeg_quality: int,
+) -> bytes:
+    """Декодирует, поворачивает по EXIF, уменьшает и кодирует в JPEG."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        fp = io.BytesIO(image)
+    else:
+        # Pillow читает файл сам, не загружая его целиком в память
+        image.seek(0)
+        fp = image
+    with Image.open(fp) as img:
+        # Для JPEG декодер сразу уменьшает в 2/4/8 раз (DCT-scaling) —
+        # намного быстрее полного декодирования 12-мегапиксельного фото
+        img.draft("RGB", (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        img = _flatten_to_rgb(img)
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+        out = io.BytesIO()
+        # exif не передаётся — метаданные (GPS и т.п.) не уходят наружу
+        img.save(out, "JPEG", quality=jpeg_quality, optimize=True)
+    return out.getvalue()
+
+
+def _flatten_to_rgb(img):
+    """Приводит изображение к RGB/L; прозрачность — на белый фон."""
+    if img.mode in ("RGB", "L"):
+        return img
+    if img.mode in ("RGBA", "LA", "P"):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
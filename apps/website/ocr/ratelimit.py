@@ -0,0 +1,188 @@
+"""
+Общий лимит запросов к Vision OCR (token bucket).
+
+У каталога Yandex Cloud есть квота запросов в секунду; при нескольких
+хостах gunicorn всплески загрузок упираются в неё и получают HTTP 429.
+Ведро токенов хранится в общем кэше «ocr», поэтому его видят все воркеры.
+Запрос либо сразу получает токен, либо коротко ждёт своей очереди
+(не дольше max_wait), либо сразу получает VisionBusyError с Retry-After.
+Токен берётся на каждый HTTP-запрос к Vision, включая повторы и хеджи
+(см. resilience.ResilientVisionCaller).
+
+Общий лимит на несколько хостов — только с Redis (REDIS_URL): файловый
+кэш по умолчанию виден одному хосту, и лимит получается на хост
+(чтение-изменение-запись ведра там защищено flock, см. cache.shared_lock).
+
+Без общего кэша (скрипты) ведро живёт в памяти процесса.
+"""
+import logging
+import math
+import threading
+import time
+from typing import Optional
+
+from .cache import OCR_CACHE_ALIAS, shared_incr, shared_lock
+from .conf import django_cache, ocr_setting
+from .errors import VisionBusyError
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "ocr:rl:v1:"
+
+DEFAULT_MAX_WAIT = 2.0
+
+
+class TokenBucket:
+    """
+    Ведро токенов с состоянием в общем кэше Django.
+
+    Состояние — {"tokens", "ts"}: токены пополняются со скоростью rate
+    до burst. Ожидающий запрос резервирует токен заранее (tokens уходит
+    в минус), поэтому очередь обслуживается по порядку прихода.
+    Чтение-изменение-запись защищено cache.shared_lock: ключ через add()
+    на Redis, flock на файловом кэше.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        alias: str = OCR_CACHE_ALIAS,
+    ):
+        self.rate = rate
+        self.burst = burst if burst else max(rate, 1.0)
+        self.alias = alias
+        self._local_state: Optional[dict] = None
+        self._local_lock = threading.Lock()
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0}
+        self._counters_lock = threading.Lock()
+
+    def acquire(self, max_wait: float = DEFAULT_MAX_WAIT) -> float:
+        """
+        Берёт токен, при необходимости ожидая до max_wait секунд.
+
+        Args:
+            max_wait: Предел ожидания; 0 — не ждать.
+
+        Returns:
+            Сколько секунд пришлось ждать.
+
+        Raises:
+            VisionBusyError: Токен не освободится за max_wait.
+        """
+        wait = self._reserve(max_wait)
+        if wait is None:
+            self._count("rejected")
+            raise VisionBusyError(self._retry_after())
+        if wait > 0:
+            self._count("queued")
+            time.sleep(wait)
+        else:
+            self._count("admitted")
+        return wait
+
+    def stats(self) -> dict:
+        """
+        Счётчики: admitted/queued/rejected этого процесса и total_* по
+        всем воркерам (если есть общий кэш).
+        """
+        with self._counters_lock:
+            stats = dict(self._counters)
+        shared = django_cache(self.alias)
+        if shared is not None:
+            try:
+                totals = shared.get_many([
+                    _KEY_PREFIX + name for name in self._counters
+                ])
+            except Exception:
+                totals = {}
+            for name in self._counters:
+                stats["total_" + name] = totals.get(_KEY_PREFIX + name, 0)
+        return stats
+
+    def _reserve(self, max_wait: float) -> Optional[float]:
+        """Резервирует токен; возвращает ожидание или None (отказ)."""
+        shared = django_cache(self.alias)
+        if shared is None:
+            with self._local_lock:
+                state, wait = self._take(self._local_state, max_wait)
+                self._local_state = state
+            return wait
+
+        with shared_lock(self.alias, "ratelimit") as locked:
+            if not locked:
+                # Кэш перегружен или блокировка «зависла» — лучше
+                # пропустить запрос, чем блокировать загрузку
+                logger.warning("OCR rate limiter lock timeout, admitting")
+                return 0.0
+            try:
+                state, wait = self._take(
+                    shared.get(_KEY_PREFIX + "bucket"), max_wait,
+                )
+                if state is not None:
+                    shared.set(_KEY_PREFIX + "bucket", state, timeout=3600)
+            except Exception as exc:
+                logger.warning("OCR rate limiter update failed: %s", exc)
+                return 0.0
+        return wait
+
+    def _take(
+        self,
+        state: Optional[dict],
+        max_wait: float,
+    ) -> tuple[Optional[dict], Optional[float]]:
+        """Пополняет ведро и списывает токен (чистая функция состояния)."""
+        now = time.time()
+        if state is None:
+            tokens = self.burst
+        else:
+            elapsed = max(now - state["ts"], 0.0)
+            tokens = min(self.burst, state["tokens"] + elapsed * self.rate)
+        wait = max(0.0, (1.0 - tokens) / self.rate)
+        if wait > max_wait:
+            return ({"tokens": tokens, "ts": now}, None)
+        return ({"tokens": tokens - 1.0, "ts": now}, wait)
+
+    def _retry_after(self) -> int:
+        """Оценка Retry-After: время до освобождения одного токена."""
+        shared = django_cache(self.alias)
+        try:
+            state = (
+                shared.get(_KEY_PREFIX + "bucket") if shared is not None
+                else self._local_state
+            )
+        except Exception:
+            state = None
+        tokens = state["tokens"] if state else 0.0
+        return max(1, math.ceil((1.0 - tokens) / self.rate))
+
+    def _count(self, name: str) -> None:
+        with self._counters_lock:
+            self._counters[name] += 1
+        try:
+            shared_incr(self.alias, _KEY_PREFIX + name, timeout=None)
+        except Exception:
+            pass
+
+
+_bucket: Optional[TokenBucket] = None
+_bucket_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[TokenBucket]:
+    """
+    Возвращает общее ведро токенов или None, если лимит выключен.
+
+    Настройки: OCR_RATE_LIMIT (запросов в секунду, 0 — без лимита),
+    OCR_RATE_BURST (ёмкость ведра, по умолчанию = OCR_RATE_LIMIT).
+    """
+    global _bucket
+    rate = float(ocr_setting("OCR_RATE_LIMIT", 0) or 0)
+    if rate <= 0:
+        return None
+    if _bucket is None:
+        with _bucket_lock:
+            if _bucket is None:
+                burst = float(ocr_setting("OCR_RATE_BURST", 0) or 0)
+                _bucket = TokenBucket(rate, burst or None)
+    return _bucket
@@ -0,0 +1,256 @@
+"""
+Справочник марок: WMI → марка, написания марок и моделей.
+
+Данные лежат в версионированных файлах ocr/data/, а не в литералах кода:
+- wmi.tsv — «WMI<TAB>МАРКА» по строке, отсортировано по WMI; первая
+  строка — заголовок «# vehicle-wmi <версия>». Файл отображается
+  в память (mmap) и ищется двоичным поиском по строкам, поэтому
+  страницы делятся всеми воркерами gunicorn через кэш ОС, а размер
+  справочника почти не влияет на память процесса;
+- vehicles.json — {"version", "brand_aliases", "model_aliases"}:
+  кириллические и OCR-ошибочные написания → каноническое латинское.
+
+Всё загружается лениво, при первом обращении (первом запросе OCR),
+а не при импорте: воркер, не разбиравший СТС, за справочник не платит.
+Версии файлов должны совпадать; проверка данных — check_data()
+или scripts/check_vehicle_data.py.
+"""
+import json
+import mmap
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .fuzzy import BKTree
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+WMI_FILE = DATA_DIR / "wmi.tsv"
+VEHICLES_FILE = DATA_DIR / "vehicles.json"
+
+_WMI_HEADER = b"# vehicle-wmi "
+# WMI — 2 или 3 символа алфавита VIN (без I, O, Q); 2 символа —
+# производитель целиком, если третий символ не важен
+_WMI_KEY_RE = re.compile(r"^[A-HJ-NPR-Z0-9]{2,3}$")
+
+
+class WMIIndex:
+    """
+    Отсортированный по WMI файл «WMI<TAB>МАРКА», отображённый в память.
+
+    Поиск — двоичный по строкам переменной длины: O(log n) сравнений,
+    без разбора файла в dict.
+    """
+
+    __slots__ = ("version", "_buf", "_start", "_end")
+
+    def __init__(self, buf, start: int, version: int):
+        self.version = version
+        self._buf = buf
+        self._start = start
+        self._end = len(buf)
+
+    @classmethod
+    def open(cls, path: Path = WMI_FILE) -> "WMIIndex":
+        """Отображает файл в память (только чтение) и читает заголовок."""
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(buf)
+
+    @classmethod
+    def from_buffer(cls, buf) -> "WMIIndex":
+        """Индекс поверх bytes/mmap в формате wmi.tsv."""
+        header_end = buf.find(b"\n")
+        header = bytes(buf[:max(header_end, 0)])
+        if not header.startswith(_WMI_HEADER):
+            raise ValueError("wmi.tsv: нет заголовка «# vehicle-wmi N»")
+        version = int(header[len(_WMI_HEADER):])
+        return cls(buf, header_end + 1, version)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, wmi: str) -> bool:
+        return self.get(wmi) is not None
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return self._scan(self._start, b"")
+
+    def get(self, wmi: str) -> Optional[str]:
+        """Марка по точному WMI (2 или 3 символа) или None."""
+        key = wmi.encode("ascii", "replace")
+        for found, brand in self._scan(self._lower_bound(key), key):
+            return brand if found == wmi else None
+        return None
+
+    def prefix(self, prefix: str) -> list[tuple[str, str]]:
+        """Все (WMI, марка), начинающиеся с prefix, по порядку."""
+        key = prefix.encode("ascii", "replace")
+        return list(self._scan(self._lower_bound(key), key))
+
+    def brand_for_vin(self, vin: str) -> Optional[str]:
+        """
+        Марка по VIN: точный WMI из 3 символов, иначе запись из 2.
+
+        Если нет ни той, ни другой, но все WMI с теми же первыми двумя
+        символами принадлежат одной марке (TMB, TM8 → SKODA), берётся она.
+        """
+        vin = vin.upper()
+        if len(vin) < 2:
+            return None
+        if len(vin) >= 3:
+            brand = self.get(vin[:3])
+            if brand is not None:
+                return brand
+        brands = {brand for _, brand in self.prefix(vin[:2])}
+        if len(brands) == 1:
+            return brands.pop()
+        return None
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Смещение первой строки с WMI ≥ key."""
+        buf = self._buf
+        lo, hi = self._start, self._end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # Начало строки, в которую попал mid (lo — всегда начало строки)
+            line_start = buf.rfind(b"\n", lo, mid) + 1 or lo
+            line_end = buf.find(b"\n", line_start, self._end)
+            tab = buf.find(b"\t", line_start, line_end)
+            if buf[line_start:tab] < key:
+                lo = line_end + 1
+            else:
+                hi = line_start
+        return lo
+
+    def _scan(self, pos: int, prefix: bytes) -> Iterator[tuple[str, str]]:
+        buf = self._buf
+        while pos < self._end:
+            line_end = buf.find(b"\n", pos, self._end)
+            tab = buf.find(b"\t", pos, line_end)
+            key = buf[pos:tab]
+            if not key.startswith(prefix):
+                return
+            yield key.decode("ascii"), buf[tab + 1:line_end].decode("utf-8")
+            pos = line_end + 1
+
+
+@lru_cache(maxsize=None)
+def _vehicles() -> dict:
+    with open(VEHICLES_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def wmi_index() -> WMIIndex:
+    """
+    Индекс WMI: открывается при первом вызове, дальше — тот же.
+
+    Raises:
+        ValueError: Версии wmi.tsv и vehicles.json не совпадают.
+    """
+    index = WMIIndex.open()
+    version = _vehicles()["version"]
+    if index.version != version:
+        raise ValueError(
+            f"Версии справочника не совпадают: wmi.tsv {index.version}, "
+            f"vehicles.json {version}"
+        )
+    return index
+
+
+def data_version() -> int:
+    """Версия справочника (vehicles.json и заголовок wmi.tsv)."""
+    return _vehicles()["version"]
+
+
+def brand_aliases() -> dict[str, str]:
+    """Написание марки (кириллица, OCR-ошибки) → каноническое."""
+    return _vehicles()["brand_aliases"]
+
+
+def model_aliases() -> dict[str, str]:
+    """Кириллическое название модели → написание на латинице."""
+    return _vehicles()["model_aliases"]
+
+
+@lru_cache(maxsize=None)
+def canonical_brands() -> frozenset[str]:
+    """Канонические названия марок: из WMI и из алиасов."""
+    return frozenset(brand for _, brand in wmi_index()) | frozenset(
+        brand_aliases().values()
+    )
+
+
+@lru_cache(maxsize=None)
+def multiword_brands() -> frozenset[str]:
+    """Написания марок из нескольких слов: GREAT WALL, ЛЕНД РОВЕР."""
+    return frozenset(
+        name for name in canonical_brands() | brand_aliases().keys()
+        if " " in name
+    )
+
+
+@lru_cache(maxsize=None)
+def brand_index() -> BKTree:
+    """BK-дерево по всем написаниям марок → каноническое название."""
+    return BKTree.from_items(
+        [(b, b) for b in sorted(canonical_brands())]
+        + list(brand_aliases().items())
+    )
+
+
+@lru_cache(maxsize=None)
+def model_index() -> BKTree:
+    """BK-дерево по кириллическим написаниям моделей."""
+    return BKTree.from_items(list(model_aliases().items()))
+
+
+def check_data() -> list[str]:
+    """
+    Проверяет файлы справочника.
+
+    Returns:
+        Описания проблем: порядок и повторы WMI, недопустимые символы,
+        расхождение версий, отсутствующие разделы. Пустой список —
+        данные в порядке.
+    """
+    problems = []
+    raw = WMI_FILE.read_bytes()
+    try:
+        index = WMIIndex.from_buffer(raw)
+    except ValueError as exc:
+        return [str(exc)]
+    if not raw.endswith(b"\n"):
+        problems.append("wmi.tsv: нет перевода строки в конце файла")
+    seen: dict[str, str] = {}
+    previous = ""
+    body = raw[index._start:].decode("utf-8").splitlines()
+    for line_no, line in enumerate(body, 2):
+        parts = line.split("\t")
+        if len(parts) != 2 or not parts[1]:
+            problems.append(f"wmi.tsv:{line_no}: ожидается «WMI<TAB>МАРКА»")
+            continue
+        wmi, brand = parts
+        if not _WMI_KEY_RE.match(wmi):
+            problems.append(f"wmi.tsv:{line_no}: недопустимый WMI {wmi!r}")
+        if wmi in seen:
+            problems.append(
+                f"wmi.tsv:{line_no}: повтор {wmi} ({seen[wmi]} и {brand})"
+            )
+        elif wmi.encode() < previous.encode():
+            problems.append(f"wmi.tsv:{line_no}: {wmi} не по порядку")
+        seen.setdefault(wmi, brand)
+        previous = wmi
+
+    with open(VEHICLES_FILE, encoding="utf-8") as f:
+        vehicles = json.load(f)
+    if vehicles.get("version") != index.version:
+        problems.append(
+            f"версии не совпадают: wmi.tsv {index.version}, "
+            f"vehicles.json {vehicles.get('version')}"
+        )
+    for section in ("brand_aliases", "model_aliases"):
+        if not isinstance(vehicles.get(section), dict):
+            problems.append(f"vehicles.json: нет раздела {section}")
+    return problems
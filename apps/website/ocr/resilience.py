@@ -0,0 +1,434 @@
+"""
+Устойчивость вызовов Vision OCR: повторы, хеджирование, circuit breaker.
+
+Когда Vision тормозит, каждый запрос ждёт полный таймаут, а воркеры
+копятся в очереди за ним. Слой над VisionClient:
+
+- повторы с экспоненциальной задержкой и jitter — только для временных
+  ошибок (5xx, сбой/таймаут соединения);
+- хеджирование (опционально): если ответа нет дольше p95 последних
+  запросов, отправляется второй запрос, берётся первый успешный;
+- circuit breaker: при доле ошибок выше порога запросы к Vision
+  на время остывания сразу отклоняются, затем один пробный запрос
+  решает, замкнуть ли его. Состояние хранится в общем кэше «ocr»
+  и видно всем воркерам.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeout,
+    wait,
+)
+from typing import Optional
+
+from .cache import OCR_CACHE_ALIAS, shared_add, shared_incr
+from .conf import django_cache, ocr_setting
+from .errors import VisionBusyError, VisionError
+from .ratelimit import DEFAULT_MAX_WAIT, TokenBucket, get_rate_limiter
+from .streaming import ImageSource, iter_source_chunks
+from .timing import percentile, stage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.25
+DEFAULT_BACKOFF_CAP = 2.0
+
+# Хедж: задержка до второго запроса, пока не набрано статистики для p95
+DEFAULT_HEDGE_AFTER = 3.0
+_HEDGE_MIN_SAMPLES = 20
+
+DEFAULT_BREAKER_FAILURE_RATE = 0.5
+DEFAULT_BREAKER_MIN_CALLS = 5
+DEFAULT_BREAKER_WINDOW = 60
+DEFAULT_BREAKER_COOLDOWN = 30
+
+BREAKER_OPEN_MESSAGE = (
+    "Сервис распознавания временно недоступен, попробуйте позже"
+)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker с состоянием в общем кэше Django.
+
+    Состояния:
+    - замкнут: вызовы и ошибки считаются в окнах по window секунд; если
+      вызовов в окне не меньше min_calls и доля ошибок ≥ failure_rate,
+      breaker размыкается;
+    - разомкнут: cooldown секунд вызовы сразу отклоняются;
+    - полуразомкнут: после остывания проходит один пробный вызов
+      (allow_request), остальные отклоняются; успех пробы замыкает
+      breaker, ошибка размыкает снова.
+
+    Счётчики меняются через shared_incr/shared_add (cache.py) — атомарно
+    на Redis и под flock на файловом кэше. Без общего кэша (скрипты) —
+    всегда замкнут.
+    """
+
+    _PREFIX = "ocr:cb:v2:"
+
+    def __init__(
+        self,
+        failure_rate: float = DEFAULT_BREAKER_FAILURE_RATE,
+        min_calls: int = DEFAULT_BREAKER_MIN_CALLS,
+        window: int = DEFAULT_BREAKER_WINDOW,
+        cooldown: int = DEFAULT_BREAKER_COOLDOWN,
+        alias: str = OCR_CACHE_ALIAS,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.alias = alias
+
+    def is_open(self) -> bool:
+        """True, если breaker разомкнут и остывание ещё идёт."""
+        open_until = self._open_until()
+        return bool(open_until) and open_until > time.time()
+
+    def allow_request(self) -> bool:
+        """
+        Можно ли сейчас вызывать Vision.
+
+        В полуразомкнутом состоянии True получает только первый
+        вызывающий (пробный вызов); проба, не вернувшая результат
+        за cooldown, уступает место следующей.
+        """
+        open_until = self._open_until()
+        if not open_until:
+            return True
+        if open_until > time.time():
+            return False
+        try:
+            return shared_add(
+                self.alias, self._PREFIX + "probe", 1, timeout=self.cooldown,
+            )
+        except Exception:
+            return True
+
+    def record(self, success: bool) -> None:
+        """
+        Учитывает результат вызова и при необходимости размыкает breaker.
+
+        Args:
+            success: Вызов успешен (постоянные ошибки вроде HTTP 400
+                сюда передавать как успех — Vision при этом жив).
+        """
+        shared = django_cache(self.alias)
+        if shared is None:
+            return
+        try:
+            open_until = shared.get(self._PREFIX + "open_until")
+            if open_until:
+                if open_until <= time.time():
+                    self._finish_probe(shared, success)
+                # Ответ на вызов, начатый до размыкания, не учитываем
+                return
+            slot = int(time.time() // self.window)
+            calls = self._incr("calls", slot)
+            failures = (
+                self._incr("failures", slot) if not success
+                else shared.get(self._counter_key("failures", slot), 0)
+            )
+            if (
+                not success
+                and calls >= self.min_calls
+                and failures / calls >= self.failure_rate
+            ):
+                self._open(shared)
+                shared.delete_many([
+                    self._counter_key("calls", slot),
+                    self._counter_key("failures", slot),
+                ])
+                logger.warning(
+                    "Vision OCR circuit breaker opened for %ss "
+                    "(%s/%s failures)",
+                    self.cooldown, failures, calls,
+                )
+        except Exception as exc:
+            logger.warning("Circuit breaker update failed: %s", exc)
+
+    def _open_until(self) -> Optional[float]:
+        shared = django_cache(self.alias)
+        if shared is None:
+            return None
+        try:
+            return shared.get(self._PREFIX + "open_until")
+        except Exception:
+            return None
+
+    def _open(self, shared) -> None:
+        """Размыкает breaker на cooldown; ключ живёт до исхода пробы."""
+        shared.set(
+            self._PREFIX + "open_until",
+            time.time() + self.cooldown,
+            timeout=None,
+        )
+        shared.delete(self._PREFIX + "probe")
+
+    def _finish_probe(self, shared, success: bool) -> None:
+        """Исход пробного вызова: замкнуть или разомкнуть снова."""
+        if success:
+            shared.delete_many([
+                self._PREFIX + "open_until", self._PREFIX + "probe",
+            ])
+            logger.info("Vision OCR circuit breaker closed after probe")
+            return
+        self._open(shared)
+        logger.warning(
+            "Vision OCR circuit breaker probe failed, reopened for %ss",
+            self.cooldown,
+        )
+
+    def _counter_key(self, name: str, slot: int) -> str:
+        return f"{self._PREFIX}{name}:{slot}"
+
+    def _incr(self, name: str, slot: int) -> int:
+        """
+        Счётчик окна slot. Окно зашито в ключ, поэтому TTL (два окна)
+        нужен только для уборки, а не для отсчёта окна.
+        """
+        return shared_incr(
+            self.alias, self._counter_key(name, slot), timeout=self.window * 2,
+        )
+
+
+class ResilientVisionCaller:
+    """
+    Обёртка над VisionClient: повторы, хеджирование, circuit breaker.
+
+    С limiter каждый HTTP-запрос к Vision (первый, повтор, хедж) берёт
+    свой токен общего лимита; при разомкнутом breaker токен не берётся.
+    В breaker попадает один исход на вызов recognize() — после повторов.
+    """
+
+    def __init__(
+        self,
+        client,
+        breaker: Optional[CircuitBreaker] = None,
+        limiter: Optional[TokenBucket] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_cap: float = DEFAULT_BACKOFF_CAP,
+        hedge: bool = False,
+        hedge_after: Optional[float] = None,
+    ):
+        self.client = client
+        self.breaker = breaker
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self._latencies: deque[float] = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.retries = 0
+        self.hedges = 0
+        self.rejected = 0
+
+    def recognize(
+        self,
+        image: ImageSource,
+        api_key: str,
+        folder_id: str,
+        mime_type: str = "JPEG",
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ) -> tuple[Optional[dict], Optional[str]]:
+        """
+        Вызывает Vision с повторами и возвращает (textAnnotation, ошибка).
+
+        Args:
+            image: Байты изображения или файловый объект (при
+                хеджировании читается в память один раз).
+            api_key: API-ключ Yandex Cloud.
+            folder_id: ID каталога Yandex Cloud.
+            mime_type: Тип изображения.
+            max_wait: Сколько секунд можно ждать токена лимита на каждый
+                запрос (первый и повторы; хедж не ждёт).
+
+        Returns:
+            (text_annotation_dict, error_message) — ровно одно из полей None.
+
+        Raises:
+            VisionBusyError: Лимит исчерпан уже для первого запроса.
+                Если токена не хватило повтору, возвращается ошибка
+                предыдущей попытки.
+        """
+        if self.breaker is not None and not self.breaker.allow_request():
+            with self._lock:
+                self.rejected += 1
+            return (None, BREAKER_OPEN_MESSAGE)
+
+        if self.hedge and not isinstance(image, (bytes, bytearray, memoryview)):
+            # Два параллельных запроса не могут читать один файловый
+            # объект (UploadedFile из views) — читаем его в память один
+            # раз; размер загрузки ограничен формой
+            image = b"".join(iter_source_chunks(image))
+
+        attempt = 0
+        self._acquire(max_wait)
+        while True:
+            try:
+                ta = self._call(image, api_key, folder_id, mime_type)
+            except VisionError as exc:
+                if not exc.transient or attempt >= self.max_retries:
+                    self._record(not (exc.transient or exc.timeout))
+                    return (None, str(exc))
+                if self.breaker is not None and self.breaker.is_open():
+                    return (None, BREAKER_OPEN_MESSAGE)
+                delay = random.uniform(0, min(
+                    self.backoff_cap, self.backoff_base * 2 ** attempt,
+                ))
+                attempt += 1
+                logger.info(
+                    "Vision OCR retry %d in %.2fs: %s", attempt, delay, exc,
+                )
+                time.sleep(delay)
+                try:
+                    self._acquire(max_wait)
+                except VisionBusyError:
+                    self._record(False)
+                    return (None, str(exc))
+                with self._lock:
+                    self.retries += 1
+                continue
+            self._record(True)
+            return (ta, None)
+
+    def stats(self) -> dict:
+        """Счётчики повторов, хеджей и отклонений breaker'ом."""
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "rejected": self.rejected,
+                "p95_latency": self._p95(),
+            }
+
+    def _record(self, success: bool) -> None:
+        """
+        Исход логического вызова — в breaker. Ошибки, которые поглотили
+        повторы, не считаются: иначе breaker размыкался бы при вызовах,
+        каждый из которых в итоге вернул результат.
+        """
+        if self.breaker is not None:
+            self.breaker.record(success)
+
+    def _acquire(self, max_wait: float) -> None:
+        """Токен лимита на один запрос к Vision (если лимит включён)."""
+        if self.limiter is not None:
+            with stage("rate_wait"):
+                self.limiter.acquire(max_wait)
+
+    def _call(self, image, api_key, folder_id, mime_type) -> dict:
+        """Один логический вызов: обычный или с хеджированием."""
+        if self.hedge:
+            return self._call_hedged(image, api_key, folder_id, mime_type)
+        return self._timed(image, api_key, folder_id, mime_type)
+
+    def _timed(self, image, api_key, folder_id, mime_type) -> dict:
+        """Вызов Vision с записью задержки успешных ответов."""
+        started = time.monotonic()
+        ta = self.client.request(image, api_key, folder_id, mime_type)
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+        return ta
+
+    def _call_hedged(self, image, api_key, folder_id, mime_type) -> dict:
+        """Второй запрос, если первый не ответил за hedge-задержку."""
+        executor = self._hedge_executor()
+        args = (image, api_key, folder_id, mime_type)
+        first = executor.submit(self._timed, *args)
+        try:
+            return first.result(timeout=self._hedge_delay())
+        except FutureTimeout:
+            pass
+        try:
+            # Хедж не ждёт очереди лимита: без свободного токена ждём
+            # первый запрос
+            self._acquire(0)
+        except VisionBusyError:
+            return first.result()
+        with self._lock:
+            self.hedges += 1
+        second = executor.submit(self._timed, *args)
+        pending = {first, second}
+        last_exc: Optional[VisionError] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    return fut.result()
+                except VisionError as exc:
+                    last_exc = exc
+        assert last_exc is not None
+        raise last_exc
+
+    def _hedge_delay(self) -> float:
+        """p95 задержки последних ответов или hedge_after."""
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self._lock:
+            p95 = self._p95()
+        return p95 if p95 is not None else DEFAULT_HEDGE_AFTER
+
+    def _p95(self) -> Optional[float]:
+        """p95 по последним задержкам (вызывать под self._lock)."""
+        if len(self._latencies) < _HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(sorted(self._latencies), 95)
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        """Пул потоков для хеджированных запросов (лениво)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=8, thread_name_prefix="ocr-hedge",
+                )
+            return self._executor
+
+
+def build_resilient_caller(client) -> ResilientVisionCaller:
+    """
+    Создаёт ResilientVisionCaller по настройкам OCR_RETRY_*, OCR_HEDGE_*,
+    OCR_BREAKER_* и лимиту запросов OCR_RATE_* (ratelimit.py).
+
+    Args:
+        client: VisionClient процесса.
+    """
+    breaker = None
+    if ocr_setting("OCR_BREAKER_ENABLED", True):
+        breaker = CircuitBreaker(
+            failure_rate=float(ocr_setting(
+                "OCR_BREAKER_FAILURE_RATE", DEFAULT_BREAKER_FAILURE_RATE,
+            )),
+            min_calls=int(ocr_setting(
+                "OCR_BREAKER_MIN_CALLS", DEFAULT_BREAKER_MIN_CALLS,
+            )),
+            window=int(ocr_setting(
+                "OCR_BREAKER_WINDOW", DEFAULT_BREAKER_WINDOW,
+            )),
+            cooldown=int(ocr_setting(
+                "OCR_BREAKER_COOLDOWN", DEFAULT_BREAKER_COOLDOWN,
+            )),
+        )
+    hedge_after = ocr_setting("OCR_HEDGE_AFTER", None)
+    return ResilientVisionCaller(
+        client,
+        breaker=breaker,
+        limiter=get_rate_limiter(),
+        max_retries=int(ocr_setting("OCR_RETRY_MAX", DEFAULT_MAX_RETRIES)),
+        backoff_base=float(ocr_setting(
+            "OCR_RETRY_BACKOFF", DEFAULT_BACKOFF_BASE,
+        )),
+        hedge=bool(ocr_setting("OCR_HEDGE_ENABLED", False)),
+        hedge_after=float(hedge_after) if hedge_after else None,
+    )
@@ -12,7 +12,12 @@
 - Серия и номер СТС (10 цифр: NN NN NNNNNN) — не путать с ПТС
 
 Алгоритм работает с fullText и Y-упорядоченными строками блоков,
-чтобы корректно обрабатывать двухколоночную вёрстку документа.
+чтобы корректно обрабатывать двухколоночную вёрстку документа. Строки
+один раз сводятся в таблицу (_LineTable): нормализованный текст,
+признак подписи и найденные метки полей — экстракторы ищут свою метку
+по индексу, а не повторным проходом по документу. Значение метки
+ищется по координатам строк (layout.LineLayout): справа в том же ряду
+или ниже в той же колонке.
 
 Особенности обработки:
 - OCR может обрезать первые буквы слов у края изображения
@@ -21,16 +26,65 @@
 - Документ часто двухколоночный — Y-сортировка важнее порядка fullText
 - Номер СТС Yandex Vision определяет как «phone» entity
 - Знак «—» (тире) OCR иногда вставляет вместо пробела
+
+Разбор можно ограничить бюджетом времени (parse_sts(ta, budget=...)):
+по его исчерпании дорогие фолбэки пропускаются, а ParseReport
+сообщает, какие именно. Вход мусорного или враждебного изображения
+дополнительно обрезается до _MAX_FULL_TEXT символов и _MAX_LINES строк.
+Худшее время регулярок проверяет scripts/fuzz_sts_regex.py. Время
+каждого этапа записывается в timing.py под именем sts_<этап>.
+
+parse_sts(ta, fields=...) считает только запрошенные поля и то, от чего
+они зависят (ПТС — хвост номера СТС, марка и год — VIN, СТС — ПТС):
+для проверки VIN не нужны фолбэки ПТС и СТС. С lazy=True возвращается
+отображение STSFields, которое вычисляет поле при первом чтении.
+
+Ошибки OCR в самом VIN (I/O/Q вместо 1/0, B/8 и т. п. при обязательном
+контрольном символе) исправляются (ocr/vin.py). Пустые в тексте марка
+и год выпуска выводятся из VIN (vin.decode): марка — по WMI, если он
+однозначен, год — только если 10-й символ кодирует именно год выпуска
+(DecodedVIN.manufacture_year), а не модельный год.
 """
+import logging
 import re
+import time
+from collections.abc import Iterable, Iterator, Mapping
 from typing import Optional
 
+from .charmap import (
+    clean_dashes,
+    decode_homoglyphs,
+    fold,
+    strip_diacritics,
+    transliterate,
+)
+from .editdistance import levenshtein
+from .layout import LineLayout
+from .timing import record_many as record_timings
+from .refdata import (
+    brand_aliases,
+    brand_index,
+    canonical_brands,
+    model_aliases,
+    model_index,
+    multiword_brands,
+    wmi_index,
+)
+from .vin import decode as decode_vin
+from .vin import repair as repair_vin
+
+logger = logging.getLogger(__name__)
+
 # ---------------------------------------------------------------------------
 # Вспомогательные константы и регулярные выражения
 # ---------------------------------------------------------------------------
 
 # VIN: 17 символов, допустимый алфавит (без I, O, Q)
 _VIN_RE = re.compile(r'\b[A-HJ-NPR-Z0-9]{17}\b')
+# 17 символов с I, O, Q — VIN, где OCR прочитал 1 и 0 как буквы;
+# в VIN не меньше _VIN_MIN_DIGITS цифр (серийный номер), в словах их нет
+_VIN_LOOSE_RE = re.compile(r'\b[A-Z0-9]{17}\b')
+_VIN_MIN_DIGITS = 5
 
 # Год выпуска: 1985–2030
 _YEAR_RE = re.compile(r'\b(198[5-9]|199[0-9]|200[0-9]|201[0-9]|202[0-9]|203[0-9])\b')
@@ -51,6 +105,12 @@ _PTS_RE = re.compile(
     r'\b(\d{2})\s*([А-ЯЁA-Z]{2})\s*[№Nn]?\s*(\d{6})\b',
     re.IGNORECASE,
 )
+# Сколько рядов под подписью «Паспорт ТС» может занимать её значение
+_PTS_ROWS = 3
+
+# Настоящий СТС — около 1500 символов и 40 строк; больше — мусор OCR
+_MAX_FULL_TEXT = 20000
+_MAX_LINES = 400
 
 # Слова-маркеры для определения строк-подписей (не значений)
 _LABEL_KEYWORDS = frozenset([
@@ -71,6 +131,64 @@ _SKIP_LINES_RE = re.compile(
     re.IGNORECASE,
 )
 
+# Метки полей. Компилируются один раз при импорте: раньше часть из них
+# собиралась заново при каждом вызове экстрактора.
+# Скобки ограничены длиной: «кузов (кузов (…» без «)» иначе дают
+# квадратичный перебор
+_KUZOV_RE = re.compile(
+    r'кузов\s*(?:\([^)\n]{0,40}\))?\s*(?:—|–|№|\u2014|\u2015)?',
+    re.IGNORECASE,
+)
+_VIN_LABEL_RE = re.compile(
+    r'(?:и|дент|ент|нт)?ификационный\s+номер|vin\b',
+    re.IGNORECASE,
+)
+# Учитываем OCR-обрезку: «арка» вместо «Марка», «одель» вместо «Модель»
+_BRAND_MODEL_RE = re.compile(
+    r'(?:[Мм])?арка\s*,?\s*(?:[Мм])?одель\b',
+    re.IGNORECASE,
+)
+_BRAND_ONLY_RE = re.compile(r'^(?:[Мм])?арка\s+', re.IGNORECASE)
+_BRAND_ONLY_VALUE_RE = re.compile(r'^(?:[мМ])?арка\s+\S')
+_MODEL_ONLY_RE = re.compile(r'^(?:[Мм])?одель\s+', re.IGNORECASE)
+_YEAR_LABEL_RE = re.compile(r'год\s+вы[пп]', re.IGNORECASE)
+_PASSPORT_LABEL_RE = re.compile(r'\bпас\w*\s+тс\b|\bптс\b', re.IGNORECASE)
+_VOLUME_LABEL_RE = re.compile(r'объ[её]м|рабочий|двигател')
+
+# Значения и OCR-артефакты
+_NON_ALNUM_RE = re.compile(r'[^A-Z0-9]')
+_LATIN_WORD_RE = re.compile(r'[A-Z]{2,}')
+_DIGITS_ONLY_RE = re.compile(r'^\d+$')
+# Марки в справочнике — не длиннее двух слов; третье — запас на новые записи
+_MAX_BRAND_WORDS = 3
+_SIX_DIGITS_RE = re.compile(r'\b(\d{6})\b')
+_ONLY_SIX_DIGITS_RE = re.compile(r'^\d{6}$')
+_NON_DIGIT_RE = re.compile(r'\D')
+_PTS_SERIES_RE = re.compile(r'\b(\d{2})\s*([А-ЯЁA-Z]{2})\b', re.IGNORECASE)
+_BRAND_ARTIFACT_RE = re.compile(r'\btдц\b|\u2015', re.IGNORECASE)
+_LITERS_RE = re.compile(r'(\d{1,2}[,\.]\d{1,2})\s*(?:л|l)\b', re.IGNORECASE)
+# Число — отдельное слово: госномер «Х812СМ36» — не «812 см3»
+_CC_RE = re.compile(
+    r'(?<!\w)(\d{3,4})\s*(?:см\.?\s*[³3]|см\^?3|куб\.?\s*см)(?!\d)',
+    re.IGNORECASE,
+)
+_CC_LOOSE_RE = re.compile(r'(?<!\w)(\d{3,4})\s*см', re.IGNORECASE)
+_ECO_KEYWORD_RE = re.compile(r'экологическ', re.IGNORECASE)
+# После хвоста ПТС: конец строки, «74»/«77» отдельной строкой, «Паспорт ТС»
+_ECO_ORDER_RE = re.compile(
+    r'[^\S\n]*\n\s*(?:74|77)[^\S\n]*\n\s*Паспорт\s+ТС',
+    re.IGNORECASE,
+)
+_PASSPORT_TS_RE = re.compile(r'Паспорт\s+ТС', re.IGNORECASE)
+# «9 9» / «70» / «308738» тремя строками (между ними могут быть пустые).
+# Пробелы внутри строки — [^\S\n]: вложенные \s*\n\s* на длинных
+# сериях переводов строк перебирались квадратично
+_BROKEN_CERT_RE = re.compile(
+    r'(?:^|\n)[^\S\n]*(\d)[^\S\n]+(\d)[^\S\n]*\n\s*(\d{2})[^0-9\n]*\n'
+    r'\s*(\d{6})[^\S\n]*(?:\n|$)',
+    re.MULTILINE,
+)
+
 
 # ---------------------------------------------------------------------------
 # Утилиты
@@ -81,14 +199,8 @@ def _normalize(text: str) -> str:
     return " ".join(text.lower().split())
 
 
-def _clean_dashes(text: str) -> str:
-    """
-    Заменяет OCR-артефакты (тире, «тДЦ», «№») на пробел.
-
-    Yandex Vision иногда вставляет em-dash, «тДЦ» или «№» вместо пробела.
-    Знак «№» перед 6-цифровым номером СТС — особенность некоторых бланков.
-    """
-    return re.sub(r'тДЦ|—|–|\u2015|\u2014|№', ' ', text)
+# OCR-тире, «тДЦ» и «№» → пробел (str.translate, см. charmap.py)
+_clean_dashes = clean_dashes
 
 
 def _is_label(line: str) -> bool:
@@ -98,12 +210,16 @@ def _is_label(line: str) -> bool:
     Эвристика: строка содержит ≥2 известных ключевых слов из подписей СТС
     или 1 ключевое слово + 3+ других слова.
     """
-    lower = _normalize(line)
-    words = set(lower.split())
-    hits = words & _LABEL_KEYWORDS
+    return _is_label_norm(_normalize(line))
+
+
+def _is_label_norm(norm: str) -> bool:
+    """_is_label() для уже нормализованной строки (см. _normalize)."""
+    words = norm.split()
+    hits = _LABEL_KEYWORDS.intersection(words)
     if len(hits) >= 2:
         return True
-    if len(hits) == 1 and len(lower.split()) >= 3:
+    if len(hits) == 1 and len(words) >= 3:
         return True
     # Пустые строки и строки из одного короткого слова — не метки
     return False
@@ -126,340 +242,192 @@ def _strip_label(line: str, label_re: re.Pattern) -> str:
     return cleaned.strip(" :—–-\u2015\u2014")
 
 
-def _lines_from_text_annotation(ta: dict) -> list[str]:
-    """
-    Возвращает строки текста, упорядоченные по Y-координате (сверху вниз).
+# ---------------------------------------------------------------------------
+# Таблица строк документа
+# ---------------------------------------------------------------------------
 
-    Блоки OCR не всегда идут в правильном порядке чтения — Y-сортировка
-    обеспечивает корректную последовательность для двухколоночных документов.
+# Метки полей, найденные в строке (битовая маска _Line.labels)
+_L_KUZOV = 1 << 0
+_L_VIN = 1 << 1
+_L_BRAND_MODEL = 1 << 2
+_L_BRAND_ONLY = 1 << 3
+_L_MODEL_ONLY = 1 << 4
+_L_YEAR = 1 << 5
+_L_POWER = 1 << 6
+_L_PASSPORT = 1 << 7
+_L_VOLUME = 1 << 8
 
-    Args:
-        ta: textAnnotation из ответа Vision OCR.
 
-    Returns:
-        Список строк, упорядоченных по вертикали.
+def _classify_labels(norm: str) -> int:
     """
-    rows: list[tuple[int, str]] = []
-    for block in ta.get("blocks", []):
-        for line in block.get("lines", []):
-            text = line.get("text", "").strip()
-            if not text:
-                continue
-            verts = line.get("boundingBox", {}).get("vertices", [])
-            ys = [int(v.get("y", 0)) for v in verts if "y" in v]
-            y_mid = sum(ys) // len(ys) if ys else 0
-            rows.append((y_mid, text))
-    rows.sort(key=lambda r: r[0])
-    return [text for _, text in rows]
+    Определяет, метки каких полей есть в нормализованной строке.
 
+    Регулярные выражения запускаются только после дешёвой проверки
+    подстроки — большинство строк документа не похожи ни на одну метку.
+    """
+    flags = 0
+    if "кузов" in norm and _KUZOV_RE.search(norm):
+        flags |= _L_KUZOV
+    if ("ификационный" in norm or "vin" in norm) and _VIN_LABEL_RE.search(
+        norm,
+    ):
+        flags |= _L_VIN
+    if "арка" in norm:
+        if "одель" in norm:
+            if _BRAND_MODEL_RE.search(norm):
+                flags |= _L_BRAND_MODEL
+        elif _BRAND_ONLY_VALUE_RE.match(norm):
+            flags |= _L_BRAND_ONLY
+    if "одель" in norm and _MODEL_ONLY_RE.match(norm):
+        flags |= _L_MODEL_ONLY
+    if "год" in norm and _YEAR_LABEL_RE.search(norm):
+        flags |= _L_YEAR
+    if "мощность" in norm:
+        flags |= _L_POWER
+    if "тс" in norm and _PASSPORT_LABEL_RE.search(norm):
+        flags |= _L_PASSPORT
+    if _VOLUME_LABEL_RE.search(norm):
+        flags |= _L_VOLUME
+    return flags
+
+
+class _Line:
+    """
+    Строка документа с признаками, посчитанными один раз.
+
+    Attributes:
+        raw: Текст строки из OCR.
+        norm: _normalize(raw) — нижний регистр, одиночные пробелы.
+        upper: raw в верхнем регистре (поиск VIN и номеров).
+        is_label: Строка похожа на подпись поля (см. _is_label).
+        labels: Битовая маска _L_* найденных меток полей.
+    """
 
-# ---------------------------------------------------------------------------
-# ---------------------------------------------------------------------------
-# Словари нормализации марок и моделей
-# ---------------------------------------------------------------------------
+    __slots__ = ("raw", "norm", "upper", "is_label", "labels", "_cleaned")
 
-# WMI (первые 3 символа VIN) → официальное название марки на латинице.
-# Используется как авторитетный источник при кириллической OCR-ошибке.
-_WMI_BRAND: dict[str, str] = {
-    # Skoda
-    "TMB": "SKODA", "TM8": "SKODA",
-    # AvtoVAZ / LADA
-    "XTA": "LADA", "XTT": "LADA", "X9F": "LADA",
-    # BMW
-    "WBA": "BMW", "WBY": "BMW", "WBS": "BMW", "WBW": "BMW",
-    # Mercedes-Benz
-    "WDB": "MERCEDES-BENZ", "WDD": "MERCEDES-BENZ",
-    "WDC": "MERCEDES-BENZ",
-    # Volkswagen
-    "WVW": "VOLKSWAGEN", "WV1": "VOLKSWAGEN",
-    "WV2": "VOLKSWAGEN", "WV3": "VOLKSWAGEN",
-    # Porsche
-    "WP0": "PORSCHE", "WP1": "PORSCHE",
-    # Audi
-    "WUA": "AUDI", "WAU": "AUDI",
-    # Smart
-    "WME": "SMART",
-    # MINI
-    "WMW": "MINI",
-    # Renault (France + Russia)
-    "VF1": "RENAULT", "VF3": "RENAULT", "VF7": "RENAULT",
-    "X7M": "RENAULT", "X7N": "RENAULT",
-    # Toyota (Japan + Russia)
-    "VNK": "TOYOTA", "JT2": "TOYOTA", "JT3": "TOYOTA",
-    "JT4": "TOYOTA", "SB1": "TOYOTA", "2T1": "TOYOTA",
-    # Nissan
-    "JN1": "NISSAN", "JN8": "NISSAN",
-    "5N1": "NISSAN", "3N1": "NISSAN",
-    # Honda
-    "JHM": "HONDA", "2HG": "HONDA", "1HG": "HONDA",
-    # Mazda
-    "JM1": "MAZDA", "JMZ": "MAZDA",
-    # Mitsubishi
-    "JA3": "MITSUBISHI", "JA4": "MITSUBISHI",
-    # Subaru
-    "JF1": "SUBARU", "JF2": "SUBARU",
-    # Suzuki
-    "JS1": "SUZUKI", "JS2": "SUZUKI", "JS3": "SUZUKI",
-    # Lexus
-    "JTH": "LEXUS", "JTJ": "LEXUS",
-    # Volvo
-    "YV1": "VOLVO", "YV4": "VOLVO",
-    # Ford
-    "1FA": "FORD", "1FB": "FORD", "1FC": "FORD",
-    "1FD": "FORD", "1FT": "FORD",
-    "WF0": "FORD",       # Ford Germany
-    "VS6": "FORD",       # Ford Spain
-    # Chevrolet
-    "1G1": "CHEVROLET", "LSG": "CHEVROLET",
-    # Opel
-    "WOL": "OPEL", "W0L": "OPEL",
-    # Hyundai
-    "KMH": "HYUNDAI", "5NP": "HYUNDAI",
-    # Kia
-    "KNA": "KIA", "KNА": "KIA",
-    # Daewoo / Chevrolet Korea
-    "KLA": "DAEWOO", "KLY": "DAEWOO",
-    # Haval / Great Wall
-    "LGW": "GREAT WALL", "X7L": "HAVAL",
-    # Chery
-    "LVV": "CHERY",
-    # Geely
-    "LSV": "GEELY", "L6T": "GEELY",
-    # Peugeot
-    "VF3": "PEUGEOT",
-    # Citroen
-    "VF7": "CITROEN",
-    # Tesla
-    "5YJ": "TESLA",
-    # Audi Russia-assembled
-    "XW8": "AUDI",
-    # Buick
-    "LGX": "BUICK",
-    # KAMAZ
-    "X89": "KAMAZ",
-    # UAZ
-    "XUF": "UAZ",
-    # Moskvich / АЗЛК
-    "XUU": "MOSKVICH",
-    # GAZ
-    "X96": "GAZ",
-}
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.norm = _normalize(raw)
+        self.upper = raw.upper()
+        self.is_label = _is_label_norm(self.norm)
+        self.labels = _classify_labels(self.norm)
+        self._cleaned: Optional[str] = None
 
-# Кириллические и OCR-ошибочные написания марок → корректное латинское.
-# Исчерпывающий список для рынка России.
-_BRAND_NORMALIZE: dict[str, str] = {
-    # Latin OCR errors
-    "RKODA": "SKODA",
-    "IKODA": "SKODA",
-    "SCODE": "SKODA",
-    "5KODA": "SKODA",
-    "МЕРСЕДЕС-БЕНЦ": "MERCEDES-BENZ",
-    # --- Cyrillic → Latin (полный список популярных марок) ---
-    # Европа
-    "ШКОДА": "SKODA",
-    "ФОЛЬКСВАГЕН": "VOLKSWAGEN",
-    "МЕРСЕДЕС": "MERCEDES-BENZ",
-    "МЕРСЕДЕС БЕНЦ": "MERCEDES-BENZ",
-    "БМВ": "BMW",
-    "АУДИ": "AUDI",
-    "ОПЕЛЬ": "OPEL",
-    "ПЕЖО": "PEUGEOT",
-    "СИТРОЕН": "CITROEN",
-    "СИТРOЕН": "CITROEN",
-    "ФИАТ": "FIAT",
-    "АЛЬФА РОМЕО": "ALFA ROMEO",
-    "АЛЬФА-РОМЕО": "ALFA ROMEO",
-    "СЕАТ": "SEAT",
-    "ВОЛЬВО": "VOLVO",
-    "СААБ": "SAAB",
-    "ПОРШЕ": "PORSCHE",
-    "ЛАМБОРДЖИНИ": "LAMBORGHINI",
-    "ФЕРРАРИ": "FERRARI",
-    "МАЗЕРАТИ": "MASERATI",
-    "БЕНТЛИ": "BENTLEY",
-    "РОЛЛС РОЙС": "ROLLS-ROYCE",
-    "РОЛЛС-РОЙС": "ROLLS-ROYCE",
-    "ЯГУАР": "JAGUAR",
-    "ЛЕНД РОВЕР": "LAND ROVER",
-    "ЛЭНД РОВЕР": "LAND ROVER",
-    "ЛЭНД-РОВЕР": "LAND ROVER",
-    "РЕЙНДЖ РОВЕР": "RANGE ROVER",
-    "МИНИ": "MINI",
-    "СМАРТ": "SMART",
-    # Франция
-    "РЕНО": "RENAULT",
-    "РЕНО ТРАК": "RENAULT TRUCKS",
-    # Швеция
-    "СКАНИЯ": "SCANIA",
-    # Германия-грузовики
-    "МАН": "MAN",
-    # Нидерланды-грузовики
-    "ДАФ": "DAF",
-    "ИВЕКО": "IVECO",
-    # Япония
-    "ТОЙОТА": "TOYOTA",
-    "ХОНДА": "HONDA",
-    "НИССАН": "NISSAN",
-    "МАЗДА": "MAZDA",
-    "СУБАРУ": "SUBARU",
-    "СУЗУКИ": "SUZUKI",
-    "МИЦУБИСИ": "MITSUBISHI",
-    "МИТСУБИСИ": "MITSUBISHI",
-    "МИТСУБИШИ": "MITSUBISHI",
-    "МИТЦУБИШИ": "MITSUBISHI",
-    "ИНФИНИТИ": "INFINITI",
-    "ЛЕКСУС": "LEXUS",
-    "АКУРА": "ACURA",
-    "АЦУРА": "ACURA",
-    "ДАЙХАЦУ": "DAIHATSU",
-    "ИСУЗУ": "ISUZU",
-    # США
-    "ФОРД": "FORD",
-    "ШЕВРОЛЕ": "CHEVROLET",
-    "ДЖИП": "JEEP",
-    "КРАЙСЛЕР": "CHRYSLER",
-    "КАДИЛЛАК": "CADILLAC",
-    "БУИК": "BUICK",
-    "ЛИНКОЛЬН": "LINCOLN",
-    "ДОДЖ": "DODGE",
-    "КРАЙСЕР": "CHRYSLER",
-    "ТЕСЛА": "TESLA",
-    # Корея
-    "ХУНДАЙ": "HYUNDAI",
-    "ХЁНДЭ": "HYUNDAI",
-    "ХЁНДАЙ": "HYUNDAI",
-    "ХЁНДЭЙ": "HYUNDAI",
-    "ХЭНДЭ": "HYUNDAI",
-    "ХЭНДАЙ": "HYUNDAI",
-    "КИА": "KIA",
-    "КИЯ": "KIA",
-    "ДЭХО": "DAEWOO",
-    "ДЭВУ": "DAEWOO",
-    "ДЭВОО": "DAEWOO",
-    "САНЙОНГ": "SSANGYONG",
-    "ССАНЙОНГ": "SSANGYONG",
-    "ССАНГЙОНГ": "SSANGYONG",
-    # Китай
-    "ЧЕРИ": "CHERY",
-    "ЧЭРИ": "CHERY",
-    "ДЖИЛИ": "GEELY",
-    "ХАВАЛ": "HAVAL",
-    "ХАВЭЙ": "HAVAL",
-    "ХЭВЭЙ": "HAVAL",
-    "ДЖЭК": "JAC",
-    "ДЖА СИ": "JAC",
-    "ЛИФАН": "LIFAN",
-    "ЧАНГАН": "CHANGAN",
-    "ДОНГФЕНГ": "DONGFENG",
-    "БЙД": "BYD",
-    "БЫД": "BYD",
-    "ЗОТЬЕ": "ZOTYE",
-    "ЗОТТИ": "ZOTYE",
-    "ГИИЛИ": "GEELY",
-    "ГРЕЙТ ВОЛ": "GREAT WALL",
-    "ГРЕЙТ ВОЛЛ": "GREAT WALL",
-    "ВЕЛИКАЯ СТЕНА": "GREAT WALL",
-    # Россия
-    "ЛАДА": "LADA",
-    "ВАЗ": "LADA",
-    "АВТОВАЗ": "LADA",
-    "УАЗ": "UAZ",
-    "ГАЗ": "GAZ",
-    "ГАЗЕЛЬ": "GAZ",
-    "КАМАЗ": "KAMAZ",
-    "МОСКВИЧ": "MOSKVICH",
-    "МОСКВИЧЪ": "MOSKVICH",
-    "ПАЗ": "PAZ",
-    "ЛАЗ": "LAZ",
-    "ЛИАЗ": "LIAZ",
-    "ЗИЛ": "ZIL",
-    "СОЛЛЕРС": "SOLLERS",
-    "ТАГАЗ": "TAGAZ",
-    "БОГДАН": "BOGDAN",
-}
+    @property
+    def cleaned(self) -> str:
+        """raw без OCR-артефактов (см. _clean_dashes), считается лениво."""
+        if self._cleaned is None:
+            self._cleaned = _clean_dashes(self.raw)
+        return self._cleaned
 
-# Кириллические названия моделей → корректное написание на латинице.
-_MODEL_NORMALIZE: dict[str, str] = {
-    # LADA
-    "ПРИОРА": "PRIORA",
-    "КАЛИНА": "KALINA",
-    "ГРАНТА": "GRANTA",
-    "ВЕСТА": "VESTA",
-    "НИВА": "NIVA",
-    "ЛАРГУС": "LARGUS",
-    "ИКСРЕЙ": "X-RAY",
-    "ИКС РЭЙ": "X-RAY",
-    "САМАРА": "SAMARA",
-    "СПУТНИК": "SPUTNIK",
-    # UAZ
-    "ПАТРИОТ": "PATRIOT",
-    "ХАНТЕР": "HUNTER",
-    "БУХАНКА": "BUKHANKA",
-    # Moskvich
-    "МОСКВИЧ": "MOSKVICH",
-    "СВЯТОГОР": "SVYATOGOR",
-    # GAZ (Volga)
-    "ВОЛГА": "VOLGA",
-    "ГАЗЕЛЬ": "GAZEL",
-    # Generic
-    "НИССАН": "NISSAN",  # если модель написана как марка
-}
 
-# Таблица транслитерации кириллица → латиница (ГОСТ 7.79-2000 / ISO 9).
-# Используется как последний резерв при невозможности найти бренд в словаре.
-_TRANSLIT: dict[str, str] = {
-    "А": "A", "Б": "B", "В": "V", "Г": "G", "Д": "D",
-    "Е": "E", "Ё": "YO", "Ж": "ZH", "З": "Z", "И": "I",
-    "Й": "Y", "К": "K", "Л": "L", "М": "M", "Н": "N",
-    "О": "O", "П": "P", "Р": "R", "С": "S", "Т": "T",
-    "У": "U", "Ф": "F", "Х": "KH", "Ц": "TS", "Ч": "CH",
-    "Ш": "SH", "Щ": "SHCH", "Ъ": "", "Ы": "Y", "Ь": "",
-    "Э": "E", "Ю": "YU", "Я": "YA",
-    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d",
-    "е": "e", "ё": "yo", "ж": "zh", "з": "z", "и": "i",
-    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n",
-    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
-    "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch",
-    "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "",
-    "э": "e", "ю": "yu", "я": "ya",
-}
+class _LineTable:
+    """
+    Таблица строк одного документа — общая для всех экстракторов.
 
+    Строится за один проход по строкам: нормализация, классификация меток
+    и индекс «метка → номера строк». Экстракторы находят свою метку
+    поиском в индексе, а значение рядом с ней — запросом к layout
+    (справа в том же ряду или ниже в той же колонке), а не перебором
+    окна следующих строк. Номера строк таблицы и layout совпадают.
+    """
 
-# Таблица Latin-гомоглифов кириллицы: OCR читает кирилличный символ как
-# похожий латинский. Используется для детекции «ложно-латинских» строк.
-_HOMOGLYPH_CYR_TO_LAT: dict[str, str] = {
-    "А": "A", "В": "B", "Е": "E", "З": "3", "К": "K",
-    "М": "M", "Н": "H", "О": "O", "Р": "P", "С": "C",
-    "Т": "T", "У": "Y", "Х": "X",
-}
-_HOMOGLYPH_LAT_TO_CYR: dict[str, str] = {
-    v: k for k, v in _HOMOGLYPH_CYR_TO_LAT.items()
-}
+    __slots__ = (
+        "layout", "lines", "texts", "full_text", "_index",
+        "_full_upper", "_cleaned_full_lines", "deadline", "report",
+    )
 
+    def __init__(
+        self,
+        layout: LineLayout,
+        full_text: str = "",
+        deadline: Optional[float] = None,
+        report: Optional["ParseReport"] = None,
+    ):
+        self.deadline = deadline
+        self.report = report
+        self.layout = layout
+        texts = layout.texts
+        self.texts = texts
+        self.full_text = full_text
+        self.lines = [_Line(text) for text in texts]
+        self._index: dict[int, list[int]] = {}
+        for i, line in enumerate(self.lines):
+            flags = line.labels
+            while flags:
+                bit = flags & -flags
+                self._index.setdefault(bit, []).append(i)
+                flags ^= bit
+        self._full_upper: Optional[str] = None
+        self._cleaned_full_lines: Optional[list[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def allow(self, stage: str) -> bool:
+        """
+        Можно ли запускать дорогой фолбэк stage в рамках бюджета разбора.
+
+        Пропущенный этап записывается в report.skipped.
+        """
+        if self.deadline is None or time.monotonic() < self.deadline:
+            return True
+        if self.report is not None:
+            self.report.skipped.append(stage)
+        return False
 
-def _decode_homoglyphs(text: str) -> str:
-    """
-    Преобразует строку с Latin-гомоглифами в кириллицу.
+    def near(self, index: int, rows: int) -> Iterator[int]:
+        """Строки-кандидаты в значение подписи index (LineLayout.near)."""
+        return self.layout.near(index, rows)
+
+    def first(self, label: int) -> Optional[int]:
+        """Номер первой строки с меткой label или None."""
+        found = self._index.get(label)
+        return found[0] if found else None
+
+    def indices(self, labels: int) -> list[int]:
+        """Номера строк, где есть хотя бы одна из меток labels, по порядку."""
+        found: list[int] = []
+        while labels:
+            bit = labels & -labels
+            found.extend(self._index.get(bit, ()))
+            labels ^= bit
+        return sorted(set(found))
+
+    @property
+    def full_upper(self) -> str:
+        """fullText в верхнем регистре."""
+        if self._full_upper is None:
+            self._full_upper = self.full_text.upper()
+        return self._full_upper
+
+    @property
+    def cleaned_full_lines(self) -> list[str]:
+        """Строки fullText после _clean_dashes (номер СТС внизу бланка)."""
+        if self._cleaned_full_lines is None:
+            self._cleaned_full_lines = (
+                _clean_dashes(self.full_text).splitlines()
+            )
+        return self._cleaned_full_lines
 
-    OCR нередко читает кириллические буквы как похожие латинские
-    (Р→P, Е→E, Н→H, О→O). Если вся строка может быть
-    интерпретирована как кириллическая через гомоглифы, возвращает
-    её кириллический вариант. Иначе возвращает исходную строку.
 
-    Args:
-        text: Строка с возможными Latin-гомоглифами кириллицы.
+# ---------------------------------------------------------------------------
+# ---------------------------------------------------------------------------
+# Словари нормализации марок и моделей
+# ---------------------------------------------------------------------------
 
-    Returns:
-        Кириллическая строка, если конверсия имеет смысл, иначе исходная.
-    """
-    upper = text.upper()
-    cyrillic_candidate = "".join(
-        _HOMOGLYPH_LAT_TO_CYR.get(c, c) for c in upper
-    )
-    # Проверяем: если хотя бы один символ был заменён → возвращаем вариант
-    if cyrillic_candidate != upper:
-        return cyrillic_candidate
-    return text
+# WMI → марка, написания марок и моделей и нечёткие индексы по ним —
+# в справочнике ocr/data/ (refdata.py); загружаются при первом разборе,
+# а не при импорте модуля
+
+# Цифры, которые OCR ставит вместо похожих латинских букв в марке
+_OCR_DIGIT_TO_LATIN = str.maketrans("0158", "OISB")
+
+# Latin-гомоглифы кириллицы → кириллица, транслитерация (ГОСТ 7.79-2000)
+# и снятие диакритики — таблицами str.translate из charmap.py
+_decode_homoglyphs = decode_homoglyphs
+_transliterate = transliterate
+_normalize_latin = strip_diacritics
 
 
 def _is_cyrillic_dominant(text: str) -> bool:
@@ -484,35 +452,19 @@ def _is_cyrillic_dominant(text: str) -> bool:
     return cyrillic / len(alpha) > 0.4
 
 
-def _transliterate(text: str) -> str:
-    """
-    Транслитерирует кириллицу в латиницу (ГОСТ 7.79-2000).
-
-    Используется как последний резерв — даёт фонетическое написание,
-    не официальное. Например, «РЕНО» → «RENO» (не «RENAULT»).
-
-    Args:
-        text: Строка с кириллическими символами.
-
-    Returns:
-        Транслитерированная строка в верхнем регистре.
-    """
-    result = []
-    for char in text:
-        result.append(_TRANSLIT.get(char, char))
-    return "".join(result).upper()
-
-
 def _normalize_brand(brand: str, vin: str) -> str:
     """
     Нормализует марку: устраняет кириллицу и OCR-ошибки.
 
     Порядок попыток:
-    1. Прямое совпадение в словаре _BRAND_NORMALIZE (Cyrillic + Latin fixes).
-    2. WMI (первые 3 символа VIN) — авторитетный источник без ограничений,
-       если бренд всё ещё кириллический.
+    1. Прямое совпадение в словаре написаний марок (Cyrillic + Latin fixes).
+    2. WMI (первые 3 символа VIN, см. WMIIndex.brand_for_vin) —
+       авторитетный источник без ограничений, если бренд всё ещё
+       кириллический.
     3. WMI с Левенштейном ≤1 — для Latin OCR-опечаток (RKODA → SKODA).
-    4. Транслитерация — последний резерв, если бренд кириллический.
+    4. Нечёткий поиск по всем маркам и алиасам (refdata.brand_index) —
+       для опечаток без VIN (T0Y0TA → TOYOTA).
+    5. Транслитерация — последний резерв, если бренд кириллический.
 
     Args:
         brand: Извлечённая марка (может быть кириллической или с опечаткой).
@@ -524,30 +476,42 @@ def _normalize_brand(brand: str, vin: str) -> str:
     if not brand:
         return brand
 
-    upper = brand.upper().strip()
+    # Ключ словаря: верхний регистр, без диакритики и OCR-тире
+    upper = fold(brand)
 
     # 1. Словарь нормализации (кириллица + Latin OCR-ошибки)
-    if upper in _BRAND_NORMALIZE:
-        return _BRAND_NORMALIZE[upper]
+    aliases = brand_aliases()
+    if upper in aliases:
+        return aliases[upper]
 
     # 2. Детекция Latin-гомоглифов кириллицы («PEHO» = «РЕНО»):
     #    OCR читает кирилл. буквы (Р,Е,Н,О) как похожие латинские (P,E,H,O).
     #    Раскодируем и проверяем словарь.
     decoded = _decode_homoglyphs(upper)
-    if decoded != upper and decoded in _BRAND_NORMALIZE:
-        return _BRAND_NORMALIZE[decoded]
+    if decoded != upper and decoded in aliases:
+        return aliases[decoded]
 
     # 3. WMI-авторитет (без ограничений расстояния, если бренд кириллический)
-    wmi = vin[:3].upper() if len(vin) >= 3 else ""
-    if wmi and wmi in _WMI_BRAND:
-        wmi_brand = _WMI_BRAND[wmi]
+    wmi_brand = wmi_index().brand_for_vin(vin) if len(vin) >= 3 else None
+    if wmi_brand is not None:
         if _is_cyrillic_dominant(upper):
             return wmi_brand
         # 4. WMI для Latin-опечаток (одна буква отличается)
-        if _levenshtein_short(upper, wmi_brand) <= 1:
+        if levenshtein(upper, wmi_brand) <= 1:
             return wmi_brand
 
-    # 5. Транслитерация — если бренд всё ещё кириллический
+    # 5. Ближайшая марка или алиас (однозначно, в пределах _fuzzy_limit);
+    #    цифры-двойники букв сначала заменяются: T0Y0TA → TOYOTA
+    if upper in canonical_brands():
+        return brand
+    query = upper.translate(_OCR_DIGIT_TO_LATIN)
+    limit = _fuzzy_limit(query)
+    if limit:
+        match = brand_index().best(query, limit)
+        if match is not None:
+            return match
+
+    # 6. Транслитерация — если бренд всё ещё кириллический
     if _is_cyrillic_dominant(upper):
         return _transliterate(upper)
 
@@ -558,8 +522,10 @@ def _normalize_model(model: str) -> str:
     """
     Нормализует модель: убирает кириллицу из известных названий моделей.
 
-    Для моделей, не попавших в словарь, применяется транслитерация
-    к каждому кириллическому слову.
+    Кириллическая модель с OCR-опечаткой ищется в словаре нечётко
+    (refdata.model_index); для остальных применяется транслитерация
+    к каждому кириллическому слову. Латинские модели не исправляются:
+    рядом со словарными много настоящих (VISTA — не VESTA).
 
     Args:
         model: Извлечённое название модели.
@@ -570,23 +536,35 @@ def _normalize_model(model: str) -> str:
     if not model:
         return model
 
-    upper = model.upper().strip()
+    upper = fold(model)
 
     # Прямое совпадение в словаре моделей
-    if upper in _MODEL_NORMALIZE:
-        return _MODEL_NORMALIZE[upper]
+    aliases = model_aliases()
+    if upper in aliases:
+        return aliases[upper]
 
     # Если не чисто кириллическая — возвращаем как есть
     if not _is_cyrillic_dominant(upper):
         return model
 
+    limit = _fuzzy_limit(upper)
+    if limit:
+        match = model_index().best(upper, limit)
+        if match is not None:
+            return match
+
     # Транслитерируем кириллические слова по одному
     words = model.split()
     result_words = []
     for word in words:
-        w_upper = word.upper()
-        if w_upper in _MODEL_NORMALIZE:
-            result_words.append(_MODEL_NORMALIZE[w_upper])
+        w_upper = fold(word)
+        if w_upper in aliases:
+            result_words.append(aliases[w_upper])
+            continue
+        limit = _fuzzy_limit(w_upper)
+        match = model_index().best(w_upper, limit) if limit else None
+        if match is not None:
+            result_words.append(match)
         elif _is_cyrillic_dominant(word):
             result_words.append(_transliterate(word))
         else:
@@ -594,94 +572,91 @@ def _normalize_model(model: str) -> str:
     return " ".join(result_words)
 
 
-def _levenshtein_short(a: str, b: str) -> int:
-    """Расстояние Левенштейна для коротких строк (≤15 символов)."""
-    if len(a) > 15 or len(b) > 15:
-        return abs(len(a) - len(b))
-    if not a:
-        return len(b)
-    if not b:
-        return len(a)
-    prev = list(range(len(b) + 1))
-    for i, ca in enumerate(a):
-        curr = [i + 1]
-        for j, cb in enumerate(b):
-            curr.append(min(
-                prev[j + 1] + 1,
-                curr[j] + 1,
-                prev[j] + (ca != cb),
-            ))
-        prev = curr
-    return prev[-1]
+def _fuzzy_limit(word: str) -> int:
+    """
+    Допустимое число правок для нечёткого поиска марки/модели.
+
+    Короткие слова не исправляются (у «KIA» и «BYD» слишком много
+    соседей), до 7 букв — одна правка, длиннее — две.
+    """
+    if len(word) < 4:
+        return 0
+    if len(word) <= 7:
+        return 1
+    return 2
 
 
 # Алиасы для обратной совместимости (используются в parse_sts)
 _correct_brand = _normalize_brand
 
 
-def _normalize_latin(text: str) -> str:
-    """
-    Нормализует латинский текст: убирает диакритику.
+# ---------------------------------------------------------------------------
+# Экстракторы полей
+# ---------------------------------------------------------------------------
 
-    Например: «PRÍORA» → «PRIORA», «ÑOTION» → «NOTION».
+def _extract_vin(doc: _LineTable) -> str:
     """
-    import unicodedata
-    nfkd = unicodedata.normalize("NFKD", text)
-    return "".join(c for c in nfkd if not unicodedata.combining(c))
+    Извлекает VIN и исправляет ошибки OCR в нём (vin.repair).
 
+    Найденный VIN с неверным обязательным контрольным символом
+    исправляется заменами B/8, S/5, Z/2, G/6. Если VIN не найден,
+    берётся 17-символьный токен с I, O или Q из полного текста:
+    OCR читает 1 и 0 как буквы, которых в VIN не бывает.
+    """
+    vin = _find_vin(doc)
+    if vin:
+        return repair_vin(vin) or vin
+    if doc.allow("vin_repair"):
+        for m in _VIN_LOOSE_RE.finditer(doc.full_upper):
+            token = m.group()
+            if sum(c.isdigit() for c in token) < _VIN_MIN_DIGITS:
+                continue
+            fixed = repair_vin(token)
+            if fixed:
+                return fixed
+    return ""
 
-# ---------------------------------------------------------------------------
-# Экстракторы полей
-# ---------------------------------------------------------------------------
 
-def _extract_vin(full_text: str, lines: list[str]) -> str:
+def _find_vin(doc: _LineTable) -> str:
     """
-    Извлекает VIN из текста.
+    Ищет VIN в тексте.
 
     Стратегия (по приоритету):
-    1. 17-символьный VIN в строке после метки «Кузов» — наиболее надёжный
-       источник, так как Кузов-поле дублирует VIN полностью.
-    2. 17-символьный VIN после метки «Идентификационный номер» (VIN-поле).
+    1. 17-символьный VIN рядом с меткой «Кузов» (справа или ниже) —
+       наиболее надёжный источник, так как Кузов-поле дублирует VIN.
+    2. 17-символьный VIN рядом с меткой «Идентификационный номер».
     3. Первый попавшийся 17-символьный VIN в полном тексте.
     4. Сборка из фрагментов рядом с меткой VIN.
     """
-    vin_label_re = re.compile(
-        r'(?:и|дент|ент|нт)?ификационный\s+номер|vin\b',
-        re.IGNORECASE,
-    )
-    kuzov_re = re.compile(
-        r'кузов\s*(?:\([^)]*\))?\s*(?:—|–|№|\u2014|\u2015)?',
-        re.IGNORECASE,
-    )
+    lines = doc.lines
 
     # 1. Кузов → самый чистый источник VIN
-    for i, line in enumerate(lines):
-        if kuzov_re.search(_normalize(line)):
-            inline = _strip_label(line, kuzov_re)
-            if inline:
-                m = _VIN_RE.search(inline.upper())
-                if m:
-                    return m.group()
-            for candidate in lines[i + 1 : i + 3]:
-                m = _VIN_RE.search(candidate.upper())
-                if m:
-                    return m.group()
-            break
+    i = doc.first(_L_KUZOV)
+    if i is not None:
+        inline = _strip_label(lines[i].raw, _KUZOV_RE)
+        if inline:
+            m = _VIN_RE.search(inline.upper())
+            if m:
+                return m.group()
+        for j in doc.near(i, 2):
+            m = _VIN_RE.search(lines[j].upper)
+            if m:
+                return m.group()
 
-    # 2. VIN-метка → строки сразу после неё
-    for i, line in enumerate(lines):
-        if not vin_label_re.search(_normalize(line)):
-            continue
+    # 2. VIN-метка → значение справа от неё или ниже
+    i = doc.first(_L_VIN)
+    if i is not None:
+        near = list(doc.near(i, 5))
         # Сначала ищем чистый 17-символьный VIN
-        for candidate in lines[i + 1 : i + 6]:
-            m = _VIN_RE.search(candidate.upper())
+        for j in near:
+            m = _VIN_RE.search(lines[j].upper)
             if m:
                 return m.group()
-        # Не нашли — пробуем склеить фрагменты,
-        # сортируя их по X-позиции (нет данных, склеиваем по X-порядку)
+        # Не нашли — пробуем склеить фрагменты: near отдаёт их по рядам,
+        # в ряду — слева направо
         fragments: list[str] = []
-        for candidate in lines[i + 1 : i + 5]:
-            chunk = re.sub(r'[^A-Z0-9]', '', candidate.upper())
+        for j in near:
+            chunk = _NON_ALNUM_RE.sub('', lines[j].upper)
             if 3 <= len(chunk) <= 14:
                 fragments.append(chunk)
             if sum(len(f) for f in fragments) >= 17:
@@ -693,17 +668,17 @@ def _extract_vin(full_text: str, lines: list[str]) -> str:
                 m = _VIN_RE.search(joined)
                 if m:
                     return m.group()
-        break
 
     # 3. Первый 17-символьный VIN в полном тексте
-    m = _VIN_RE.search(full_text.upper())
-    if m:
-        return m.group()
+    if doc.allow("vin_fulltext"):
+        m = _VIN_RE.search(doc.full_upper)
+        if m:
+            return m.group()
 
     return ""
 
 
-def _extract_brand_model(lines: list[str]) -> tuple[str, str]:
+def _extract_brand_model(doc: _LineTable) -> tuple[str, str]:
     """
     Извлекает марку и модель транспортного средства.
 
@@ -717,29 +692,16 @@ def _extract_brand_model(lines: list[str]) -> tuple[str, str]:
     Returns:
         (brand, model)
     """
-    # Учитываем OCR-обрезку: «арка» вместо «Марка», «одель» вместо «Модель»
-    brand_model_re = re.compile(
-        r'(?:[Мм])?арка\s*,?\s*(?:[Мм])?одель\b',
-        re.IGNORECASE,
-    )
-    brand_only_re = re.compile(
-        r'^(?:[Мм])?арка\s+',
-        re.IGNORECASE,
-    )
-    model_only_re = re.compile(
-        r'^(?:[Мм])?одель\s+',
-        re.IGNORECASE,
-    )
-
+    lines = doc.lines
     brand = ""
     model = ""
 
-    for i, line in enumerate(lines):
-        norm = _normalize(line)
+    for i in doc.indices(_L_BRAND_MODEL | _L_BRAND_ONLY):
+        line = lines[i]
 
         # «Марка, модель [ЗНАЧЕНИЕ]» или «арка, модель [ЗНАЧЕНИЕ]»
-        if brand_model_re.search(norm):
-            inline = _strip_label(line, brand_model_re)
+        if line.labels & _L_BRAND_MODEL:
+            inline = _strip_label(line.raw, _BRAND_MODEL_RE)
             if inline and not _is_label(inline):
                 # Есть значение на той же строке
                 cyrillic_value = inline
@@ -759,21 +721,19 @@ def _extract_brand_model(lines: list[str]) -> tuple[str, str]:
             break
 
         # «Марка BRAND» (без «модель» на той же строке)
-        if re.match(r'^(?:[мМ])?арка\s+\S', norm) and (
-            "одель" not in norm
-        ):
-            inline = _strip_label(line, brand_only_re)
-            if inline and not _is_label(inline):
-                brand = inline.split()[0]
-            # Ищем «Модель» поблизости
-            for next_line in lines[i + 1 : i + 6]:
-                if model_only_re.match(_normalize(next_line)):
-                    raw_model = _strip_label(next_line, model_only_re)
-                    # Убираем дублирование марки в начале
-                    model = _remove_leading_brand(raw_model, brand)
-                    break
-            if brand:
+        inline = _strip_label(line.raw, _BRAND_ONLY_RE)
+        if inline and not _is_label(inline):
+            parts = inline.split()
+            brand = " ".join(parts[:_brand_word_count(parts)])
+        # Ищем «Модель» поблизости
+        for next_line in lines[i + 1 : i + 6]:
+            if next_line.labels & _L_MODEL_ONLY:
+                raw_model = _strip_label(next_line.raw, _MODEL_ONLY_RE)
+                # Убираем дублирование марки в начале
+                model = _remove_leading_brand(raw_model, brand)
                 break
+        if brand:
+            break
 
     brand = _clean_brand_model(brand)
     # _normalize_latin убирает диакритику (PRÍORA → PRIORA);
@@ -783,7 +743,7 @@ def _extract_brand_model(lines: list[str]) -> tuple[str, str]:
 
 
 def _find_latin_brand_nearby(
-    lines: list[str],
+    lines: list[_Line],
     start: int,
     window: int = 5,
 ) -> str:
@@ -799,15 +759,15 @@ def _find_latin_brand_nearby(
         Строку с латинским написанием или пустую строку.
     """
     for line in lines[start : start + window]:
-        if _is_label(line):
+        if line.is_label:
             continue
-        if _is_latin_dominant(line) and re.search(r'[A-Z]{2,}', line):
-            return line.strip()
+        if _is_latin_dominant(line.raw) and _LATIN_WORD_RE.search(line.raw):
+            return line.raw.strip()
     return ""
 
 
 def _collect_value_lines(
-    lines: list[str],
+    lines: list[_Line],
     start: int,
     window: int = 5,
 ) -> list[str]:
@@ -824,30 +784,49 @@ def _collect_value_lines(
     """
     result = []
     for line in lines[start : start + window]:
-        if not line.strip():
+        if not line.raw.strip():
             continue
-        if _is_label(line):
+        if line.is_label:
             break  # Следующая метка → значение закончилось
-        result.append(line.strip())
+        result.append(line.raw.strip())
     return result
 
 
+def _brand_word_count(parts: list[str]) -> int:
+    """
+    Сколько первых слов занимает марка: 1 или больше, если с них
+    начинается марка из нескольких слов (GREAT WALL, ЛЕНД РОВЕР).
+    """
+    names = multiword_brands()
+    for count in range(min(len(parts), _MAX_BRAND_WORDS), 1, -1):
+        if fold(" ".join(parts[:count])) in names:
+            return count
+    return 1
+
+
 def _split_brand_model(value: str) -> tuple[str, str]:
     """
     Разделяет строку «БРЕНД МОДЕЛЬ» на бренд и модель.
 
-    Первое слово = бренд, остальное = модель.
+    Первое слово = бренд (или несколько — для марок из справочника
+    вроде GREAT WALL), остальное = модель.
     Для «LADA 217230 LADA PRIORA» → brand=LADA, model=PRIORA
-    (числовой код и дублирование марки убираются).
+    (числовой код перед моделью и дублирование марки убираются);
+    цифры в самой модели остаются: «CHERY TIGGO 7», «PEUGEOT 308».
     """
     parts = value.strip().split()
     if not parts:
         return "", ""
-    brand = parts[0]
-    rest = parts[1:]
-
-    # Убираем числовые коды (типа «217230»)
-    rest = [p for p in rest if not re.match(r'^\d+$', p)]
+    count = _brand_word_count(parts)
+    brand = " ".join(parts[:count])
+    rest = parts[count:]
+
+    # Убираем числовой код типа «217230» перед названием модели
+    codes = 0
+    while codes < len(rest) and _DIGITS_ONLY_RE.match(rest[codes]):
+        codes += 1
+    if codes < len(rest):
+        rest = rest[codes:]
     # Убираем дублирование марки в начале модели
     if rest and rest[0].upper() == brand.upper():
         rest = rest[1:]
@@ -872,29 +851,28 @@ def _remove_leading_brand(model: str, brand: str) -> str:
 def _clean_brand_model(value: str) -> str:
     """Убирает OCR-артефакты из значения марки/модели."""
     value = value.strip(" '\"—–-\u2015\u2014")
-    value = re.sub(r'\btдц\b|\u2015', '', value, flags=re.IGNORECASE).strip()
+    value = _BRAND_ARTIFACT_RE.sub('', value).strip()
     return value
 
 
-def _extract_year(lines: list[str]) -> str:
+def _extract_year(doc: _LineTable) -> str:
     """
     Извлекает год выпуска.
 
-    Ищет строку с меткой «Год выпуска», затем первый 4-значный год рядом.
+    Ищет строку с меткой «Год выпуска», затем первый 4-значный год рядом
+    с ней: в той же строке, справа или ниже.
     """
-    year_label_re = re.compile(r'год\s+вы[пп]', re.IGNORECASE)
-
-    for i, line in enumerate(lines):
-        if not year_label_re.search(_normalize(line)):
-            continue
-        m = _YEAR_RE.search(line)
+    lines = doc.texts
+    i = doc.first(_L_YEAR)
+    if i is not None:
+        m = _YEAR_RE.search(lines[i])
         if m:
             return m.group()
-        for candidate in lines[i + 1 : i + 3]:
-            m = _YEAR_RE.search(candidate)
+        for j in doc.near(i, 2):
+            m = _YEAR_RE.search(lines[j])
             if m:
                 return m.group()
-        break  # Метку нашли, год не нашли — не ищем дальше
+        # Метку нашли, год не нашли — не ищем дальше
 
     # Fallback: любой год в тексте в разумном диапазоне
     for line in lines:
@@ -904,7 +882,7 @@ def _extract_year(lines: list[str]) -> str:
     return ""
 
 
-def _extract_engine_power(lines: list[str]) -> str:
+def _extract_engine_power(doc: _LineTable) -> str:
     """
     Извлекает мощность двигателя в л.с.
 
@@ -912,17 +890,18 @@ def _extract_engine_power(lines: list[str]) -> str:
     Возвращает значение л.с. (вторая часть после «/»), округлённое
     до целого, если это .0, иначе как есть.
     """
-    power_label_re = re.compile(r'мощность', re.IGNORECASE)
+    lines = doc.texts
 
-    # Ищем рядом с меткой «Мощность»
-    for i, line in enumerate(lines):
-        if not power_label_re.search(_normalize(line)):
-            continue
-        for candidate in [line] + lines[i + 1 : i + 3]:
-            m = _POWER_RE.search(candidate)
+    # Ищем в строке «Мощность», справа от неё или ниже
+    i = doc.first(_L_POWER)
+    if i is not None:
+        m = _POWER_RE.search(lines[i])
+        if m:
+            return _format_hp(m.group(2))
+        for j in doc.near(i, 2):
+            m = _POWER_RE.search(lines[j])
             if m:
                 return _format_hp(m.group(2))
-        break
 
     # Fallback: ищем паттерн кВт/л.с. везде
     for line in lines:
@@ -960,14 +939,14 @@ def _pts_line_is_noise(line: str) -> bool:
     return any(x in low for x in noise)
 
 
-def _cert_last_six_digits(full_text: str, entities: dict) -> str:
+def _cert_last_six_digits(doc: _LineTable, entities: dict) -> str:
     """
     Возвращает последние 6 цифр номера СТС (NN NN NNNNNN).
 
     Нужно, чтобы не принимать хвост СТС за номер ПТС (частая путаница OCR).
 
     Args:
-        full_text: Полный текст документа.
+        doc: Таблица строк документа (нужен fullText).
         entities: entities из textAnnotation (phone часто = номер СТС).
 
     Returns:
@@ -975,11 +954,10 @@ def _cert_last_six_digits(full_text: str, entities: dict) -> str:
     """
     phone_val = entities.get("phone", "").strip()
     if phone_val:
-        only_digits = re.sub(r'\D', '', phone_val)
+        only_digits = _NON_DIGIT_RE.sub('', phone_val)
         if len(only_digits) == 10:
             return only_digits[4:]
-    cleaned = _clean_dashes(full_text)
-    lines = cleaned.splitlines()
+    lines = doc.cleaned_full_lines
     for line in reversed(lines):
         m = _CERT_RE.search(line)
         if m:
@@ -987,11 +965,45 @@ def _cert_last_six_digits(full_text: str, entities: dict) -> str:
     # Разбитый OCR: последняя строка из 6 цифр внизу бланка — хвост СТС
     for line in reversed(lines[-8:]):
         stripped = line.strip()
-        if re.match(r'^\d{6}$', stripped):
+        if _ONLY_SIX_DIGITS_RE.match(stripped):
             return stripped
     return ""
 
 
+def _eco_lines(full_text: str):
+    """
+    Строки со словом «экологическ…»: (конец слова, конец строки).
+
+    Одна пара на строку — за один проход по тексту, сколько бы раз
+    слово ни повторялось в строке.
+    """
+    line_end = -1
+    for m in _ECO_KEYWORD_RE.finditer(full_text):
+        if m.start() < line_end:
+            continue
+        line_end = full_text.find("\n", m.end())
+        if line_end < 0:
+            line_end = len(full_text)
+        yield m.end(), line_end
+
+
+def _last_six_digits(text: str, start: int, end: int) -> Optional[re.Match]:
+    """Последнее отдельное 6-значное число в text[start:end]."""
+    last = None
+    for last in _SIX_DIGITS_RE.finditer(text, start, end):
+        pass
+    return last
+
+
+def _eco_line_tail(full_text: str) -> str:
+    """Последние 6 цифр первой строки «Экологический класс …», где они есть."""
+    for start, end in _eco_lines(full_text):
+        m = _last_six_digits(full_text, start, end)
+        if m:
+            return m.group(1)
+    return ""
+
+
 def _try_pts_reconstruct_from_eco_glitch(
     full_text: str,
     cert_last_six: str,
@@ -1012,42 +1024,33 @@ def _try_pts_reconstruct_from_eco_glitch(
     """
     if not full_text:
         return ""
-    m_eco = re.search(
-        r'экологическ[^\n]*\b(\d{6})\b',
-        full_text,
-        re.IGNORECASE,
-    )
-    if not m_eco:
-        return ""
-    tail = m_eco.group(1)
-    if not tail.isdigit():
+    tail = _eco_line_tail(full_text)
+    if not tail:
         return ""
     # Класс экологичности — обычно 1–6 (EU), не шестизначное число
     if int(tail) <= 30:
         return ""
     if cert_last_six and tail == cert_last_six:
         return ""
-    if not re.search(r'Паспорт\s+ТС', full_text, re.IGNORECASE):
+    if not _PASSPORT_TS_RE.search(full_text):
         return ""
     # Порядок: строка с хвостом на «экологическ», затем 74/77, затем Паспорт ТС
-    m_order = re.search(
-        rf'экологическ[^\n]*\b{re.escape(tail)}\s*\n\s*(74|77)\s*\n\s*'
-        rf'Паспорт\s+ТС',
-        full_text,
-        re.IGNORECASE,
-    )
-    if not m_order:
+    for start, end in _eco_lines(full_text):
+        m = _last_six_digits(full_text, start, end)
+        if (
+            m and m.group(1) == tail
+            and not full_text[m.end():end].strip()
+            and _ECO_ORDER_RE.match(full_text, m.end())
+        ):
+            break
+    else:
         return ""
     # Серия 77 + типичные буквы (МУ); при появлении полного шаблона в тексте —
     # parse_sts отдаст его через _PTS_RE раньше
     return f"77МУ{tail}"
 
 
-def _extract_pts(
-    lines: list[str],
-    full_text: str = "",
-    cert_last_six: str = "",
-) -> str:
+def _extract_pts(doc: _LineTable, cert_last_six: str = "") -> str:
     """
     Извлекает номер ПТС (паспорт транспортного средства).
 
@@ -1064,6 +1067,9 @@ def _extract_pts(
     Returns:
         Склеенная строка без пробелов, например «77МУ659376».
     """
+    full_text = doc.full_text
+    lines = doc.texts
+
     # 1. Полный шаблон по всему тексту (устойчив к порядку блоков OCR)
     if full_text:
         for m in _PTS_RE.finditer(full_text):
@@ -1074,26 +1080,27 @@ def _extract_pts(
                 continue
             return candidate
 
-    passport_idx: Optional[int] = None
-    for i, line in enumerate(lines):
-        norm = _normalize(line)
-        if not re.search(r'\bпас\w*\s+тс\b|\bптс\b', norm, re.IGNORECASE):
-            continue
-        passport_idx = i
+    passport_idx = doc.first(_L_PASSPORT)
+    if passport_idx is not None:
         # ПТС-паттерн на той же строке
-        m = _PTS_RE.search(line)
+        m = _PTS_RE.search(lines[passport_idx])
         if m:
             g3 = m.group(3)
             if cert_last_six and g3 == cert_last_six:
                 pass
             else:
                 return f"{m.group(1)}{m.group(2).upper()}{g3}"
-        break
 
     if passport_idx is None:
+        if not doc.allow("pts_fulltext"):
+            return ""
         return _extract_pts_from_fulltext(full_text, cert_last_six)
 
-    tail = lines[passport_idx + 1 : passport_idx + 80]
+    # Значение справа от подписи «Паспорт ТС» или под ней
+    tail = (
+        [lines[j] for j in doc.near(passport_idx, _PTS_ROWS)]
+        if doc.allow("pts_window") else []
+    )
 
     for candidate in tail:
         m = _PTS_RE.search(candidate)
@@ -1103,13 +1110,9 @@ def _extract_pts(
             return f"{m.group(1)}{m.group(2).upper()}{m.group(3)}"
 
     for j, candidate in enumerate(tail):
-        sm = re.search(
-            r'\b(\d{2})\s*([А-ЯЁA-Z]{2})\b',
-            candidate,
-            re.IGNORECASE,
-        )
+        sm = _PTS_SERIES_RE.search(candidate)
         if sm:
-            nm = re.search(r'\b(\d{6})\b', candidate)
+            nm = _SIX_DIGITS_RE.search(candidate)
             if nm:
                 if cert_last_six and nm.group(1) == cert_last_six:
                     pass
@@ -1118,7 +1121,7 @@ def _extract_pts(
                         f"{sm.group(1)}{sm.group(2).upper()}{nm.group(1)}"
                     )
             for nc in tail[j + 1 : j + 12]:
-                nm = re.search(r'\b(\d{6})\b', nc)
+                nm = _SIX_DIGITS_RE.search(nc)
                 if nm:
                     if cert_last_six and nm.group(1) == cert_last_six:
                         continue
@@ -1133,7 +1136,7 @@ def _extract_pts(
         if _pts_line_is_noise(candidate):
             continue
         stripped = candidate.strip()
-        if re.match(r'^\d{6}$', stripped):
+        if _ONLY_SIX_DIGITS_RE.match(stripped):
             if cert_last_six and stripped == cert_last_six:
                 continue
             six_digits.append(stripped)
@@ -1141,10 +1144,13 @@ def _extract_pts(
     if six_digits:
         return six_digits[-1]
 
-    from_full = _extract_pts_from_fulltext(full_text, cert_last_six)
-    if from_full:
-        return from_full
+    if doc.allow("pts_fulltext"):
+        from_full = _extract_pts_from_fulltext(full_text, cert_last_six)
+        if from_full:
+            return from_full
 
+    if not doc.allow("pts_eco_glitch"):
+        return ""
     return _try_pts_reconstruct_from_eco_glitch(full_text, cert_last_six)
 
 
@@ -1172,7 +1178,7 @@ def _extract_pts_from_fulltext(
         ln = ln.strip()
         if _pts_line_is_noise(ln):
             continue
-        if re.match(r'^\d{6}$', ln):
+        if _ONLY_SIX_DIGITS_RE.match(ln):
             if cert_last_six and ln == cert_last_six:
                 continue
             candidates.append(ln)
@@ -1187,25 +1193,18 @@ def _format_liters(value: float) -> str:
     return s.replace('.', ',')
 
 
-def _extract_engine_displacement_liters(
-    lines: list[str],
-    full_text: str,
-) -> str:
+def _extract_engine_displacement_liters(doc: _LineTable) -> str:
     """
     Извлекает рабочий объём двигателя в литрах.
 
     Ищет «1398 см³», «1398 см», «1,4 л», «1.4 л».
     """
-    text = full_text or "\n".join(lines)
+    text = doc.full_text or "\n".join(doc.texts)
     if not text:
         return ""
 
     # Явно в литрах
-    for m in re.finditer(
-        r'(\d{1,2}[,\.]\d{1,2})\s*(?:л|l)\b',
-        text,
-        re.IGNORECASE,
-    ):
+    for m in _LITERS_RE.finditer(text):
         try:
             v = float(m.group(1).replace(',', '.'))
             if 0.5 <= v <= 10.0:
@@ -1214,11 +1213,7 @@ def _extract_engine_displacement_liters(
             continue
 
     # Куб. см → литры
-    for m in re.finditer(
-        r'(\d{3,4})\s*(?:см\.?\s*[³3]|см\^?3|куб\.?\s*см)',
-        text,
-        re.IGNORECASE,
-    ):
+    for m in _CC_RE.finditer(text):
         try:
             cc = int(m.group(1))
             if 500 <= cc <= 10000:
@@ -1227,15 +1222,11 @@ def _extract_engine_displacement_liters(
         except ValueError:
             continue
 
-    for line in lines:
-        norm = _normalize(line)
-        if not re.search(r'объ[её]м|рабочий|двигател', norm):
-            continue
-        m = re.search(
-            r'(\d{1,2}[,\.]\d{1,2})\s*(?:л|l)\b',
-            line,
-            re.IGNORECASE,
-        )
+    if not doc.allow("volume_labels"):
+        return ""
+    for i in doc.indices(_L_VOLUME):
+        line = doc.texts[i]
+        m = _LITERS_RE.search(line)
         if m:
             try:
                 v = float(m.group(1).replace(',', '.'))
@@ -1243,7 +1234,7 @@ def _extract_engine_displacement_liters(
                     return _format_liters(v)
             except ValueError:
                 continue
-        m = re.search(r'(\d{3,4})\s*см', line, re.IGNORECASE)
+        m = _CC_LOOSE_RE.search(line)
         if m:
             cc = int(m.group(1))
             if 500 <= cc <= 10000:
@@ -1251,7 +1242,7 @@ def _extract_engine_displacement_liters(
     return ""
 
 
-def _extract_broken_sts_certificate_tail(cleaned: str) -> str:
+def _extract_broken_sts_certificate_tail(cleaned_lines: list[str]) -> str:
     """
     Собирает номер СТС из трёх строк при OCR-разрыве (частые одиночные цифры).
 
@@ -1264,24 +1255,20 @@ def _extract_broken_sts_certificate_tail(cleaned: str) -> str:
     → «99 70 308738».
 
     Args:
-        cleaned: Текст после _clean_dashes.
+        cleaned_lines: Строки текста после _clean_dashes.
 
     Returns:
         Строка «NN NN NNNNNN» или пустая строка.
     """
-    tail = "\n".join(cleaned.splitlines()[-15:])
-    m = re.search(
-        r'(?:^|\n)\s*(\d)\s+(\d)\s*\n\s*(\d{2})[^0-9\n]*\n\s*(\d{6})\s*(?:\n|$)',
-        tail,
-        re.MULTILINE,
-    )
+    tail = "\n".join(cleaned_lines[-15:])
+    m = _BROKEN_CERT_RE.search(tail)
     if not m:
         return ""
     return f"{m.group(1)}{m.group(2)} {m.group(3)} {m.group(4)}"
 
 
 def _extract_certificate(
-    full_text: str,
+    doc: _LineTable,
     entities: dict,
     pts_number: str = "",
 ) -> str:
@@ -1292,7 +1279,7 @@ def _extract_certificate(
     Формат: «99 16 777407».
 
     Args:
-        full_text: Полный текст документа.
+        doc: Таблица строк документа (нужен fullText).
         entities: Словарь entities из textAnnotation.
         pts_number: Уже найденный номер ПТС (6 цифр), чтобы не дублировать в СТС.
 
@@ -1302,7 +1289,7 @@ def _extract_certificate(
     # 1. Приоритет: entities["phone"] — Yandex видит номер СТС как телефон
     phone_val = entities.get("phone", "").strip()
     if phone_val:
-        only_digits = re.sub(r'\D', '', phone_val)
+        only_digits = _NON_DIGIT_RE.sub('', phone_val)
         if len(only_digits) == 10:
             return (
                 f"{only_digits[:2]} "
@@ -1311,23 +1298,25 @@ def _extract_certificate(
             )
 
     # 2. Очищаем от OCR-артефактов и ищем паттерн NN NN NNNNNN
-    cleaned = _clean_dashes(full_text)
     # Ищем с конца — номер СТС всегда в самом низу документа
-    lines = cleaned.splitlines()
+    lines = doc.cleaned_full_lines
     for line in reversed(lines):
         m = _CERT_RE.search(line)
         if m:
             return f"{m.group(1)} {m.group(2)} {m.group(3)}"
 
     # 2b. Разбитый OCR внизу бланка (одна цифра + пробел + цифра в серии)
-    broken = _extract_broken_sts_certificate_tail(cleaned)
-    if broken:
-        return broken
+    if doc.allow("cert_broken_tail"):
+        broken = _extract_broken_sts_certificate_tail(lines)
+        if broken:
+            return broken
 
     # 3. Fallback: любые 6 цифр подряд в конце текста (частично повреждённый)
     # Не подставляем то же значение, что уже отдано как ПТС;
     # не берём цифры из строк «экологический класс» и т.п.
-    pts_digits = re.sub(r'\D', '', pts_number) if pts_number else ''
+    if not doc.allow("cert_six_digits"):
+        return ""
+    pts_digits = _NON_DIGIT_RE.sub('', pts_number) if pts_number else ''
     cert_noise = (
         'экологическ', 'класс', 'категория', 'масса', 'кг',
         'технически', 'допустим',
@@ -1336,7 +1325,7 @@ def _extract_certificate(
         low = line.lower()
         if any(w in low for w in cert_noise):
             continue
-        m = re.search(r'\b(\d{6})\b', line)
+        m = _SIX_DIGITS_RE.search(line)
         if m:
             g = m.group(1)
             if pts_digits and g == pts_digits:
@@ -1350,15 +1339,287 @@ def _extract_certificate(
 # Публичный интерфейс
 # ---------------------------------------------------------------------------
 
-def parse_sts(text_annotation: dict) -> dict:
+# Версия правил разбора: входит в ключ мемоизации (memo.py). Увеличивать
+# при любой правке, меняющей результат parse_sts на тех же данных, —
+# иначе воркеры продолжат отдавать результаты прежней версии из кэша
+PARSER_VERSION = 6
+
+# Поля результата parse_sts в порядке словаря
+FIELDS = (
+    "vehicle_vin",
+    "vehicle_year",
+    "vehicle_passport_number",
+    "certificate_series_number",
+    "vehicle_brand",
+    "vehicle_model",
+    "vehicle_engine_volume",
+    "vehicle_engine_power",
+)
+
+# Этап → этапы, которые нужны ему раньше. Кроме полей FIELDS, здесь
+# промежуточные значения: хвост номера СТС (чтобы не принять его за
+# номер ПТС) и сырая пара марка/модель
+_DEPENDENCIES = {
+    "cert_last_six": (),
+    "vehicle_vin": (),
+    "brand_model": (),
+    "vehicle_brand": ("brand_model", "vehicle_vin"),
+    "vehicle_model": ("brand_model",),
+    "vehicle_year": ("vehicle_vin",),
+    "vehicle_engine_power": (),
+    "vehicle_passport_number": ("cert_last_six",),
+    "vehicle_engine_volume": (),
+    "certificate_series_number": ("vehicle_passport_number",),
+}
+
+# Порядок этапов при полном разборе: с бюджетом от него зависит,
+# какие фолбэки успеют выполниться
+_STAGE_ORDER = tuple(_DEPENDENCIES)
+
+# Имена этапов в timing.py
+_TIMING_NAMES = {stage: "sts_" + stage for stage in _DEPENDENCIES}
+
+
+def _from_vin(vin: str, attr: str) -> str:
+    """
+    Поле, выведенное из VIN (vin.DecodedVIN: brand или manufacture_year),
+    или "".
+
+    Заполняет марку и год, которых нет в тексте документа.
+    """
+    decoded = decode_vin(vin) if vin else None
+    value = getattr(decoded, attr, None)
+    return str(value) if value else ""
+
+
+def _required_stages(fields: Iterable[str]) -> set[str]:
+    """Поля и все этапы, от которых они зависят (транзитивно)."""
+    needed: set[str] = set()
+    stack = list(fields)
+    while stack:
+        stage = stack.pop()
+        if stage not in needed:
+            needed.add(stage)
+            stack.extend(_DEPENDENCIES[stage])
+    return needed
+
+
+class STSFields(Mapping):
+    """
+    Ленивый результат parse_sts: поле вычисляется при первом чтении.
+
+    Ключи — запрошенные поля (по умолчанию все FIELDS) в порядке FIELDS.
+    Вычисленные этапы запоминаются, поэтому зависимость (например, VIN
+    для марки) считается один раз, а resolve() или dict(...) выдают
+    обычный словарь.
+    """
+
+    __slots__ = ("_doc", "_entities", "_fields", "_values", "_report",
+                 "_started", "_logged_skips", "_mark", "_timings")
+
+    def __init__(
+        self,
+        doc: "_LineTable",
+        entities: dict,
+        fields: Optional[Iterable[str]] = None,
+        report: Optional["ParseReport"] = None,
+        started: Optional[float] = None,
+        timings: Optional[list[tuple[str, float]]] = None,
+    ):
+        if fields is None:
+            self._fields = FIELDS
+        else:
+            requested = set(fields)
+            unknown = requested.difference(FIELDS)
+            if unknown:
+                raise ValueError(
+                    f"Неизвестные поля СТС: {', '.join(sorted(unknown))}"
+                )
+            self._fields = tuple(f for f in FIELDS if f in requested)
+        self._doc = doc
+        self._entities = entities
+        self._values: dict = {}
+        self._report = report
+        self._started = started
+        self._logged_skips = 0
+        # Замеры этапов: этапы идут подряд, поэтому конец одного — начало
+        # следующего (_mark, time.perf_counter); в timing.py они уходят
+        # пачкой в _finish()
+        self._mark = 0.0
+        self._timings = timings if timings is not None else []
+
+    def __getitem__(self, field: str) -> str:
+        if field not in self._fields:
+            raise KeyError(field)
+        self._mark = time.perf_counter()
+        value = self._stage(field)
+        self._finish()
+        return value
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __repr__(self) -> str:
+        shown = ", ".join(
+            f"{f!r}: {self._values[f]!r}" if f in self._values else f"{f!r}: …"
+            for f in self._fields
+        )
+        return f"STSFields({{{shown}}})"
+
+    def resolve(self) -> dict:
+        """
+        Вычисляет все запрошенные поля и возвращает обычный словарь.
+
+        Этапы идут в порядке полного разбора (_STAGE_ORDER), а не
+        в порядке ключей — так набор пропущенных по бюджету фолбэков
+        не зависит от того, какие поля запрошены.
+        """
+        needed = _required_stages(self._fields)
+        self._mark = time.perf_counter()
+        for stage in _STAGE_ORDER:
+            if stage in needed:
+                self._stage(stage)
+        self._finish()
+        return {f: self._values[f] for f in self._fields}
+
+    def _finish(self) -> None:
+        """
+        Дописывает report после чтения поля или resolve(): время разбора
+        и предупреждение о фолбэках, пропущенных с прошлого раза.
+
+        Одно предупреждение на полный разбор; в ленивом режиме — на каждое
+        чтение, после которого бюджет пропустил новые этапы.
+        """
+        if self._timings:
+            record_timings(self._timings)
+            self._timings = []
+        report = self._report
+        if report is None:
+            return
+        if self._started is not None:
+            report.elapsed = time.monotonic() - self._started
+        if len(report.skipped) > self._logged_skips:
+            logger.warning(
+                "STS parse over budget (%.0f of %.0f ms), skipped: %s",
+                report.elapsed * 1000, (report.budget or 0) * 1000,
+                ", ".join(report.skipped[self._logged_skips:]),
+            )
+            self._logged_skips = len(report.skipped)
+
+    def _stage(self, stage: str):
+        try:
+            return self._values[stage]
+        except KeyError:
+            pass
+        # Зависимости — заранее, чтобы замер этапа (timing.py, имя
+        # sts_<этап>) не включал их время
+        for dependency in _DEPENDENCIES[stage]:
+            self._stage(dependency)
+        value = self._values[stage] = self._compute(stage)
+        now = time.perf_counter()
+        self._timings.append((_TIMING_NAMES[stage], now - self._mark))
+        self._mark = now
+        return value
+
+    def _compute(self, stage: str):
+        doc = self._doc
+        if stage == "cert_last_six":
+            value = _cert_last_six_digits(doc, self._entities)
+        elif stage == "vehicle_vin":
+            value = _extract_vin(doc)
+        elif stage == "brand_model":
+            value = _extract_brand_model(doc)
+        elif stage == "vehicle_brand":
+            vin = self._stage("vehicle_vin")
+            value = (
+                _normalize_brand(self._stage("brand_model")[0], vin)
+                or _from_vin(vin, "brand")
+            )
+        elif stage == "vehicle_model":
+            value = _normalize_model(self._stage("brand_model")[1])
+        elif stage == "vehicle_year":
+            value = _extract_year(doc) or _from_vin(
+                self._stage("vehicle_vin"), "manufacture_year",
+            )
+        elif stage == "vehicle_engine_power":
+            value = _extract_engine_power(doc)
+        elif stage == "vehicle_passport_number":
+            value = _extract_pts(
+                doc, cert_last_six=self._stage("cert_last_six"),
+            )
+        elif stage == "vehicle_engine_volume":
+            value = _extract_engine_displacement_liters(doc)
+        else:  # certificate_series_number
+            value = _extract_certificate(
+                doc, self._entities,
+                pts_number=self._stage("vehicle_passport_number"),
+            )
+        return value
+
+
+class ParseReport:
+    """
+    Итог одного вызова parse_sts: время разбора и пропущенные этапы.
+
+    Attributes:
+        budget: Бюджет времени, с (None — без ограничения).
+        elapsed: Время разбора, с.
+        skipped: Фолбэки, пропущенные из-за исчерпания бюджета, по порядку.
+        truncated: Вход обрезан до _MAX_FULL_TEXT символов / _MAX_LINES строк.
+    """
+
+    __slots__ = ("budget", "elapsed", "skipped", "truncated")
+
+    def __init__(self):
+        self.budget: Optional[float] = None
+        self.elapsed = 0.0
+        self.skipped: list[str] = []
+        self.truncated = False
+
+    @property
+    def over_budget(self) -> bool:
+        return bool(self.skipped)
+
+    def as_dict(self) -> dict:
+        return {
+            "budget_ms": None if self.budget is None else self.budget * 1000,
+            "elapsed_ms": round(self.elapsed * 1000, 3),
+            "skipped": list(self.skipped),
+            "truncated": self.truncated,
+        }
+
+
+def parse_sts(
+    text_annotation: dict,
+    budget: Optional[float] = None,
+    report: Optional[ParseReport] = None,
+    fields: Optional[Iterable[str]] = None,
+    lazy: bool = False,
+):
     """
     Парсит textAnnotation Yandex Vision OCR для СТС/ПТС.
 
     Args:
         text_annotation: Словарь textAnnotation из ответа Vision OCR API.
+        budget: Бюджет времени разбора, с. Основные этапы выполняются
+            всегда, а дорогие фолбэки после исчерпания бюджета
+            пропускаются (поля остаются пустыми). None — без ограничения.
+        report: Куда записать время разбора и пропущенные этапы.
+        fields: Только эти поля из FIELDS (None — все). Поля, от которых
+            они зависят, тоже вычисляются, но в результат не попадают.
+        lazy: Вернуть STSFields без вычислений: каждое поле считается
+            при первом чтении. Бюджет отсчитывается от вызова parse_sts,
+            report.elapsed — время до последнего вычисленного поля.
+
+    Raises:
+        ValueError: В fields есть имя не из FIELDS.
 
     Returns:
-        Словарь с полями формы бронирования::
+        Словарь с полями формы бронирования (при fields — только с ними,
+        при lazy — STSFields с теми же ключами)::
 
             {
                 "vehicle_vin": str,
@@ -1371,39 +1632,35 @@ def parse_sts(text_annotation: dict) -> dict:
                 "vehicle_engine_power": str,
             }
     """
+    started = time.monotonic()
+    lines_started = time.perf_counter()
+    if report is None:
+        report = ParseReport()
+    report.budget = budget
+    deadline = started + budget if budget is not None else None
+
     full_text: str = text_annotation.get("fullText", "")
+    if len(full_text) > _MAX_FULL_TEXT:
+        full_text = full_text[:_MAX_FULL_TEXT]
+        report.truncated = True
     entities: dict = {
         e.get("name", ""): e.get("text", "")
         for e in text_annotation.get("entities", [])
     }
 
-    # Строки в правильном порядке (по Y-координатам из блоков)
-    ordered_lines = _lines_from_text_annotation(text_annotation)
-
-    # Хвост номера СТС — чтобы не путать с номером ПТС (формат 2+2+6 цифр)
-    cert_last_six = _cert_last_six_digits(full_text, entities)
-
-    vin = _extract_vin(full_text, ordered_lines)
-    brand, model = _extract_brand_model(ordered_lines)
-    brand = _normalize_brand(brand, vin)
-    model = _normalize_model(model)
-    year = _extract_year(ordered_lines)
-    engine_power = _extract_engine_power(ordered_lines)
-    pts = _extract_pts(
-        ordered_lines, full_text, cert_last_six=cert_last_six,
+    # Строки по Y-координатам из блоков, с геометрией — один
+    # проход нормализации и классификации меток на все экстракторы
+    layout = LineLayout.from_text_annotation(
+        text_annotation, max_lines=_MAX_LINES,
     )
-    engine_liters = _extract_engine_displacement_liters(
-        ordered_lines, full_text,
+    report.truncated = report.truncated or layout.truncated
+    doc = _LineTable(layout, full_text, deadline=deadline, report=report)
+    lines_time = time.perf_counter() - lines_started
+
+    result = STSFields(
+        doc, entities, fields, report=report, started=started,
+        timings=[("sts_lines", lines_time)],
     )
-    cert = _extract_certificate(full_text, entities, pts_number=pts)
-
-    return {
-        "vehicle_vin": vin,
-        "vehicle_year": year,
-        "vehicle_passport_number": pts,
-        "certificate_series_number": cert,
-        "vehicle_brand": brand,
-        "vehicle_model": model,
-        "vehicle_engine_volume": engine_liters,
-        "vehicle_engine_power": engine_power,
-    }
+    if lazy:
+        return result
+    return result.resolve()
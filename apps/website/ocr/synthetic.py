@@ -0,0 +1,533 @@
+"""
+Синтетические textAnnotation СТС для стресс-тестов и замеров парсера.
+
+Реальных кэшей OCR (scripts/_ocr_raw_*.json) всего несколько штук —
+по ним не найти патологические входы и не измерить пропускную
+способность. Генератор строит ответы Vision в том же формате (blocks →
+lines → words с boundingBox, fullText, entities) со случайными, но
+правдоподобными значениями полей и эталоном — тем, что parse_sts()
+должен вернуть.
+
+Разнообразие:
+- марки и WMI из справочника ocr/data/ (refdata.py), кириллические
+  написания марок и моделей оттуда же;
+- эталон не выводится из VIN: модельный год в VIN равен году выпуска
+  или на год больше (кроме отечественных заводов), а у
+  _FOREIGN_WMI_SHARE документов WMI принадлежит другой марке
+  (контрактная сборка) — парсер, который берёт из VIN больше, чем
+  в нём есть, на этом ошибётся;
+- раскладка: значение в строке подписи, отдельной колонкой справа
+  или строкой ниже; блоки двухколоночной раскладки частично перемешаны,
+  как у настоящего OCR;
+- шум: латинские гомоглифы кириллицы, обрезанные слева подписи,
+  тире-артефакты, номер СТС, разорванный на три строки.
+
+Документ детерминирован по (seed, index): любой документ из потока
+можно воспроизвести отдельно.
+
+API:
+    for doc in iter_sts(10_000, seed=1):
+        result = parse_sts(doc.annotation)
+        misses = [f for f, v in doc.expected.items() if result[f] != v]
+
+CLI (JSONL): python scripts/gen_synthetic_sts.py --count 100000 -o sts.jsonl
+"""
+import json
+import random
+import re
+from typing import IO, Iterable, Iterator, Optional
+
+from .refdata import brand_aliases, model_aliases, wmi_index
+from .vin import MANUFACTURE_YEAR_WMI, YEAR_CODES, check_digit
+
+LAYOUTS = ("inline", "columns", "stacked")
+NOISE_KINDS = ("homoglyph", "truncated_label", "dash", "broken_cert")
+
+DEFAULT_NOISE = 0.3
+
+_VIN_ALPHABET = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+_VIN_CHAR_RE = re.compile(r"^[A-HJ-NPR-Z0-9]{3}$")
+
+# Модели популярных марок; для остальных — буквенно-цифровой индекс
+_MODELS: dict[str, tuple[str, ...]] = {
+    "SKODA": ("OCTAVIA", "YETI", "RAPID", "FABIA", "KODIAQ", "SUPERB"),
+    "LADA": ("PRIORA", "GRANTA", "VESTA", "KALINA", "LARGUS", "NIVA"),
+    "BMW": ("X5", "X3", "320I", "520D", "X1"),
+    "VOLKSWAGEN": ("POLO", "TIGUAN", "PASSAT", "GOLF", "JETTA"),
+    "AUDI": ("A4", "A6", "Q5", "Q7", "A3"),
+    "TOYOTA": ("CAMRY", "COROLLA", "RAV4", "LAND CRUISER"),
+    "NISSAN": ("QASHQAI", "X-TRAIL", "ALMERA", "TEANA"),
+    "HYUNDAI": ("SOLARIS", "CRETA", "TUCSON", "ELANTRA"),
+    "KIA": ("RIO", "SPORTAGE", "CEED", "OPTIMA"),
+    "RENAULT": ("LOGAN", "SANDERO", "DUSTER", "KAPTUR"),
+    "FORD": ("FOCUS", "MONDEO", "KUGA", "FIESTA"),
+    "CHERY": ("T11 TIGGO", "TIGGO 7", "AMULET"),
+    "HAVAL": ("H6", "JOLION", "F7"),
+    "MERCEDES-BENZ": ("E200", "C180", "GLE350", "S500"),
+    "UAZ": ("PATRIOT", "HUNTER"),
+    "GAZ": ("VOLGA", "GAZEL"),
+}
+
+_COLORS = (
+    "ЧЕРНЫЙ", "БЕЛЫЙ", "СЕРЫЙ", "СЕРЕБРИСТЫЙ", "СИНИЙ", "КРАСНЫЙ",
+    "ЗЕЛЕНЫЙ", "КОРИЧНЕВЫЙ", "БЕЖЕВЫЙ",
+)
+_BODY_TYPES = (
+    "Легковой прочее", "Легковой седан", "Легковой хэтчбек",
+    "Легковой комби (хэтчбек)", "Легковой универсал",
+)
+_ECO_CLASSES = ("ТРЕТИЙ", "ЧЕТВЁРТЫЙ", "ПЯТЫЙ")
+# Буквы серии ПТС и госномера — только совпадающие по начертанию с латиницей
+_SERIES_LETTERS = "АВЕКМНОРСТУХ"
+
+_HOMOGLYPHS = {
+    "А": "A", "В": "B", "Е": "E", "К": "K", "М": "M", "Н": "H",
+    "О": "O", "Р": "P", "С": "C", "Т": "T", "У": "Y", "Х": "X",
+}
+
+_TITLE_LINES = (
+    "РОССИЙСКАЯ ФЕДЕРАЦИЯ",
+    "СВИДЕТЕЛЬСТВО О РЕГИСТРАЦИИ ТС",
+    "CERTIFICAT D’IMMATRICULATION",
+)
+
+# Генератор — инструмент для скриптов, поэтому справочник читается
+# сразу при импорте (парсер загружает его лениво)
+_WMI_BRAND = dict(wmi_index())
+_WMIS = tuple(sorted(w for w in _WMI_BRAND if _VIN_CHAR_RE.match(w)))
+_BRAND_WMIS: dict[str, list[str]] = {}
+for wmi in _WMIS:
+    _BRAND_WMIS.setdefault(_WMI_BRAND[wmi], []).append(wmi)
+del wmi
+_BRANDS = tuple(sorted(_BRAND_WMIS))
+
+# Доля ТС, у которых WMI в VIN — другой марки (сборка на чужом заводе)
+_FOREIGN_WMI_SHARE = 0.05
+
+
+def _reverse(mapping: dict[str, str]) -> dict[str, list[str]]:
+    """Латинское написание → кириллические варианты из словаря."""
+    result: dict[str, list[str]] = {}
+    for cyr, lat in mapping.items():
+        if any("\u0400" <= c <= "\u04FF" for c in cyr):
+            result.setdefault(lat, []).append(cyr)
+    return result
+
+
+_BRAND_CYRILLIC = _reverse(brand_aliases())
+_MODEL_CYRILLIC = _reverse(model_aliases())
+
+
+class SyntheticSTS:
+    """
+    Синтетический документ: ответ OCR и эталон разбора.
+
+    Attributes:
+        annotation: textAnnotation в формате Yandex Vision.
+        expected: Поля, которые должен вернуть parse_sts().
+        layout: Раскладка (см. LAYOUTS).
+        noise: Применённые искажения (подмножество NOISE_KINDS).
+        index: Номер документа в потоке.
+    """
+
+    __slots__ = ("annotation", "expected", "layout", "noise", "index")
+
+    def __init__(
+        self,
+        annotation: dict,
+        expected: dict,
+        layout: str,
+        noise: list[str],
+        index: int = 0,
+    ):
+        self.annotation = annotation
+        self.expected = expected
+        self.layout = layout
+        self.noise = noise
+        self.index = index
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "layout": self.layout,
+            "noise": self.noise,
+            "expected": self.expected,
+            "textAnnotation": self.annotation,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SyntheticSTS":
+        return cls(
+            data["textAnnotation"],
+            data["expected"],
+            data.get("layout", ""),
+            data.get("noise", []),
+            data.get("index", 0),
+        )
+
+
+def _vin(rng: random.Random, wmi: str, model_year: int) -> str:
+    vds = "".join(rng.choice(_VIN_ALPHABET) for _ in range(5))
+    year_code = YEAR_CODES[(model_year - 1980) % 30]
+    plant = rng.choice(_VIN_ALPHABET)
+    serial = "".join(rng.choice("0123456789") for _ in range(6))
+    draft = f"{wmi}{vds}0{year_code}{plant}{serial}"
+    return draft[:8] + check_digit(draft) + draft[9:]
+
+
+def _vehicle(rng: random.Random) -> dict:
+    """Случайные значения полей одного ТС."""
+    brand = rng.choice(_BRANDS)
+    if rng.random() < _FOREIGN_WMI_SHARE:
+        wmi = rng.choice(_WMIS)
+    else:
+        wmi = rng.choice(_BRAND_WMIS[brand])
+    models = _MODELS.get(brand)
+    if models:
+        model = rng.choice(models)
+    else:
+        model = rng.choice("ABCDEFGHKLMSTX") + str(rng.randint(1, 90))
+    year = rng.randint(1995, 2025)
+    # Модельный год в VIN: машину, собранную осенью, выпускают
+    # под следующий модельный год. Отечественные заводы кодируют сам
+    # год выпуска (vin.MANUFACTURE_YEAR_WMI)
+    if wmi in MANUFACTURE_YEAR_WMI:
+        model_year = year
+    else:
+        model_year = year + rng.choice((0, 1))
+    kw = rng.randint(40, 250)
+    hp = kw * 1.35962
+    hp_text = f"{hp:.1f}" if rng.random() < 0.3 else str(round(hp))
+    hp_value = float(hp_text)
+    cc = rng.choice((0, 0, 998, 1397, 1598, 1798, 1998, 2494, 2997))
+    series = "".join(rng.choice(_SERIES_LETTERS) for _ in range(2))
+    return {
+        "wmi": wmi,
+        "brand": brand,
+        "model": model,
+        "year": year,
+        "vin": _vin(rng, wmi, model_year),
+        "power": f"{kw}/{hp_text}",
+        "hp": str(int(hp_value)) if hp_value == int(hp_value) else hp_text,
+        "cc": cc,
+        "pts_region": f"{rng.randint(1, 99):02d}",
+        "pts_series": series,
+        "pts_number": f"{rng.randint(0, 999999):06d}",
+        "cert": (
+            f"{rng.randint(1, 99):02d} {rng.randint(0, 99):02d} "
+            f"{rng.randint(0, 999999):06d}"
+        ),
+        "plate": (
+            rng.choice(_SERIES_LETTERS) + f"{rng.randint(1, 999):03d}"
+            + "".join(rng.choice(_SERIES_LETTERS) for _ in range(2))
+            + str(rng.choice((77, 99, 136, 197, 750, 36, 52, 63)))
+        ),
+    }
+
+
+def _format_liters(cc: int) -> str:
+    """Эталон литража как у парсера: 1598 см³ → «1,6», 1998 → «2»."""
+    liters = round(cc / 1000.0, 2)
+    if abs(liters - round(liters)) < 1e-6:
+        return str(int(round(liters)))
+    return f"{liters:.2f}".rstrip("0").rstrip(".").replace(".", ",")
+
+
+def _swap_homoglyphs(rng: random.Random, text: str, share: float) -> str:
+    """Часть кириллических букв заменяет похожими латинскими."""
+    return "".join(
+        _HOMOGLYPHS[c] if c in _HOMOGLYPHS and rng.random() < share else c
+        for c in text
+    )
+
+
+class _Page:
+    """Раскладка строк на странице: координаты, блоки, fullText."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.width = rng.choice((720, 960, 1080))
+        self.height = rng.choice((1280, 1440, 1600))
+        self.left = rng.randint(20, self.width // 5)
+        self.value_x = self.left + int(self.width * rng.uniform(0.45, 0.55))
+        self.y = rng.randint(150, 320)
+        self.blocks: list[list[tuple[str, int, int, int]]] = []
+
+    def _h(self) -> int:
+        return self.rng.randint(18, 40)
+
+    def _w(self, text: str, h: int) -> int:
+        return max(int(len(text) * h * 0.55), h)
+
+    def line(self, text: str, x: Optional[int] = None) -> None:
+        """Одна строка отдельным блоком на следующем ряду."""
+        h = self._h()
+        x = self.left + self.rng.randint(-6, 6) if x is None else x
+        self.blocks.append([(text, max(x, 0), self.y, h)])
+        self.y += h + self.rng.randint(6, 16)
+
+    def field(self, label: str, value: str, layout: str) -> None:
+        """Подпись и значение по раскладке документа."""
+        if layout == "inline":
+            self.line(f"{label} {value}")
+        elif layout == "stacked":
+            self.line(label)
+            self.line(value, x=self.left + self.rng.randint(10, 60))
+        else:
+            h = self._h()
+            jitter = self.rng.randint(-3, 3)
+            x = self.left + self.rng.randint(-6, 6)
+            self.blocks.append([(label, max(x, 0), self.y, h)])
+            value_x = max(
+                self.value_x + self.rng.randint(-10, 10),
+                x + self._w(label, h) + 10,
+            )
+            self.blocks.append([(value, value_x, self.y + jitter, h)])
+            self.y += h + self.rng.randint(6, 16)
+
+    def shuffle_columns(self) -> None:
+        """Как у OCR: соседние блоки иногда идут не в порядке чтения."""
+        blocks = self.blocks
+        for i in range(len(blocks) - 1):
+            if self.rng.random() < 0.15:
+                blocks[i], blocks[i + 1] = blocks[i + 1], blocks[i]
+
+    def annotation(self, entities: list[dict], words: bool = True) -> dict:
+        """
+        textAnnotation в формате Vision: координаты строками.
+
+        words=False опускает слова и textSegments (parse_sts их не читает):
+        документ в JSONL становится в несколько раз меньше.
+        """
+        out_blocks = []
+        full_lines = []
+        offset = 0
+        for block in self.blocks:
+            lines = []
+            start = offset
+            for text, x, y, h in block:
+                w = self._w(text, h)
+                line = {"boundingBox": _bbox(x, y, x + w, y + h), "text": text}
+                if words:
+                    line["words"] = self._words(text, x, y, w, h, offset)
+                    line["textSegments"] = [_segment(offset, len(text))]
+                line["orientation"] = "ANGLE_0"
+                lines.append(line)
+                full_lines.append(text)
+                offset += len(text) + 1
+            x0 = min(ln[1] for ln in block)
+            y0 = min(ln[2] for ln in block)
+            x1 = max(ln[1] + self._w(ln[0], ln[3]) for ln in block)
+            y1 = max(ln[2] + ln[3] for ln in block)
+            out_blocks.append({
+                "boundingBox": _bbox(x0, y0, x1, y1),
+                "lines": lines,
+                "languages": [{"languageCode": "ru"}],
+                "textSegments": [_segment(start, offset - start - 1)],
+                "layoutType": "LAYOUT_TYPE_TEXT",
+            })
+        return {
+            "width": str(self.width),
+            "height": str(max(self.height, self.y + 40)),
+            "blocks": out_blocks,
+            "entities": entities,
+            "tables": [],
+            "fullText": "\n".join(full_lines) + "\n",
+            "rotate": "ANGLE_0",
+            "markdown": "",
+            "pictures": [],
+        }
+
+    @staticmethod
+    def _words(text, x, y, w, h, offset) -> list[dict]:
+        words = []
+        pos = 0
+        for word in text.split(" "):
+            if word:
+                wx = x + w * pos // max(len(text), 1)
+                ww = w * len(word) // max(len(text), 1)
+                words.append({
+                    "boundingBox": _bbox(wx, y, wx + ww, y + h),
+                    "text": word,
+                    "entityIndex": "-1",
+                    "textSegments": [_segment(offset + pos, len(word))],
+                })
+            pos += len(word) + 1
+        return words
+
+
+def _bbox(x0: int, y0: int, x1: int, y1: int) -> dict:
+    return {"vertices": [
+        {"x": str(x0), "y": str(y0)},
+        {"x": str(x0), "y": str(y1)},
+        {"x": str(x1), "y": str(y1)},
+        {"x": str(x1), "y": str(y0)},
+    ]}
+
+
+def _segment(start: int, length: int) -> dict:
+    return {"startIndex": str(start), "length": str(length)}
+
+
+def generate_sts(
+    seed=0,
+    index: int = 0,
+    noise: float = DEFAULT_NOISE,
+    layout: Optional[str] = None,
+    words: bool = True,
+) -> SyntheticSTS:
+    """
+    Строит один синтетический документ СТС.
+
+    Args:
+        seed: Зерно потока; вместе с index однозначно задаёт документ.
+        index: Номер документа в потоке.
+        noise: Вероятность каждого вида искажений (0 — чистый документ).
+        layout: Раскладка из LAYOUTS; по умолчанию случайная.
+        words: Добавлять слова строк (как в ответе Vision).
+
+    Returns:
+        SyntheticSTS с ответом OCR и эталоном.
+    """
+    rng = random.Random(f"{seed}:{index}")
+    layout = layout or rng.choice(LAYOUTS)
+    applied = [kind for kind in NOISE_KINDS if rng.random() < noise]
+    v = _vehicle(rng)
+
+    def label(text: str) -> str:
+        # Край листа обрезан: «Марка» → «арка», «Идентификационный» →
+        # «дентификационный»
+        if "truncated_label" in applied and rng.random() < 0.5:
+            return text[rng.randint(1, 2):]
+        return text
+
+    def dash(text: str) -> str:
+        if "dash" in applied and rng.random() < 0.4:
+            return text.replace(" ", rng.choice(("—", " — ", "тДЦ")), 1)
+        return text
+
+    def glyphs(text: str) -> str:
+        if "homoglyph" in applied:
+            return _swap_homoglyphs(rng, text, 0.6)
+        return text
+
+    brand_cyr = rng.choice(_BRAND_CYRILLIC.get(v["brand"], [v["brand"]]))
+    model_cyr = rng.choice(_MODEL_CYRILLIC.get(v["model"], [v["model"]]))
+
+    page = _Page(rng)
+    for title in _TITLE_LINES:
+        page.line(title, x=page.left + rng.randint(20, 80))
+    page.field(label("Регистрационный знак"), glyphs(v["plate"]), layout)
+    page.line(label("Идентификационный номер (VIN)"))
+    page.line(v["vin"], x=page.left + rng.randint(20, 60))
+    page.field(
+        label("Марка, модель"), glyphs(f"{brand_cyr} {model_cyr}"), layout,
+    )
+    page.line(
+        f"{v['brand']} {v['model']}",
+        x=page.value_x if layout == "columns" else None,
+    )
+    page.field(label("Тип ТС"), rng.choice(_BODY_TYPES), layout)
+    page.field(label("Категория ТС (ABCD, прицеп)"), "В/М1", layout)
+    page.field(label("Год выпуска ТС"), str(v["year"]), layout)
+    page.line(dash("Шасси (рама) № ОТСУТСТВУЕТ"))
+    page.line(dash(label("Кузов (кабина, прицеп) №")))
+    page.line(v["vin"], x=page.left + rng.randint(20, 60))
+    page.field(label("Цвет"), rng.choice(_COLORS), layout)
+    page.field(label("Мощность двигателя, кВт/л. с."), v["power"], layout)
+    if v["cc"]:
+        page.field(
+            label("Рабочий объём двигателя"), f"{v['cc']} см³", layout,
+        )
+    page.field(label("Экологический класс"), rng.choice(_ECO_CLASSES), layout)
+    page.field(
+        label("Технически допустимая max масса, кг"),
+        str(rng.randint(1200, 3500)), layout,
+    )
+    page.field(
+        label("Масса в снаряженном состоянии, кг"),
+        str(rng.randint(900, 2500)), layout,
+    )
+    page.line(label("Срок временной регистрации"))
+    series = glyphs(v["pts_series"])
+    if rng.random() < 0.5:
+        page.line(f"ПТС: {v['pts_region']}{series}{v['pts_number']}")
+    else:
+        page.line(
+            f"Паспорт ТС {v['pts_region']} {series}№ {v['pts_number']}",
+        )
+
+    entities = []
+    cert_x = page.left + rng.randint(60, 160)
+    if "broken_cert" in applied:
+        # «99 16 777407» → «9 9» / «16» / «777407» тремя строками
+        region, code, number = v["cert"].split()
+        page.line(f"{region[0]} {region[1]}", x=cert_x)
+        page.line(code, x=cert_x)
+        page.line(number, x=cert_x)
+    else:
+        page.line(v["cert"], x=cert_x)
+        entities.append({"name": "phone", "text": v["cert"]})
+
+    if layout == "columns":
+        page.shuffle_columns()
+
+    expected = {
+        "vehicle_vin": v["vin"],
+        "vehicle_year": str(v["year"]),
+        "vehicle_passport_number": (
+            f"{v['pts_region']}{v['pts_series']}{v['pts_number']}"
+        ),
+        "certificate_series_number": v["cert"],
+        "vehicle_brand": v["brand"],
+        "vehicle_model": v["model"],
+        "vehicle_engine_volume": _format_liters(v["cc"]) if v["cc"] else "",
+        "vehicle_engine_power": v["hp"],
+    }
+    return SyntheticSTS(
+        page.annotation(entities, words), expected, layout, applied, index,
+    )
+
+
+def iter_sts(
+    count: int,
+    seed=0,
+    noise: float = DEFAULT_NOISE,
+    layouts: Iterable[str] = LAYOUTS,
+    start: int = 0,
+    words: bool = True,
+) -> Iterator[SyntheticSTS]:
+    """
+    Поток синтетических документов (ленивый — годится на миллионы).
+
+    Args:
+        count: Сколько документов.
+        seed: Зерно потока.
+        noise: Вероятность каждого вида искажений.
+        layouts: Допустимые раскладки.
+        start: Номер первого документа (продолжение потока).
+        words: Добавлять слова строк (см. generate_sts).
+    """
+    layouts = tuple(layouts)
+    # Все раскладки — случайный выбор внутри документа, иначе по кругу
+    fixed = set(layouts) != set(LAYOUTS)
+    for index in range(start, start + count):
+        layout = layouts[index % len(layouts)] if fixed else None
+        yield generate_sts(seed, index, noise, layout, words)
+
+
+def write_jsonl(docs: Iterable[SyntheticSTS], fp: IO[str]) -> int:
+    """Пишет документы в JSONL (запись на строку); возвращает их число."""
+    written = 0
+    for doc in docs:
+        fp.write(json.dumps(doc.to_dict(), ensure_ascii=False))
+        fp.write("\n")
+        written += 1
+    return written
+
+
+def read_jsonl(fp: IO[str]) -> Iterator[SyntheticSTS]:
+    """Читает документы из JSONL построчно, не загружая файл целиком."""
+    for line in fp:
+        if line.strip():
+            yield SyntheticSTS.from_dict(json.loads(line))
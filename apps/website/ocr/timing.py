@@ -0,0 +1,209 @@
+"""
+Замеры этапов OCR-запроса: куда ушло время.
+
+Медленный запрос распознавания мог потерять время на разборе загрузки,
+предобработке, base64, сети до Vision, разборе JSON ответа или в одном
+из экстракторов parse_sts. Этапы оборачиваются в stage("имя") — два
+вызова time.perf_counter(), поэтому замеры включены всегда. Этапы
+parse_sts идут подряд, и их десяток на документ: там один
+time.perf_counter() на этап, а замеры записываются пачкой (record_many)
+— одна блокировка выборки на разбор.
+
+Замер попадает:
+- в StageTimings текущего запроса, если он открыт через collect()
+  (contextvars: у каждого потока и запроса свой) — отсюда заголовок
+  Server-Timing и поля лога;
+- в выборку процесса (резервуар на RESERVOIR_SIZE замеров на этап) —
+  перцентили по этапам: stage_stats().
+
+Имена этапов: upload, preprocess, rate_wait, base64, vision_post,
+decode, parse, sts_lines (строки и таблица меток) и sts_<этап
+parse_sts> (sts_vehicle_vin, …).
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator, Optional
+
+# Замеров на этап в выборке процесса: перцентили по последним ~тысяче
+# запросов без роста памяти
+RESERVOIR_SIZE = 1024
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """
+    Перцентиль по отсортированному списку (ближайший ранг).
+
+    Returns:
+        Значение из списка; 0.0 для пустого списка.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class StageTimings:
+    """
+    Замеры одного запроса: этап → суммарное время, с.
+
+    Этапы идут в порядке первого замера; повторный замер этапа
+    (например, base64 при повторе запроса к Vision) складывается.
+    """
+
+    __slots__ = ("stages",)
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> dict[str, float]:
+        """Этап → миллисекунды (для структурированного лога)."""
+        return {
+            stage: round(seconds * 1000, 3)
+            for stage, seconds in self.stages.items()
+        }
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing: «upload;dur=1.204, …» (мс)."""
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.3f}"
+            for stage, seconds in self.stages.items()
+        )
+
+
+class _Reservoir:
+    """Равномерная выборка фиксированного размера (алгоритм R)."""
+
+    __slots__ = ("samples", "count")
+
+    def __init__(self):
+        self.samples: list[float] = []
+        self.count = 0
+
+    def add(self, value: float, rng: random.Random) -> None:
+        self.count += 1
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(value)
+            return
+        slot = rng.randrange(self.count)
+        if slot < RESERVOIR_SIZE:
+            self.samples[slot] = value
+
+
+class StageStats:
+    """Выборки замеров по этапам для всего процесса. Потокобезопасен."""
+
+    def __init__(self, seed: Optional[int] = None):
+        self._reservoirs: dict[str, _Reservoir] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.record_many(((stage, seconds),))
+
+    def record_many(self, samples: Iterable[tuple[str, float]]) -> None:
+        """Несколько замеров под одной блокировкой."""
+        with self._lock:
+            for stage, seconds in samples:
+                reservoir = self._reservoirs.get(stage)
+                if reservoir is None:
+                    reservoir = self._reservoirs[stage] = _Reservoir()
+                reservoir.add(seconds, self._rng)
+
+    def percentiles(
+        self,
+        percentiles: tuple[int, ...] = PERCENTILES,
+    ) -> dict[str, dict]:
+        """
+        Перцентили по этапам, мс (ближайший ранг по выборке).
+
+        Returns:
+            {этап: {"count": всего замеров, "p50_ms": …, "p90_ms": …,
+            "p99_ms": …}}.
+        """
+        with self._lock:
+            snapshot = {
+                stage: (r.count, sorted(r.samples))
+                for stage, r in self._reservoirs.items()
+            }
+        report = {}
+        for stage, (count, samples) in snapshot.items():
+            row: dict = {"count": count}
+            for pct in percentiles:
+                value = percentile(samples, pct)
+                row[f"p{pct}_ms"] = round(value * 1000, 3)
+            report[stage] = row
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reservoirs.clear()
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar(
+    "ocr_stage_timings", default=None,
+)
+_stats = StageStats()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Записывает замер в текущий запрос (если открыт) и в выборку."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+    _stats.record(stage, seconds)
+
+
+def record_many(samples: list[tuple[str, float]]) -> None:
+    """
+    Записывает пачку замеров (этап, секунды) — как record() для каждого,
+    но с одной блокировкой выборки процесса.
+    """
+    timings = _current.get()
+    if timings is not None:
+        for stage, seconds in samples:
+            timings.add(stage, seconds)
+    _stats.record_many(samples)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Замеряет блок кода как этап name (в том числе при исключении)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+@contextmanager
+def collect() -> Iterator[StageTimings]:
+    """
+    Собирает замеры этапов в текущем контексте (запрос, задача OCR).
+
+    Замеры из других потоков (хедж-запрос resilience.py) сюда не
+    попадают — только в выборку процесса.
+    """
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def stage_stats() -> dict[str, dict]:
+    """Перцентили по этапам для процесса (см. StageStats.percentiles)."""
+    return _stats.percentiles()
+
+
+def reset_stage_stats() -> None:
+    """Очищает выборки процесса."""
+    _stats.reset()
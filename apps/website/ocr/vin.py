@@ -0,0 +1,244 @@
+"""
+Расшифровка VIN (ISO 3779): производитель, модельный год, контрольный символ.
+
+VIN, который уже нашёл парсер, содержит:
+- символы 1–3 (WMI) — производитель (справочник refdata.py);
+- символ 10 — модельный год (цикл 30 лет: A=1980/2010, …, 9=2009/2039);
+- символ 9 — контрольный: взвешенная сумма значений символов по
+  модулю 11 (обязателен для Северной Америки, у европейских
+  производителей часто произволен).
+
+Модельный год — не всегда год выпуска из СТС: он часто на год больше
+(машина собрана осенью под следующий модельный год), а у европейских
+марок 10-й символ бывает вовсе не годом. Поэтому decode() отдаёт его
+с флагом model_year_reliable и отдельно — manufacture_year: год выпуска
+есть только у отечественных заводов, которые кодируют в 10-м символе
+именно его. parse_sts подставляет пустые в тексте марку (WMI) и год
+выпуска (manufacture_year) из DecodedVIN.
+
+repair() исправляет типичные ошибки OCR в VIN: I, O, Q в VIN не
+встречаются и однозначно заменяются на 1, 0, 0; неоднозначные пары
+(B/8, S/5, Z/2, G/6) перебираются, пока не сойдётся контрольный символ.
+"""
+import itertools
+import re
+from typing import Optional
+
+from .refdata import wmi_index
+
+VIN_LENGTH = 17
+
+# Коды модельного года (10-й символ) по порядку с 1980, цикл 30 лет
+YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"
+_YEAR_OFFSET = {code: i for i, code in enumerate(YEAR_CODES)}
+
+# Значения символов и веса позиций для контрольного символа
+_VALUES = {
+    **{str(d): d for d in range(10)},
+    "A": 1, "B": 2, "C": 3, "D": 4, "E": 5, "F": 6, "G": 7, "H": 8,
+    "J": 1, "K": 2, "L": 3, "M": 4, "N": 5, "P": 7, "R": 9,
+    "S": 2, "T": 3, "U": 4, "V": 5, "W": 6, "X": 7, "Y": 8, "Z": 9,
+}
+_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+# Вклад символа в сумму по позициям: одна таблица на позицию вместо
+# умножения значения на вес для каждого символа
+_WEIGHTED = tuple(
+    {c: v * w for c, v in _VALUES.items()} for w in _WEIGHTS
+)
+
+_VIN_RE = re.compile(r"^[A-HJ-NPR-Z0-9]{17}$")
+# I, O, Q в VIN запрещены — OCR так читает 1 и 0
+_FORBIDDEN_TO_DIGIT = str.maketrans("IOQ", "100")
+# Символы, которые OCR путает между собой и которые оба допустимы в VIN
+_AMBIGUOUS = {
+    "B": "8", "8": "B", "S": "5", "5": "S",
+    "Z": "2", "2": "Z", "G": "6", "6": "G",
+}
+# Больше неоднозначных позиций не перебираем: 2^6 вариантов, и при
+# большем числе случайное совпадение контрольного символа вероятнее
+MAX_REPAIR_POSITIONS = 6
+
+# Регионы, где контрольный символ обязателен: Северная Америка (WMI
+# на 1–5) и Китай (L, GB 16735). У остальных неверный контрольный
+# символ — не ошибка OCR, и перебор замен дал бы случайный VIN
+_CHECKSUM_REGIONS = "12345L"
+
+# Последний модельный год окна расшифровки: код года повторяется каждые
+# 30 лет, окно — (LATEST_MODEL_YEAR - 30, LATEST_MODEL_YEAR]. Константа,
+# а не «текущий год + 1»: результат не должен зависеть от даты запуска.
+# Сдвигать вместе с версией справочника (refdata.data_version)
+LATEST_MODEL_YEAR = 2030
+
+# WMI отечественных заводов, которые кодируют в 10-м символе год выпуска
+# по ОСТ 37.001.269 (АвтоВАЗ, ГАЗ, УАЗ, КАМАЗ). Сборочные заводы
+# иностранных марок (XW8 — VW Калуга, X7L — Renault Москва…) следуют схеме
+# своей марки, где 10-й символ может годом не быть
+MANUFACTURE_YEAR_WMI = frozenset(("XTA", "XTH", "X96", "XTT", "XTC"))
+
+
+def check_digit(vin: str) -> str:
+    """
+    Контрольный символ (9-я позиция) для VIN.
+
+    Args:
+        vin: 17 символов алфавита VIN; 9-я позиция в расчёт не входит.
+
+    Returns:
+        "0"–"9" или "X".
+    """
+    total = 0
+    for table, ch in zip(_WEIGHTED, vin.upper()):
+        total += table[ch]
+    rest = total % 11
+    return "X" if rest == 10 else str(rest)
+
+
+def is_valid(vin: str) -> bool:
+    """17 допустимых символов и верный контрольный символ."""
+    vin = vin.upper()
+    return bool(_VIN_RE.match(vin)) and vin[8] == check_digit(vin)
+
+
+def model_year(vin: str, max_year: int = LATEST_MODEL_YEAR) -> Optional[int]:
+    """
+    Модельный год по 10-му символу.
+
+    Код повторяется каждые 30 лет. У североамериканских VIN (WMI на 1–5)
+    эпоху задаёт 7-й символ: цифра — 1980–2009, буква — 2010–2039.
+    Для остальных берётся самый поздний год цикла, не больший max_year.
+
+    Returns:
+        Год или None, если символ не является кодом года.
+    """
+    if len(vin) < 10:
+        return None
+    offset = _YEAR_OFFSET.get(vin[9].upper())
+    if offset is None:
+        return None
+    year = 1980 + offset
+    if vin[0] in "12345" and len(vin) >= 7:
+        return year if vin[6].isdigit() else year + 30
+    while year + 30 <= max_year:
+        year += 30
+    return year
+
+
+def checksum_required(vin: str) -> bool:
+    """Обязателен ли контрольный символ для региона производителя."""
+    return bool(vin) and vin[0].upper() in _CHECKSUM_REGIONS
+
+
+def year_is_reliable(vin: str) -> bool:
+    """
+    Является ли 10-й символ кодом модельного года.
+
+    Да для регионов, где это обязательно вместе с контрольным символом
+    (Северная Америка, Китай — checksum_required), если он сошёлся,
+    и для отечественных заводов из MANUFACTURE_YEAR_WMI. Совпавший
+    контрольный символ европейского VIN ничего не доказывает: там он
+    произволен и сходится примерно в каждом одиннадцатом случае.
+    """
+    vin = vin.upper()
+    if checksum_required(vin):
+        return is_valid(vin)
+    return vin[:3] in MANUFACTURE_YEAR_WMI
+
+
+def manufacturer(vin: str) -> Optional[str]:
+    """Марка по WMI (refdata.WMIIndex.brand_for_vin) или None."""
+    if len(vin) < 3:
+        return None
+    return wmi_index().brand_for_vin(vin)
+
+
+def repair(text: str) -> Optional[str]:
+    """
+    Исправляет ошибки OCR в 17-символьном VIN.
+
+    1. I, O, Q заменяются на 1, 0, 0 — в VIN их не бывает.
+    2. Если контрольный символ обязателен (checksum_required), но не
+       сходится, перебираются замены неоднозначных символов (B/8, S/5,
+       Z/2, G/6), и если ровно один вариант даёт верный контрольный
+       символ — берётся он.
+
+    Returns:
+        Исправленный VIN или None, если строка не похожа на VIN
+        (не 17 символов после исправлений).
+    """
+    candidate = text.upper().translate(_FORBIDDEN_TO_DIGIT)
+    if not _VIN_RE.match(candidate):
+        return None
+    if not checksum_required(candidate) or is_valid(candidate):
+        return candidate
+    positions = [i for i, ch in enumerate(candidate) if ch in _AMBIGUOUS]
+    if not positions or len(positions) > MAX_REPAIR_POSITIONS:
+        return candidate
+    chars = list(candidate)
+    fixed = []
+    for mask in itertools.product((False, True), repeat=len(positions)):
+        if not any(mask):
+            continue
+        variant = chars[:]
+        for pos, swap in zip(positions, mask):
+            if swap:
+                variant[pos] = _AMBIGUOUS[variant[pos]]
+        variant = "".join(variant)
+        if is_valid(variant):
+            fixed.append(variant)
+            if len(fixed) > 1:
+                return candidate
+    return fixed[0] if fixed else candidate
+
+
+class DecodedVIN:
+    """
+    Что известно из VIN — подсказки для проверки формы, не поля СТС.
+
+    Attributes:
+        vin: VIN (в верхнем регистре).
+        valid: Контрольный символ сошёлся.
+        brand: Марка по WMI или None.
+        model_year: Модельный год по 10-му символу или None. Может быть
+            на год больше года выпуска из СТС.
+        model_year_reliable: 10-й символ — точно код года
+            (year_is_reliable); иначе model_year — лишь догадка.
+        manufacture_year: Год выпуска, как в СТС, или None. Известен
+            только для отечественных заводов (MANUFACTURE_YEAR_WMI):
+            у североамериканских и китайских VIN надёжный код года —
+            модельный год, он бывает на год больше (LVV…E → 2014
+            при годе выпуска 2013).
+    """
+
+    __slots__ = (
+        "vin", "valid", "brand", "model_year", "model_year_reliable",
+        "manufacture_year",
+    )
+
+    def __init__(self, vin: str):
+        self.vin = vin.upper()
+        self.valid = is_valid(self.vin)
+        self.brand = manufacturer(self.vin)
+        self.model_year = model_year(self.vin)
+        self.model_year_reliable = year_is_reliable(self.vin)
+        self.manufacture_year = (
+            self.model_year
+            if self.model_year_reliable and self.vin[:3] in MANUFACTURE_YEAR_WMI
+            else None
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "vin": self.vin,
+            "valid": self.valid,
+            "brand": self.brand,
+            "model_year": self.model_year,
+            "model_year_reliable": self.model_year_reliable,
+            "manufacture_year": self.manufacture_year,
+        }
+
+
+def decode(vin: str) -> Optional[DecodedVIN]:
+    """DecodedVIN для 17-символьного VIN или None."""
+    if not _VIN_RE.match(vin.upper()):
+        return None
+    return DecodedVIN(vin)
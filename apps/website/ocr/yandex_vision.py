@@ -3,79 +3,357 @@
 
 Endpoint: https://ocr.api.cloud.yandex.net/ocr/v1/recognizeText
 Документация: https://yandex.cloud/ru/docs/vision/ocr/api-ref/TextRecognition/recognize
+
+HTTP-запросы идут через VisionClient — один на процесс, с пулом
+keep-alive соединений: TCP/TLS-рукопожатие с ocr.api.cloud.yandex.net
+выполняется один раз, а не на каждую загрузку. Тело запроса строится
+потоково из файла (см. streaming.py) — без полных копий фото в памяти.
+Из ответа остаются только поля, нужные парсеру (см. annotation.py).
 """
-import base64
 import logging
+import os
+import threading
+import weakref
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from .annotation import decode_response
+from .cache import get_ocr_cache, ocr_cache_key
+from .conf import ocr_setting
+from .errors import VisionError
+from .preprocess import preprocess_available, preprocess_image
+from .ratelimit import DEFAULT_MAX_WAIT
+from .resilience import ResilientVisionCaller, build_resilient_caller
+from .streaming import Base64JSONBody, ImageSource
+from .timing import record, stage
 
 logger = logging.getLogger(__name__)
 
+# Адрес по умолчанию; переопределяется настройкой YANDEX_VISION_OCR_ENDPOINT
+# (например, scripts/fake_vision_server.py для нагрузочных тестов)
 OCR_ENDPOINT = "https://ocr.api.cloud.yandex.net/ocr/v1/recognizeText"
 
 # Таймаут в секундах — Vision OCR обычно отвечает за 1–3 сек
 REQUEST_TIMEOUT = 20
 
+# Таймаут установки соединения: при живом пуле он почти не нужен,
+# а недоступный хост лучше обнаружить за секунды, а не за REQUEST_TIMEOUT
+CONNECT_TIMEOUT = 3.05
+
+# Соединений в пуле на процесс (≥ числа потоков, вызывающих Vision)
+POOL_SIZE = 10
+
+
+class _CountingAdapter(HTTPAdapter):
+    """
+    HTTPAdapter, который считает открытые соединения.
+
+    Соединение ответа (публичное HTTPResponse.connection urllib3)
+    запоминается в WeakSet: новое — открыто для этого запроса, уже
+    виденное — переиспользовано из пула. Внутренние структуры
+    PoolManager не читаются.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._seen: "weakref.WeakSet" = weakref.WeakSet()
+        self._count_lock = threading.Lock()
+        self.connections_opened = 0
+
+    def send(self, request, *args, **kwargs):
+        resp = super().send(request, *args, **kwargs)
+        conn = getattr(resp.raw, "connection", None)
+        if conn is not None:
+            with self._count_lock:
+                if conn not in self._seen:
+                    self._seen.add(conn)
+                    self.connections_opened += 1
+        return resp
+
+
+class VisionClient:
+    """
+    Клиент Vision OCR с пулом keep-alive соединений.
+
+    Создаётся один раз на процесс (см. get_vision_client) и разделяется
+    между запросами и потоками: requests.Session + HTTPAdapter держат
+    до pool_size открытых соединений к Vision. С compact=True из ответа
+    остаются только поля парсера (annotation.compact_annotation).
+    """
+
+    def __init__(
+        self,
+        endpoint: str = OCR_ENDPOINT,
+        pool_size: int = POOL_SIZE,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = REQUEST_TIMEOUT,
+        compact: bool = True,
+    ):
+        self.endpoint = endpoint
+        self.compact = compact
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self._adapter = _CountingAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+        )
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+
+    def recognize(
+        self,
+        image: ImageSource,
+        api_key: str,
+        folder_id: str,
+        mime_type: str = "JPEG",
+    ) -> tuple[Optional[dict], Optional[str]]:
+        """
+        Отправляет изображение в Vision OCR и возвращает textAnnotation.
+
+        Args:
+            image: Байты изображения или файловый объект (UploadedFile,
+                временный файл) — читается кусками с начала.
+            api_key: API-ключ Yandex Cloud.
+            folder_id: ID каталога Yandex Cloud.
+            mime_type: Тип изображения: "JPEG", "PNG" или "PDF".
+
+        Returns:
+            (text_annotation_dict, error_message) — ровно одно из полей None.
+        """
+        try:
+            return (self.request(image, api_key, folder_id, mime_type), None)
+        except VisionError as exc:
+            return (None, str(exc))
+
+    def request(
+        self,
+        image: ImageSource,
+        api_key: str,
+        folder_id: str,
+        mime_type: str = "JPEG",
+    ) -> dict:
+        """
+        То же, что recognize(), но ошибки выбрасываются как VisionError.
+
+        Нужно слою устойчивости (resilience.py), чтобы отличать временные
+        ошибки (5xx, сбой соединения) от постоянных.
+
+        Returns:
+            textAnnotation.
+
+        Raises:
+            VisionError: Ошибка соединения, HTTP-статус ≠ 200, битый ответ.
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Api-Key {api_key}",
+            "x-folder-id": folder_id,
+        }
+        with self._lock:
+            self.requests_sent += 1
+        # Тело читается во время отправки: vision_post включает base64
+        body = Base64JSONBody(image, mime_type)
+        try:
+            with stage("vision_post"):
+                resp = self.session.post(
+                    self.endpoint,
+                    data=body,
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+        except requests.ConnectionError as exc:
+            # Включает ConnectTimeout: до Vision не достучались — повторяем
+            logger.warning("Vision OCR connection failed: %s", exc)
+            raise VisionError(
+                str(exc),
+                transient=True,
+                timeout=isinstance(exc, requests.Timeout),
+            ) from exc
+        except requests.Timeout as exc:
+            logger.warning("Vision OCR read timeout: %s", exc)
+            raise VisionError(str(exc), timeout=True) from exc
+        except requests.RequestException as exc:
+            logger.warning("Vision OCR request failed: %s", exc)
+            raise VisionError(str(exc)) from exc
+        finally:
+            record("base64", body.encode_seconds)
+
+        if resp.status_code != 200:
+            msg = f"Vision OCR HTTP {resp.status_code}: {resp.text[:200]}"
+            logger.warning(msg)
+            raise VisionError(
+                msg,
+                status=resp.status_code,
+                transient=resp.status_code >= 500,
+            )
+
+        try:
+            with stage("decode"):
+                ta = decode_response(resp.content, compact=self.compact)
+        except ValueError as exc:
+            raise VisionError(
+                f"Vision OCR response parse error: {exc}",
+                status=resp.status_code,
+            ) from exc
+
+        if ta is None:
+            raise VisionError(
+                "Vision OCR: нет textAnnotation в ответе",
+                status=resp.status_code,
+            )
+        return ta
+
+    def stats(self) -> dict:
+        """
+        Статистика переиспользования соединений.
+
+        Returns:
+            {"requests": N, "connections_opened": M,
+             "connections_reused": N - M, "reuse_ratio": 0..1}
+        """
+        opened = self._adapter.connections_opened
+        with self._lock:
+            sent = self.requests_sent
+        reused = max(sent - opened, 0)
+        return {
+            "requests": sent,
+            "connections_opened": opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / sent, 3) if sent else 0.0,
+        }
+
+    def close(self) -> None:
+        """Закрывает все соединения пула."""
+        self.session.close()
+
+
+_client: Optional[VisionClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_vision_client() -> VisionClient:
+    """
+    Возвращает VisionClient текущего процесса.
+
+    После fork (gunicorn --preload) создаётся новый клиент: сокеты
+    родительского процесса в дочернем использовать нельзя.
+    Настройки: YANDEX_VISION_OCR_ENDPOINT, YANDEX_VISION_POOL_SIZE,
+    YANDEX_VISION_CONNECT_TIMEOUT, YANDEX_VISION_READ_TIMEOUT,
+    YANDEX_VISION_COMPACT_RESPONSE. Без Django
+    (скрипты) адрес берётся из переменной окружения с тем же именем.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = VisionClient(
+                    endpoint=(
+                        ocr_setting("YANDEX_VISION_OCR_ENDPOINT", "")
+                        or os.environ.get("YANDEX_VISION_OCR_ENDPOINT")
+                        or OCR_ENDPOINT
+                    ),
+                    pool_size=int(ocr_setting(
+                        "YANDEX_VISION_POOL_SIZE", POOL_SIZE,
+                    )),
+                    connect_timeout=float(ocr_setting(
+                        "YANDEX_VISION_CONNECT_TIMEOUT", CONNECT_TIMEOUT,
+                    )),
+                    read_timeout=float(ocr_setting(
+                        "YANDEX_VISION_READ_TIMEOUT", REQUEST_TIMEOUT,
+                    )),
+                    compact=bool(ocr_setting(
+                        "YANDEX_VISION_COMPACT_RESPONSE", True,
+                    )),
+                )
+                _client_pid = pid
+    return _client
+
+
+_caller: Optional[ResilientVisionCaller] = None
+
+
+def get_resilient_caller() -> ResilientVisionCaller:
+    """
+    Возвращает обёртку с повторами и circuit breaker над клиентом процесса.
+
+    Пересоздаётся вместе с VisionClient (после fork). Настройки:
+    OCR_RETRY_*, OCR_HEDGE_*, OCR_BREAKER_* (см. resilience.py).
+    """
+    global _caller
+    client = get_vision_client()
+    caller = _caller
+    if caller is None or caller.client is not client:
+        with _client_lock:
+            if _caller is None or _caller.client is not client:
+                _caller = build_resilient_caller(client)
+            caller = _caller
+    return caller
+
 
 def recognize_document(
-    image_bytes: bytes,
+    image: ImageSource,
     api_key: str,
     folder_id: str,
     mime_type: str = "JPEG",
+    use_cache: bool = True,
+    max_wait: Optional[float] = None,
 ) -> tuple[Optional[dict], Optional[str]]:
     """
     Вызывает Yandex Vision OCR API и возвращает textAnnotation.
 
+    Повторная загрузка того же изображения отдаётся из кэша (см. cache.py)
+    без обращения к Vision. Ошибки не кэшируются. Перед отправкой фото
+    уменьшается и пережимается в JPEG (см. preprocess.py); ключ кэша
+    считается по исходным байтам. Временные ошибки Vision повторяются,
+    при частых сбоях запросы сразу отклоняются (см. resilience.py).
+    Каждый запрос к Vision, включая повторы, проходит через общий лимит
+    запросов в секунду (см. ratelimit.py). Время этапов (preprocess,
+    rate_wait, base64, vision_post, decode) записывается в timing.py.
+
     Args:
-        image_bytes: Содержимое изображения в байтах.
+        image: Байты изображения или файловый объект (UploadedFile) —
+            файл не читается в память целиком.
         api_key: API-ключ Yandex Cloud.
         folder_id: ID каталога Yandex Cloud.
         mime_type: Тип изображения: "JPEG", "PNG" или "PDF".
+        use_cache: Читать/писать кэш результатов OCR.
+        max_wait: Сколько секунд можно ждать очереди лимита запросов
+            (по умолчанию OCR_RATE_MAX_WAIT).
 
     Returns:
         (text_annotation_dict, error_message) — ровно одно из полей None.
+
+    Raises:
+        VisionBusyError: Лимит запросов исчерпан дольше, чем на max_wait.
     """
-    content_b64 = base64.b64encode(image_bytes).decode("utf-8")
-    payload = {
-        "mimeType": mime_type,
-        "languageCodes": ["ru", "en"],
-        "content": content_b64,
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Api-Key {api_key}",
-        "x-folder-id": folder_id,
-    }
-    try:
-        resp = requests.post(
-            OCR_ENDPOINT,
-            json=payload,
-            headers=headers,
-            timeout=REQUEST_TIMEOUT,
-        )
-    except requests.RequestException as exc:
-        logger.warning("Vision OCR request failed: %s", exc)
-        return (None, str(exc))
-
-    if resp.status_code != 200:
-        msg = f"Vision OCR HTTP {resp.status_code}: {resp.text[:200]}"
-        logger.warning(msg)
-        return (None, msg)
-
-    try:
-        data = resp.json()
-    except Exception as exc:
-        return (None, f"Vision OCR response parse error: {exc}")
-
-    ta = (
-        data.get("result", {}).get("textAnnotation")
-        or data.get("textAnnotation")
-    )
-    if ta is None:
-        return (None, "Vision OCR: нет textAnnotation в ответе")
+    cache = get_ocr_cache() if use_cache else None
+    cache_key = ""
+    if cache is not None:
+        cache_key = ocr_cache_key(image, mime_type)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info("Vision OCR: cache hit %s", cache_key[:12])
+            return (cached, None)
+
+    upload, upload_mime = image, mime_type
+    if preprocess_available():
+        with stage("preprocess"):
+            upload, upload_mime, _ = preprocess_image(image, mime_type)
 
-    return (ta, None)
+    if max_wait is None:
+        max_wait = float(ocr_setting("OCR_RATE_MAX_WAIT", DEFAULT_MAX_WAIT))
+    ta, err = get_resilient_caller().recognize(
+        upload, api_key, folder_id, upload_mime, max_wait=max_wait,
+    )
+    if ta is not None and cache is not None:
+        cache.set(cache_key, ta)
+    return (ta, err)
 
 
 def mime_from_filename(filename: str) -> str:
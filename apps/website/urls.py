@@ -13,6 +13,16 @@ urlpatterns = [
     path('contacts/', views.ContactsView.as_view(), name='contacts'),
     path('booking/', views.BookingView.as_view(), name='booking'),
     path('booking/ocr-sts/', views.ocr_sts_view, name='ocr_sts'),
+    path(
+        'booking/ocr-sts/jobs/',
+        views.ocr_sts_submit_view,
+        name='ocr_sts_submit',
+    ),
+    path(
+        'booking/ocr-sts/jobs/<str:job_id>/',
+        views.ocr_sts_job_view,
+        name='ocr_sts_job',
+    ),
     path(
         'booking/check-conflicts/',
         views.check_conflicts_view,
@@ -3,9 +3,9 @@
 """
 import logging
 
-from django.conf import settings
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib import messages
 from django.views.generic import TemplateView
 from django.views import View
@@ -13,7 +13,16 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
 from .forms import BookingForm, FeedbackForm, EstimateRequestForm
-from .ocr import recognize_document, mime_from_filename, parse_sts
+from .ocr import (
+    VisionBusyError,
+    get_ocr_backends,
+    mime_from_filename,
+    parse_sts_cached,
+    recognize_text,
+)
+from .ocr.conf import parse_budget
+from .ocr.jobs import OCRJobQueueFull, get_ocr_job, submit_ocr_job
+from .ocr.timing import collect as collect_timings, stage
 from apps.core.models import Client, Vehicle, BookingRequest
 from apps.core.services.email import (
     send_verification_email,
@@ -539,67 +548,100 @@ def dashboard_view(request):
 # OCR СТС
 # ---------------------------------------------------------------------------
 
-@require_http_methods(['POST'])
-def ocr_sts_view(request):
+def _read_ocr_upload(request):
     """
-    API: распознавание СТС через Yandex Vision OCR + локальный парсер.
+    Проверяет загрузку фото СТС и наличие настроенного бэкенда OCR.
 
-    1. Yandex Vision OCR API → textAnnotation (1–3 сек)
-    2. Локальный парсер sts_parser.py → поля формы (мгновенно)
+    Файл в память целиком не читается: Vision получает его потоково.
 
-    Принимает POST с полем 'image' (файл изображения).
-    Возвращает JSON с полями для автозаполнения формы.
+    Returns:
+        (params, None) — params: image, mime, backends;
+        (None, JsonResponse) — ответ с ошибкой для клиента.
     """
     image_file = request.FILES.get('image')
     if not image_file:
-        return JsonResponse(
+        return None, JsonResponse(
             {'error': 'Не указано изображение'},
             status=400,
         )
 
     if image_file.size > 10 * 1024 * 1024:
-        return JsonResponse(
+        return None, JsonResponse(
             {'error': 'Файл слишком большой (макс. 10 МБ)'},
             status=400,
         )
 
-    try:
-        image_bytes = image_file.read()
-    except Exception as e:
-        logger.error("Ошибка чтения файла: %s", e, exc_info=True)
-        return JsonResponse(
-            {'error': str(e), 'data': {}}, status=500
-        )
-
-    api_key = getattr(settings, 'YANDEX_VISION_API_KEY', '') or ''
-    folder_id = getattr(settings, 'YANDEX_FOLDER_ID', '') or ''
-
-    if not api_key or not folder_id:
-        return JsonResponse(
+    backends = get_ocr_backends()
+    if not backends:
+        return None, JsonResponse(
             {
                 'error': (
                     'OCR недоступен: настройте YANDEX_VISION_API_KEY'
-                    ' и YANDEX_FOLDER_ID в .env'
+                    ' и YANDEX_FOLDER_ID в .env или OCR_BACKENDS'
                 ),
                 'data': {},
             },
             status=503,
         )
 
+    return {
+        'image': image_file,
+        'mime': mime_from_filename(image_file.name or ''),
+        'backends': backends,
+    }, None
+
+
+@require_http_methods(['POST'])
+def ocr_sts_view(request):
+    """
+    API: распознавание СТС через бэкенд OCR + локальный парсер.
+
+    1. Yandex Vision OCR API (или следующий бэкенд цепочки
+       OCR_BACKENDS) → textAnnotation (1–3 сек)
+    2. Локальный парсер sts_parser.py → поля формы (мгновенно)
+
+    Принимает POST с полем 'image' (файл изображения).
+    Возвращает JSON с полями для автозаполнения формы.
+    Синхронный режим: воркер занят на всё время вызова Vision —
+    страница записи использует ocr_sts_submit_view. При исчерпанном
+    лимите запросов к Vision — 429 с Retry-After. Время этапов
+    (загрузка, Vision, разбор JSON, экстракторы) — в заголовке
+    Server-Timing и в поле лога ocr_timings (см. ocr/timing.py).
+    """
+    with collect_timings() as timings:
+        response = _ocr_sts(request, timings)
+    response['Server-Timing'] = timings.server_timing()
+    return response
+
+
+def _ocr_sts(request, timings):
+    """Тело ocr_sts_view: замеры этапов копятся в timings."""
+    with stage('upload'):
+        params, error_response = _read_ocr_upload(request)
+    if error_response is not None:
+        return error_response
+
     try:
-        mime = mime_from_filename(image_file.name or '')
-        ta, vision_err = recognize_document(
-            image_bytes, api_key, folder_id, mime,
+        ta, vision_err = recognize_text(
+            params['image'],
+            params['mime'],
+            params['backends'],
         )
         if ta is not None:
-            form_data = parse_sts(ta)
+            with stage('parse'):
+                form_data = parse_sts_cached(ta, budget=parse_budget())
             logger.info(
                 "OCR СТС: успешно, VIN=%s",
                 form_data.get('vehicle_vin', ''),
+                extra={'ocr_timings': timings.as_dict()},
             )
             return JsonResponse(
                 {'success': True, 'data': form_data}
             )
+        logger.info(
+            "OCR СТС: не распознано: %s", vision_err,
+            extra={'ocr_timings': timings.as_dict()},
+        )
         return JsonResponse(
             {
                 'error': (
@@ -609,13 +651,80 @@ def ocr_sts_view(request):
             },
             status=200,
         )
+    except VisionBusyError as e:
+        # Лимит запросов к Vision: браузер повторит через Retry-After
+        response = JsonResponse(
+            {'error': str(e), 'retry_after': e.retry_after, 'data': {}},
+            status=429,
+        )
+        response['Retry-After'] = str(e.retry_after)
+        return response
     except Exception as e:
-        logger.error("Ошибка OCR СТС: %s", e, exc_info=True)
+        logger.error(
+            "Ошибка OCR СТС: %s", e, exc_info=True,
+            extra={'ocr_timings': timings.as_dict()},
+        )
         return JsonResponse(
             {'error': str(e), 'data': {}}, status=500
         )
 
 
+@require_http_methods(['POST'])
+def ocr_sts_submit_view(request):
+    """
+    API: ставит распознавание СТС в фоновую очередь.
+
+    Принимает POST с полем 'image'. Сразу возвращает 202 с job_id
+    и status_url — результат забирается опросом ocr_sts_job_view.
+    При заполненной очереди — 503 с Retry-After.
+    """
+    params, error_response = _read_ocr_upload(request)
+    if error_response is not None:
+        return error_response
+
+    try:
+        job_id = submit_ocr_job(params['image'], params['mime'])
+    except OCRJobQueueFull:
+        response = JsonResponse(
+            {
+                'error': 'Сервис распознавания перегружен, '
+                         'попробуйте через несколько секунд',
+                'retry_after': 5,
+                'data': {},
+            },
+            status=503,
+        )
+        response['Retry-After'] = '5'
+        return response
+
+    return JsonResponse(
+        {
+            'job_id': job_id,
+            'status_url': reverse(
+                'website:ocr_sts_job', args=[job_id],
+            ),
+        },
+        status=202,
+    )
+
+
+@require_http_methods(['GET'])
+def ocr_sts_job_view(request, job_id):
+    """
+    API: статус фоновой задачи OCR.
+
+    Возвращает {'status': 'pending'} пока задача выполняется,
+    затем тот же JSON, что и ocr_sts_view ('success'/'data'/'error').
+    """
+    state = get_ocr_job(job_id)
+    if state is None:
+        return JsonResponse(
+            {'error': 'Задача не найдена или устарела', 'data': {}},
+            status=404,
+        )
+    return JsonResponse(state)
+
+
 # ---------------------------------------------------------------------------
 # Обратная связь
 # ---------------------------------------------------------------------------
@@ -117,6 +117,117 @@ YANDEX_VISION_API_KEY = (
     or os.getenv('YANDEX_IAM_TOKEN', '')
 )
 YANDEX_FOLDER_ID = os.getenv('YANDEX_FOLDER_ID', '')
+# Бэкенды OCR по порядку: при ошибке первого пробуется следующий.
+# yandex — Vision API; tesseract — локально (pytesseract + tesseract-ocr-rus)
+OCR_BACKENDS = [
+    name.strip()
+    for name in os.getenv('OCR_BACKENDS', 'yandex').split(',')
+    if name.strip()
+]
+OCR_TESSERACT_LANG = os.getenv('OCR_TESSERACT_LANG', 'rus+eng')
+OCR_TESSERACT_CMD = os.getenv('OCR_TESSERACT_CMD', '')
+# Адрес Vision OCR; для нагрузочных тестов — scripts/fake_vision_server.py
+YANDEX_VISION_OCR_ENDPOINT = os.getenv(
+    'YANDEX_VISION_OCR_ENDPOINT',
+    'https://ocr.api.cloud.yandex.net/ocr/v1/recognizeText',
+)
+# Пул keep-alive соединений к Vision (на процесс) и таймауты, сек
+YANDEX_VISION_POOL_SIZE = int(os.getenv('YANDEX_VISION_POOL_SIZE', '10'))
+YANDEX_VISION_CONNECT_TIMEOUT = float(
+    os.getenv('YANDEX_VISION_CONNECT_TIMEOUT', '3.05')
+)
+YANDEX_VISION_READ_TIMEOUT = float(
+    os.getenv('YANDEX_VISION_READ_TIMEOUT', '20')
+)
+# Оставлять от ответа Vision только поля парсера (без слов и символов);
+# False — полный ответ, например для сохранения кэшей scripts/_ocr_raw_*
+YANDEX_VISION_COMPACT_RESPONSE = (
+    os.getenv('YANDEX_VISION_COMPACT_RESPONSE', 'True') == 'True'
+)
+
+# Общий лимит запросов к Vision (квота каталога), запросов/сек; 0 — без
+# лимита. Ведро токенов в кэше 'ocr': с REDIS_URL — одно на все хосты,
+# с файловым кэшем — на хост. Токен берёт каждый запрос к Vision, включая
+# повторы. Ждать своей очереди — не дольше OCR_RATE_MAX_WAIT сек, иначе 429.
+OCR_RATE_LIMIT = float(os.getenv('OCR_RATE_LIMIT', '0'))
+OCR_RATE_BURST = float(os.getenv('OCR_RATE_BURST', '0'))
+OCR_RATE_MAX_WAIT = float(os.getenv('OCR_RATE_MAX_WAIT', '2'))
+
+# Предобработка фото перед OCR (нужен Pillow): уменьшение длинной стороны
+# до OCR_PREPROCESS_MAX_SIDE px и пережатие в JPEG
+OCR_PREPROCESS_ENABLED = (
+    os.getenv('OCR_PREPROCESS_ENABLED', 'True') == 'True'
+)
+OCR_PREPROCESS_MAX_SIDE = int(os.getenv('OCR_PREPROCESS_MAX_SIDE', '2000'))
+OCR_PREPROCESS_JPEG_QUALITY = int(
+    os.getenv('OCR_PREPROCESS_JPEG_QUALITY', '85')
+)
+
+# Кэш результатов OCR по хэшу изображения (повторные загрузки того же фото)
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', 'True') == 'True'
+OCR_CACHE_TTL = int(os.getenv('OCR_CACHE_TTL', '86400'))  # сутки
+OCR_CACHE_MAX_ENTRIES = int(os.getenv('OCR_CACHE_MAX_ENTRIES', '2000'))
+# Локальный LRU в каждом воркере (textAnnotation ~100 КБ на запись)
+OCR_CACHE_LOCAL_MAX_ENTRIES = int(
+    os.getenv('OCR_CACHE_LOCAL_MAX_ENTRIES', '64')
+)
+# Мемоизация parse_sts по дайджесту textAnnotation (тот же кэш «ocr»)
+OCR_PARSE_MEMO_ENABLED = (
+    os.getenv('OCR_PARSE_MEMO_ENABLED', 'True') == 'True'
+)
+OCR_PARSE_MEMO_LOCAL_MAX_ENTRIES = int(
+    os.getenv('OCR_PARSE_MEMO_LOCAL_MAX_ENTRIES', '512')
+)
+
+# Фоновые задачи OCR (submit/poll): потоки на воркер и предел очереди
+OCR_JOB_WORKERS = int(os.getenv('OCR_JOB_WORKERS', '4'))
+OCR_JOB_MAX_PENDING = int(os.getenv('OCR_JOB_MAX_PENDING', '16'))
+OCR_JOB_TTL = int(os.getenv('OCR_JOB_TTL', '600'))
+
+# Бюджет разбора СТС в запросе, сек: после него дорогие фолбэки parse_sts
+# пропускаются (поля остаются пустыми). 0 — без ограничения
+OCR_PARSE_BUDGET = float(os.getenv('OCR_PARSE_BUDGET', '0.25'))
+
+# Устойчивость вызовов Vision: повторы временных ошибок (5xx, сбой
+# соединения), хедж-запрос после p95 задержки, circuit breaker
+OCR_RETRY_MAX = int(os.getenv('OCR_RETRY_MAX', '2'))
+OCR_RETRY_BACKOFF = float(os.getenv('OCR_RETRY_BACKOFF', '0.25'))
+OCR_HEDGE_ENABLED = os.getenv('OCR_HEDGE_ENABLED', 'False') == 'True'
+# Задержка хеджа, сек; пусто — p95 последних ответов Vision
+OCR_HEDGE_AFTER = os.getenv('OCR_HEDGE_AFTER', '')
+OCR_BREAKER_ENABLED = os.getenv('OCR_BREAKER_ENABLED', 'True') == 'True'
+OCR_BREAKER_FAILURE_RATE = float(
+    os.getenv('OCR_BREAKER_FAILURE_RATE', '0.5')
+)
+OCR_BREAKER_MIN_CALLS = int(os.getenv('OCR_BREAKER_MIN_CALLS', '5'))
+OCR_BREAKER_WINDOW = int(os.getenv('OCR_BREAKER_WINDOW', '60'))
+OCR_BREAKER_COOLDOWN = int(os.getenv('OCR_BREAKER_COOLDOWN', '30'))
+
+# Кэши. Алиас 'ocr' должен быть общим для всех gunicorn-воркеров:
+# по умолчанию — файловый (один хост), при REDIS_URL — Redis (кластер).
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    _OCR_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+else:
+    _OCR_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'ocr',
+    }
+_OCR_CACHE.update({
+    'TIMEOUT': OCR_CACHE_TTL,
+    'KEY_PREFIX': 'autoservice',
+    'OPTIONS': {'MAX_ENTRIES': OCR_CACHE_MAX_ENTRIES},
+})
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'ocr': _OCR_CACHE,
+}
 
 # --- Email (SMTP при EMAIL_BACKEND=smtp) ---
 # Публичный URL сайта для ссылок в письмах (обязательно за reverse-proxy / Docker)
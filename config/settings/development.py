@@ -26,9 +26,16 @@ EMAIL_BACKEND = os.getenv(
     'django.core.mail.backends.console.EmailBackend',
 )
 
-# Отключаем кэширование в разработке
+# Отключаем кэширование в разработке (кроме кэша OCR — runserver
+# однопроцессный, хватает памяти процесса)
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+    },
+    'ocr': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ocr',
+        'TIMEOUT': OCR_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': OCR_CACHE_MAX_ENTRIES},
+    },
 }
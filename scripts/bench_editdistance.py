@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+Микробенчмарк расстояния Левенштейна для нормализации марок и моделей.
+
+Сравнивает прежнюю таблицу ДП из sts_parser (_levenshtein_dp ниже —
+её копия, с обрывом после 15 символов) с бит-параллельным
+editdistance.levenshtein, пакетным levenshtein_many и поиском по
+BK-дереву марок. Перед замером проверяет, что бит-параллельная версия
+совпадает с полной таблицей ДП на случайных строках любой длины.
+
+Запуск:
+    python scripts/bench_editdistance.py
+    python scripts/bench_editdistance.py --number 20000 --long 60
+"""
+import argparse
+import io
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(
+        sys.stdout.buffer, encoding="utf-8", errors="replace"
+    )
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from apps.website.ocr import refdata  # noqa: E402
+from apps.website.ocr.editdistance import (  # noqa: E402
+    levenshtein,
+    levenshtein_many,
+)
+
+# Искажённые OCR марки: запросы к словарю
+QUERIES = (
+    "T0Y0TA", "HYUNDA1", "VOLKSWAGN", "M1TSUB1SHI", "MERSEDES-BENZ",
+    "ТОИОТА", "RKODA", "LEXSUS", "5UBARU", "OMODA",
+)
+
+
+def _levenshtein_dp(a: str, b: str, cliff: bool = True) -> int:
+    """Прежняя реализация: таблица ДП по строкам, обрыв после 15."""
+    if cliff and (len(a) > 15 or len(b) > 15):
+        return abs(len(a) - len(b))
+    if not a:
+        return len(b)
+    if not b:
+        return len(a)
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a):
+        curr = [i + 1]
+        for j, cb in enumerate(b):
+            curr.append(min(
+                prev[j + 1] + 1,
+                curr[j] + 1,
+                prev[j] + (ca != cb),
+            ))
+        prev = curr
+    return prev[-1]
+
+
+def verify(samples: int, seed: int) -> int:
+    """Сверка с полной таблицей ДП; возвращает число расхождений."""
+    rng = random.Random(seed)
+    alphabet = "ABCDEЕАО01 -"
+    mismatches = 0
+    for _ in range(samples):
+        a = "".join(
+            rng.choice(alphabet) for _ in range(rng.randint(0, 80))
+        )
+        b = "".join(
+            rng.choice(alphabet) for _ in range(rng.randint(0, 80))
+        )
+        if levenshtein(a, b) != _levenshtein_dp(a, b, cliff=False):
+            mismatches += 1
+    return mismatches
+
+
+def _per_call_us(func, number: int, calls: int) -> float:
+    """Лучшее из трёх серий, мкс на одно сравнение."""
+    best = min(timeit.repeat(func, number=number, repeat=3))
+    return round(best / number / calls * 1e6, 3)
+
+
+def run(number: int, long_len: int, seed: int) -> dict:
+    vocab = sorted(
+        refdata.canonical_brands() | set(refdata.brand_aliases())
+    )
+    pairs = len(QUERIES) * len(vocab)
+    rng = random.Random(seed)
+    long_a = "".join(rng.choice("ABCDEFGH ") for _ in range(long_len))
+    long_b = "".join(rng.choice("ABCDEFGH ") for _ in range(long_len))
+    report = {
+        "vocab": len(vocab),
+        "short_us": {
+            "dp": _per_call_us(
+                lambda: [_levenshtein_dp(q, w) for q in QUERIES for w in vocab],
+                max(number // pairs, 1), pairs,
+            ),
+            "bitparallel": _per_call_us(
+                lambda: [levenshtein(q, w) for q in QUERIES for w in vocab],
+                max(number // pairs, 1), pairs,
+            ),
+            "bitparallel_many": _per_call_us(
+                lambda: [levenshtein_many(q, vocab) for q in QUERIES],
+                max(number // pairs, 1), pairs,
+            ),
+        },
+        f"long_{long_len}_us": {
+            "dp_full": _per_call_us(
+                lambda: _levenshtein_dp(long_a, long_b, cliff=False),
+                max(number // 100, 1), 1,
+            ),
+            "bitparallel": _per_call_us(
+                lambda: levenshtein(long_a, long_b),
+                max(number // 100, 1), 1,
+            ),
+        },
+        "brand_lookup_us": {
+            "bktree": _per_call_us(
+                lambda: [
+                    refdata.brand_index().best(q, 2) for q in QUERIES
+                ],
+                max(number // 100, 1), len(QUERIES),
+            ),
+            "linear_scan": _per_call_us(
+                lambda: [
+                    min(zip(levenshtein_many(q, vocab), vocab))
+                    for q in QUERIES
+                ],
+                max(number // 100, 1), len(QUERIES),
+            ),
+        },
+    }
+    short = report["short_us"]
+    report["speedup_short"] = round(short["dp"] / short["bitparallel_many"], 2)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Микробенчмарк расстояния Левенштейна",
+    )
+    parser.add_argument(
+        "--number", type=int, default=20000,
+        help="Примерное число сравнений в серии",
+    )
+    parser.add_argument(
+        "--long", type=int, default=40,
+        help="Длина строк для замера без обрыва длины",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--verify", type=int, default=2000,
+        help="Случайных пар для сверки с таблицей ДП (0 — без сверки)",
+    )
+    args = parser.parse_args()
+
+    if args.verify:
+        mismatches = verify(args.verify, args.seed)
+        if mismatches:
+            print(
+                f"Расхождений с таблицей ДП: {mismatches} из {args.verify}",
+                file=sys.stderr,
+            )
+            return 1
+    report = run(args.number, args.long, args.seed)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+"""
+Бенчмарк парсера СТС на сохранённых OCR-ответах.
+
+Прогоняет parse_sts и каждый этап разбора (_extract_*) на кэшах
+scripts/_ocr_raw_*.json много раз и печатает JSON: среднее, p50 и p99
+времени вызова (мкс) и пик памяти на вызов (tracemalloc) по этапам.
+С --baseline сравнивает с сохранённым прогоном и завершается с кодом 1,
+если какой-то этап стал заметно медленнее — так ловятся тяжёлые регулярки
+и фолбэки, случайно попавшие в горячий путь.
+
+Запуск:
+    python scripts/bench_sts_parser.py --save-baseline bench_baseline.json
+    python scripts/bench_sts_parser.py --baseline bench_baseline.json
+
+Базовый прогон зависит от машины — сохраняйте его на той же машине,
+где потом сравниваете.
+"""
+import argparse
+import gc
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(
+        sys.stdout.buffer, encoding="utf-8", errors="replace"
+    )
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from apps.website.ocr import sts_parser as sp  # noqa: E402
+from apps.website.ocr.annotation import decode_response  # noqa: E402
+from apps.website.ocr.layout import LineLayout  # noqa: E402
+from apps.website.ocr.timing import percentile  # noqa: E402
+
+CACHE_DIR = Path(__file__).parent
+
+# Порог регрессии: этап медленнее базового на столько (доля) и при этом
+# хотя бы на MIN_DELTA_US мкс — иначе шум таймера на быстрых этапах
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_DELTA_US = 5.0
+
+
+def load_fixtures(pattern: str) -> dict[str, dict]:
+    """
+    Загружает textAnnotation из сохранённых ответов Vision.
+
+    Args:
+        pattern: Шаблон имён файлов в scripts/.
+
+    Returns:
+        {имя файла без _ocr_raw_: textAnnotation}.
+    """
+    fixtures = {}
+    for path in sorted(CACHE_DIR.glob(pattern)):
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        ta = raw.get("result", {}).get("textAnnotation", raw)
+        fixtures[path.stem.replace("_ocr_raw_", "", 1)] = ta
+    return fixtures
+
+
+class Fixture:
+    """Входные данные этапов для одного документа."""
+
+    def __init__(self, ta: dict):
+        self.ta = ta
+        # Тело ответа Vision без отступов — как приходит по сети
+        self.body = json.dumps(
+            {"result": {"textAnnotation": ta}}, ensure_ascii=False,
+        ).encode("utf-8")
+        self.full_text = ta.get("fullText", "")
+        self.entities = {
+            e.get("name", ""): e.get("text", "")
+            for e in ta.get("entities", [])
+        }
+        self.layout = LineLayout.from_text_annotation(ta)
+        # Промежуточные значения, которые этапы получают от предыдущих
+        doc = self.doc()
+        self.cert_last_six = sp._cert_last_six_digits(doc, self.entities)
+        self.pts = sp._extract_pts(doc, cert_last_six=self.cert_last_six)
+
+    def doc(self) -> "sp._LineTable":
+        """Новая таблица строк: ленивые поля не переживают вызов."""
+        return sp._LineTable(self.layout, self.full_text)
+
+
+# Этап: (подготовка без замера, замеряемый вызов). Подготовка строит
+# свежую таблицу строк, чтобы ленивые кэши _LineTable не «ускоряли»
+# повторные вызовы этапа
+STAGES = {
+    "decode_json": (
+        lambda fx: fx.body,
+        json.loads,
+    ),
+    "decode_vision": (
+        lambda fx: fx.body,
+        decode_response,
+    ),
+    "parse_sts": (
+        lambda fx: fx.ta,
+        sp.parse_sts,
+    ),
+    "parse_sts_vin": (
+        lambda fx: fx.ta,
+        lambda ta: sp.parse_sts(ta, fields=("vehicle_vin",)),
+    ),
+    "lines": (
+        lambda fx: fx.ta,
+        LineLayout.from_text_annotation,
+    ),
+    "line_table": (
+        lambda fx: fx,
+        lambda fx: sp._LineTable(fx.layout, fx.full_text),
+    ),
+    "cert_last_six": (
+        lambda fx: (fx.doc(), fx.entities),
+        lambda a: sp._cert_last_six_digits(*a),
+    ),
+    "vin": (
+        lambda fx: fx.doc(),
+        sp._extract_vin,
+    ),
+    "brand_model": (
+        lambda fx: fx.doc(),
+        sp._extract_brand_model,
+    ),
+    "year": (
+        lambda fx: fx.doc(),
+        sp._extract_year,
+    ),
+    "engine_power": (
+        lambda fx: fx.doc(),
+        sp._extract_engine_power,
+    ),
+    "pts": (
+        lambda fx: (fx.doc(), fx.cert_last_six),
+        lambda a: sp._extract_pts(a[0], cert_last_six=a[1]),
+    ),
+    "engine_volume": (
+        lambda fx: fx.doc(),
+        sp._extract_engine_displacement_liters,
+    ),
+    "certificate": (
+        lambda fx: (fx.doc(), fx.entities, fx.pts),
+        lambda a: sp._extract_certificate(a[0], a[1], pts_number=a[2]),
+    ),
+}
+
+
+def time_stage(
+    name: str,
+    fixtures: list[Fixture],
+    iterations: int,
+    warmup: int,
+    repeat: int = 3,
+) -> dict:
+    """
+    Замеряет один этап: каждый документ × iterations вызовов.
+
+    Как и timeit, делает repeat серий и берёт лучшую (по среднему):
+    медленные серии — это чаще соседние процессы, а не парсер.
+
+    Returns:
+        {"calls", "mean_us", "p50_us", "p99_us", "max_us"}.
+    """
+    prepare, call = STAGES[name]
+    for fx in fixtures:
+        for _ in range(warmup):
+            call(prepare(fx))
+    best: list[float] = []
+    for _ in range(max(repeat, 1)):
+        samples = _run_series(prepare, call, fixtures, iterations)
+        if not best or statistics.fmean(samples) < statistics.fmean(best):
+            best = samples
+    samples = sorted(best)
+    return {
+        "calls": len(samples),
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(percentile(samples, 50), 2),
+        "p99_us": round(percentile(samples, 99), 2),
+        "max_us": round(samples[-1], 2),
+    }
+
+
+def _run_series(prepare, call, fixtures, iterations) -> list[float]:
+    """Одна серия замеров с выключенным GC; время вызовов в мкс."""
+    samples: list[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            for fx in fixtures:
+                arg = prepare(fx)
+                t0 = time.perf_counter_ns()
+                call(arg)
+                samples.append((time.perf_counter_ns() - t0) / 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return samples
+
+
+def measure_allocations(name: str, fixtures: list[Fixture]) -> dict:
+    """
+    Пик памяти одного вызова этапа (tracemalloc), по худшему документу.
+
+    Замер отдельно от времени: tracemalloc замедляет код в разы.
+    """
+    prepare, call = STAGES[name]
+    peaks = []
+    tracemalloc.start()
+    try:
+        for fx in fixtures:
+            arg = prepare(fx)
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            call(arg)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_bytes": max(peaks),
+        "alloc_mean_bytes": int(statistics.fmean(peaks)),
+    }
+
+
+def compare(
+    current: dict,
+    baseline: dict,
+    tolerance: float,
+    min_delta_us: float,
+) -> list[str]:
+    """
+    Сравнивает p50 и p99 этапов с базовым прогоном.
+
+    p99 шумнее медианы, поэтому для него допуск вдвое больше.
+
+    Returns:
+        Описания регрессий (пустой список — всё в норме).
+    """
+    regressions = []
+    for name, stats in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        for key, allowed in (("p50_us", tolerance), ("p99_us", tolerance * 2)):
+            now, was = stats[key], base[key]
+            if now > was * (1 + allowed) and now - was > min_delta_us:
+                regressions.append(
+                    f"{name}.{key}: {was} → {now} мкс "
+                    f"(+{(now / was - 1) * 100 if was else 0:.0f}%)"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк парсера СТС")
+    parser.add_argument(
+        "--fixtures",
+        default="_ocr_raw_*.json",
+        help="Шаблон файлов OCR-ответов в scripts/",
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=200,
+        help="Прогонов каждого документа на этап",
+    )
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Серий замеров на этап, берётся лучшая",
+    )
+    parser.add_argument(
+        "--stage",
+        action="append",
+        choices=sorted(STAGES),
+        help="Только указанные этапы (можно повторять)",
+    )
+    parser.add_argument("--output", help="Записать JSON в файл")
+    parser.add_argument(
+        "--save-baseline",
+        metavar="PATH",
+        help="Сохранить результат как базовый прогон",
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="PATH",
+        help="Сравнить с базовым прогоном; код 1 при регрессии",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE,
+        help="Допустимое замедление, доля (по умолчанию 0.25)",
+    )
+    parser.add_argument(
+        "--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US,
+        help="Игнорировать замедление меньше стольких мкс",
+    )
+    args = parser.parse_args()
+
+    raw = load_fixtures(args.fixtures)
+    if not raw:
+        print(f"Нет файлов OCR-ответов: scripts/{args.fixtures}")
+        return 1
+    fixtures = [Fixture(ta) for ta in raw.values()]
+
+    stages = {}
+    for name in args.stage or list(STAGES):
+        stats = time_stage(
+            name, fixtures, args.iterations, args.warmup, args.repeat,
+        )
+        stats.update(measure_allocations(name, fixtures))
+        stages[name] = stats
+
+    result = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "fixtures": list(raw),
+        "iterations": args.iterations,
+        "stages": stages,
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(
+            result, baseline, args.tolerance, args.min_delta_us,
+        )
+        if regressions:
+            print("\nРегрессии относительно базового прогона:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("\nРегрессий нет", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+Проверка справочника марок (apps/website/ocr/data/).
+
+wmi.tsv должен быть отсортирован по WMI без повторов (иначе двоичный
+поиск по mmap находит не ту строку), версии wmi.tsv и vehicles.json
+должны совпадать. Запускать после каждой правки данных.
+
+Запуск:
+    python scripts/check_vehicle_data.py
+"""
+import io
+import sys
+from pathlib import Path
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(
+        sys.stdout.buffer, encoding="utf-8", errors="replace"
+    )
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from apps.website.ocr import refdata  # noqa: E402
+
+
+def main() -> int:
+    problems = refdata.check_data()
+    if problems:
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1
+    index = refdata.wmi_index()
+    print(
+        f"Справочник v{index.version}: WMI {len(index)}, "
+        f"марок {len(refdata.canonical_brands())}, "
+        f"написаний марок {len(refdata.brand_aliases())}, "
+        f"моделей {len(refdata.model_aliases())}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
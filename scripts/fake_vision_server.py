@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+"""
+Фейковый Yandex Vision OCR для нагрузочного тестирования без расхода квоты.
+
+Отвечает по контракту POST /ocr/v1/recognizeText сохранёнными ответами
+scripts/_ocr_raw_*.json: ответ выбирается по хэшу изображения (одно
+и то же фото → один и тот же ответ) или по кругу. Задержка, доля ошибок
+и зависаний настраиваются.
+
+Запуск:
+    python scripts/fake_vision_server.py --port 8089 \\
+        --latency lognormal:1.2:0.4 --error-rate 0.05 --timeout-rate 0.01
+
+Django направляется на него через .env:
+    YANDEX_VISION_OCR_ENDPOINT=http://127.0.0.1:8089/ocr/v1/recognizeText
+
+Задержка (--latency), секунды:
+    0.8                   — фиксированная
+    uniform:0.5:2         — равномерная от 0.5 до 2
+    lognormal:1.2:0.4     — логнормальная с медианой 1.2 и sigma 0.4
+    exp:1.0               — экспоненциальная со средним 1.0
+"""
+import argparse
+import base64
+import binascii
+import hashlib
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent
+
+OCR_PATH = "/ocr/v1/recognizeText"
+
+
+def parse_latency(spec: str):
+    """
+    Разбирает описание распределения задержки.
+
+    Args:
+        spec: "0.8", "uniform:a:b", "lognormal:median:sigma", "exp:mean".
+
+    Returns:
+        Функция без аргументов, возвращающая задержку в секундах.
+    """
+    kind, _, rest = spec.partition(":")
+    args = [float(x) for x in rest.split(":")] if rest else []
+    if not rest:
+        fixed = float(kind)
+        return lambda: fixed
+    if kind == "uniform" and len(args) == 2:
+        return lambda: random.uniform(args[0], args[1])
+    if kind == "lognormal" and len(args) == 2:
+        mu = math.log(args[0])
+        return lambda: random.lognormvariate(mu, args[1])
+    if kind == "exp" and len(args) == 1:
+        return lambda: random.expovariate(1.0 / args[0])
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+
+def load_responses(pattern: str) -> list[bytes]:
+    """Загружает сохранённые ответы Vision (JSON) в порядке имён файлов."""
+    responses = []
+    for path in sorted(_root.glob(pattern)):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if "result" not in data:
+            data = {"result": {"textAnnotation": data}}
+        responses.append(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+    return responses
+
+
+class FakeVision:
+    """Состояние сервера: ответы, политика выбора, сбои, счётчики."""
+
+    def __init__(
+        self,
+        responses: list[bytes],
+        select: str,
+        latency,
+        error_rate: float,
+        error_statuses: list[int],
+        timeout_rate: float,
+        hang: float,
+    ):
+        self.responses = responses
+        self.select = select
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self._round_robin = itertools.cycle(range(len(responses)))
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "ok": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "bad_requests": 0,
+        }
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def pick(self, content: bytes) -> bytes:
+        """Выбирает ответ по хэшу изображения или по кругу."""
+        if self.select == "hash":
+            digest = hashlib.sha256(content).digest()
+            index = int.from_bytes(digest[:8], "big") % len(self.responses)
+        else:
+            with self._lock:
+                index = next(self._round_robin)
+        return self.responses[index]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeVision
+
+    def do_POST(self):
+        fake = self.fake
+        fake.count("requests")
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if self.path.split("?")[0] != OCR_PATH:
+            return self._reply(404, {"code": 5, "message": "Not found"})
+        if not self.headers.get("Authorization"):
+            fake.count("bad_requests")
+            return self._reply(401, {"code": 16, "message": "Unauthenticated"})
+        try:
+            payload = json.loads(body)
+            content = base64.b64decode(payload["content"], validate=True)
+        except (ValueError, KeyError, TypeError, binascii.Error) as exc:
+            fake.count("bad_requests")
+            return self._reply(400, {"code": 3, "message": str(exc)})
+
+        roll = random.random()
+        if roll < fake.timeout_rate:
+            # Зависание: клиент должен сработать по read timeout
+            fake.count("timeouts")
+            time.sleep(fake.hang)
+            self.close_connection = True
+            return None
+        time.sleep(max(fake.latency(), 0.0))
+        if roll < fake.timeout_rate + fake.error_rate:
+            fake.count("errors")
+            status = random.choice(fake.error_statuses)
+            return self._reply(status, {"code": 14, "message": "Unavailable"})
+        fake.count("ok")
+        return self._reply_raw(200, fake.pick(content))
+
+    def _reply(self, status: int, data: dict) -> None:
+        self._reply_raw(status, json.dumps(data).encode("utf-8"))
+
+    def _reply_raw(self, status: int, raw: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Фейковый Yandex Vision OCR")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument(
+        "--responses",
+        default="_ocr_raw_*.json",
+        help="Шаблон файлов ответов в scripts/",
+    )
+    parser.add_argument(
+        "--select",
+        choices=("hash", "round-robin"),
+        default="hash",
+        help="Выбор ответа: по хэшу изображения или по кругу",
+    )
+    parser.add_argument(
+        "--latency",
+        default="0",
+        help="Задержка ответа, сек (см. описание модуля)",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Доля ответов с ошибкой (0..1)",
+    )
+    parser.add_argument(
+        "--error-status",
+        default="500,503",
+        help="HTTP-статусы ошибок через запятую (например 429,500,503)",
+    )
+    parser.add_argument(
+        "--timeout-rate",
+        type=float,
+        default=0.0,
+        help="Доля запросов, на которые сервер не отвечает (0..1)",
+    )
+    parser.add_argument(
+        "--hang",
+        type=float,
+        default=60.0,
+        help="Сколько секунд «висит» запрос при таймауте",
+    )
+    args = parser.parse_args()
+
+    responses = load_responses(args.responses)
+    if not responses:
+        print(f"Нет файлов ответов: scripts/{args.responses}")
+        return 1
+
+    Handler.fake = FakeVision(
+        responses=responses,
+        select=args.select,
+        latency=parse_latency(args.latency),
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_status.split(",")],
+        timeout_rate=args.timeout_rate,
+        hang=args.hang,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(
+        f"Fake Vision OCR: http://{args.host}:{args.port}{OCR_PATH} "
+        f"({len(responses)} ответов, выбор: {args.select})"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("\n" + json.dumps(Handler.fake.counters, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
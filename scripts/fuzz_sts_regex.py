@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""
+Фазз регулярных выражений парсера СТС на худшее время работы.
+
+Каждое скомпилированное выражение sts_parser (_*_RE) и тяжёлые этапы
+разбора прогоняются на «враждебном» тексте: длинные повторы ключевых слов
+(«экологическ», «паспорт», «кузов (»), цифр, пробелов и переводов строк
+в разных сочетаниях. Для каждого выражения печатается худшее время на
+самом длинном входе и показатель роста: ~1 — линейно, ~2 — квадратично
+(бэктрекинг), и выход с кодом 1, если что-то растёт быстрее линейного
+или дольше --limit-ms.
+
+Запуск:
+    python scripts/fuzz_sts_regex.py
+    python scripts/fuzz_sts_regex.py --sizes 2000,4000,8000 --limit-ms 50
+"""
+import argparse
+import io
+import itertools
+import json
+import math
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(
+        sys.stdout.buffer, encoding="utf-8", errors="replace"
+    )
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from apps.website.ocr import sts_parser as sp  # noqa: E402
+
+# Кирпичики враждебного текста: фрагменты подписей и значений, вокруг
+# которых построены выражения парсера
+ATOMS = (
+    "экологическ", "Экологический класс 123456 ", "паспорт", "Паспорт ТС",
+    "кузов (", "(", "марка ", "год вып", "ифика", "№", "—", "тДЦ",
+    "9 9\n", "12\n", "123456", "77", "1", "12 34 ", "1.", "77/", " / ",
+    "см", "л ", "A", "AB", "Я", " ", "\n", " \n", "\n\n ",
+)
+
+# Выражения, которые парсер применяет только якорно (pattern.match
+# с заданной позиции): их стоимость — одна попытка, а не поиск по тексту
+ANCHORED = frozenset({"_ECO_ORDER_RE"})
+
+# Показатель роста, выше которого выражение считается нелинейным
+DEFAULT_MAX_EXPONENT = 1.5
+
+
+def adversarial_texts(size: int, rng: random.Random) -> dict[str, str]:
+    """
+    Семейства враждебных строк длины ~size.
+
+    Returns:
+        {название семейства: текст}.
+    """
+    texts = {}
+    for atom in ATOMS:
+        texts[f"repeat {atom!r}"] = (atom * (size // len(atom) + 1))[:size]
+    for a, b in itertools.combinations(ATOMS, 2):
+        pair = a + b
+        texts[f"repeat {pair!r}"] = (pair * (size // len(pair) + 1))[:size]
+    # Случайная смесь: ловит сочетания, которых нет среди пар
+    for i in range(8):
+        parts = []
+        while sum(map(len, parts)) < size:
+            parts.append(rng.choice(ATOMS))
+        texts[f"mix #{i}"] = "".join(parts)[:size]
+    return texts
+
+
+def _annotation(text: str) -> dict:
+    """textAnnotation без координат: строки текста по блокам."""
+    return {
+        "fullText": text,
+        "blocks": [
+            {"lines": [{"text": line}]} for line in text.split("\n")
+        ],
+    }
+
+
+def targets() -> dict:
+    """Цели фазза: выражения модуля и этапы-фолбэки целиком."""
+    found = {}
+    for name, value in sorted(vars(sp).items()):
+        if not (name.endswith("_RE") and isinstance(value, re.Pattern)):
+            continue
+        if name in ANCHORED:
+            found[name] = lambda text, p=value: p.match(text)
+        else:
+            found[name] = lambda text, p=value: list(p.finditer(text))
+    found["_try_pts_reconstruct_from_eco_glitch"] = (
+        lambda text: sp._try_pts_reconstruct_from_eco_glitch(text, "")
+    )
+    found["_extract_broken_sts_certificate_tail"] = (
+        lambda text: sp._extract_broken_sts_certificate_tail(
+            text.splitlines(),
+        )
+    )
+    found["_clean_dashes"] = sp._clean_dashes
+    found["parse_sts"] = lambda text: sp.parse_sts(_annotation(text))
+    return found
+
+
+def _time_call(func, text: str, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def fuzz(sizes: list[int], seed: int, repeat: int, only: list[str]) -> dict:
+    """
+    Худшее время каждой цели по семействам входов и размерам.
+
+    Returns:
+        {цель: {"worst_family", "worst_ms", "exponent", "by_size_ms"}}.
+    """
+    rng = random.Random(seed)
+    corpora = {size: adversarial_texts(size, rng) for size in sizes}
+    report = {}
+    for name, func in targets().items():
+        if only and name not in only:
+            continue
+        # Худшее семейство ищем на самом длинном входе, рост — по нему же
+        biggest = corpora[sizes[-1]]
+        worst_family, worst = max(
+            (
+                (family, _time_call(func, text, 1))
+                for family, text in biggest.items()
+            ),
+            key=lambda item: item[1],
+        )
+        by_size = [
+            _time_call(func, corpora[size][worst_family], repeat)
+            for size in sizes
+        ]
+        exponent = 0.0
+        if by_size[0] > 0 and sizes[-1] > sizes[0]:
+            exponent = math.log(by_size[-1] / by_size[0]) / math.log(
+                sizes[-1] / sizes[0],
+            )
+        report[name] = {
+            "worst_family": worst_family,
+            "worst_ms": round(by_size[-1] * 1000, 3),
+            "exponent": round(exponent, 2),
+            "by_size_ms": {
+                str(size): round(t * 1000, 3) for size, t in zip(sizes, by_size)
+            },
+        }
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Фазз регулярок парсера СТС на худшее время",
+    )
+    parser.add_argument(
+        "--sizes", default="1000,4000,16000",
+        help="Длины враждебного текста через запятую",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Повторов замера (берётся лучший)",
+    )
+    parser.add_argument(
+        "--target",
+        action="append",
+        help="Только указанные цели (имя выражения или функции)",
+    )
+    parser.add_argument(
+        "--limit-ms", type=float, default=0.0,
+        help="Предел худшего времени на самом длинном входе, 0 — без него",
+    )
+    parser.add_argument(
+        "--max-exponent", type=float, default=DEFAULT_MAX_EXPONENT,
+        help="Предел показателя роста (1 — линейно)",
+    )
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    report = fuzz(sizes, args.seed, args.repeat, args.target or [])
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    failed = [
+        name for name, stats in report.items()
+        if stats["exponent"] > args.max_exponent
+        or (args.limit_ms and stats["worst_ms"] > args.limit_ms)
+    ]
+    if failed:
+        print("\nНелинейный рост или превышение предела:", file=sys.stderr)
+        for name in failed:
+            stats = report[name]
+            print(
+                f"  {name}: {stats['worst_ms']} мс, рост ^{stats['exponent']}"
+                f" на {stats['worst_family']}",
+                file=sys.stderr,
+            )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Генератор синтетических OCR-ответов СТС (JSONL) и проверка парсера на них.
+
+Каждая строка JSONL — {"index", "layout", "noise", "expected",
+"textAnnotation"}; формат textAnnotation как у Yandex Vision.
+Подробности — apps/website/ocr/synthetic.py.
+
+Запуск:
+    python scripts/gen_synthetic_sts.py --count 100000 --seed 1 -o sts.jsonl
+    python scripts/gen_synthetic_sts.py --count 1000000 | gzip > sts.jsonl.gz
+
+Точность и скорость parse_sts на потоке (без записи файла):
+    python scripts/gen_synthetic_sts.py --count 20000 --check
+    python scripts/gen_synthetic_sts.py --input sts.jsonl --check
+
+Чистые документы (--noise 0) разбираются точно все (exact_share 1.0):
+любая ошибка в «clean» — расхождение генератора и парсера, а не шум.
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(
+        sys.stdout.buffer, encoding="utf-8", errors="replace"
+    )
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root))
+
+from apps.website.ocr.sts_parser import parse_sts  # noqa: E402
+from apps.website.ocr.synthetic import (  # noqa: E402
+    DEFAULT_NOISE,
+    LAYOUTS,
+    iter_sts,
+    read_jsonl,
+    write_jsonl,
+)
+
+
+def check(docs, show: int) -> int:
+    """
+    Прогоняет parse_sts по документам и печатает точность по полям.
+
+    Returns:
+        Число документов, где хотя бы одно поле не совпало с эталоном.
+    """
+    total = 0
+    failed_docs = 0
+    field_errors: Counter = Counter()
+    noise_errors: Counter = Counter()
+    examples = []
+    parse_s = 0.0
+    for doc in docs:
+        t0 = time.perf_counter()
+        result = parse_sts(doc.annotation)
+        parse_s += time.perf_counter() - t0
+        total += 1
+        wrong = [
+            field for field, value in doc.expected.items()
+            if result.get(field, "") != value
+        ]
+        if not wrong:
+            continue
+        failed_docs += 1
+        for field in wrong:
+            field_errors[field] += 1
+            for kind in doc.noise or ["clean"]:
+                noise_errors[kind] += 1
+            if len(examples) < show:
+                examples.append({
+                    "index": doc.index,
+                    "layout": doc.layout,
+                    "noise": doc.noise,
+                    "field": field,
+                    "expected": doc.expected[field],
+                    "got": result.get(field, ""),
+                })
+
+    report = {
+        "documents": total,
+        "exact": total - failed_docs,
+        "exact_share": round((total - failed_docs) / total, 4) if total else 0,
+        "field_errors": dict(field_errors.most_common()),
+        "errors_by_noise": dict(noise_errors.most_common()),
+        "parse_docs_per_s": round(total / parse_s, 1) if parse_s else 0,
+        "examples": examples,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return failed_docs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Синтетические OCR-ответы СТС",
+    )
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", default="0")
+    parser.add_argument(
+        "--start", type=int, default=0,
+        help="Номер первого документа (продолжить поток)",
+    )
+    parser.add_argument(
+        "--noise", type=float, default=DEFAULT_NOISE,
+        help="Вероятность каждого вида искажений, 0 — чистые документы",
+    )
+    parser.add_argument(
+        "--layout",
+        action="append",
+        choices=LAYOUTS,
+        help="Только указанные раскладки (можно повторять)",
+    )
+    parser.add_argument(
+        "--no-words",
+        action="store_true",
+        help="Без слов в строках: файл в несколько раз меньше",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="JSONL-файл (по умолчанию stdout)",
+    )
+    parser.add_argument(
+        "--input",
+        help="Читать документы из JSONL вместо генерации (для --check)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Не писать JSONL, а проверить parse_sts по эталону",
+    )
+    parser.add_argument(
+        "--show", type=int, default=10,
+        help="Сколько примеров ошибок вывести при --check",
+    )
+    args = parser.parse_args()
+
+    if args.input:
+        source = open(args.input, encoding="utf-8")
+        docs = read_jsonl(source)
+    else:
+        source = None
+        docs = iter_sts(
+            args.count,
+            seed=args.seed,
+            noise=args.noise,
+            layouts=args.layout or LAYOUTS,
+            start=args.start,
+            words=not args.no_words,
+        )
+    try:
+        if args.check:
+            check(docs, args.show)
+            return 0
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                written = write_jsonl(docs, out)
+        else:
+            written = write_jsonl(docs, sys.stdout)
+        print(f"Документов: {written}", file=sys.stderr)
+    finally:
+        if source is not None:
+            source.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
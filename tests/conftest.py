@@ -0,0 +1,44 @@
+"""
+Общие фикстуры тестов OCR.
+"""
+import pytest
+
+
+class FakeClock:
+    """Подменяет модуль time: время идёт только через sleep()."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+        self.sleeps: list[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def ocr_cache(settings):
+    """Кэш «ocr» в памяти процесса, пустой для каждого теста."""
+    from django.core.cache import caches
+
+    settings.CACHES = {
+        **settings.CACHES,
+        "ocr": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ocr-tests",
+        },
+    }
+    caches["ocr"].clear()
+    yield caches["ocr"]
+    caches["ocr"].clear()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
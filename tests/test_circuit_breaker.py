@@ -0,0 +1,154 @@
+"""
+Тесты circuit breaker и его учёта в ResilientVisionCaller
+(ocr/resilience.py).
+"""
+import pytest
+
+from apps.website.ocr import resilience
+from apps.website.ocr.errors import VisionError
+from apps.website.ocr.resilience import (
+    BREAKER_OPEN_MESSAGE,
+    CircuitBreaker,
+    ResilientVisionCaller,
+)
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = {"failure_rate": 0.5, "min_calls": 4, "window": 60,
+               "cooldown": 30}
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        breaker.record(False)
+    assert breaker.is_open()
+
+
+def test_opens_at_failure_rate(ocr_cache):
+    breaker = make_breaker()
+    for success in (True, True, False):
+        breaker.record(success)
+        assert not breaker.is_open()
+    breaker.record(False)
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+
+
+def test_needs_min_calls_in_window(ocr_cache):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(False)
+    assert not breaker.is_open()
+    assert breaker.allow_request()
+
+
+def test_previous_window_is_not_counted(ocr_cache, clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 60
+    breaker.record(False)
+    assert not breaker.is_open()
+
+
+def test_shared_between_instances(ocr_cache):
+    open_breaker(make_breaker())
+    assert not make_breaker().allow_request()
+
+
+def test_calls_started_before_opening_are_ignored(ocr_cache, clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    breaker.record(True)
+    clock.now += 29
+    assert breaker.is_open()
+
+
+def test_half_open_lets_one_probe_through(ocr_cache, clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+    assert not breaker.is_open()
+    assert breaker.allow_request()
+    # Пока проба не вернулась, остальные воркеры отклоняются
+    assert not breaker.allow_request()
+    assert not make_breaker().allow_request()
+
+
+def test_successful_probe_closes(ocr_cache, clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record(True)
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    # Счётчики окна начинаются заново
+    for _ in range(3):
+        breaker.record(False)
+    assert not breaker.is_open()
+
+
+def test_failed_probe_reopens(ocr_cache, clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record(False)
+    assert breaker.is_open()
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+
+
+class FlakyClient:
+    """Клиент Vision: первые failures попыток каждого вызова — HTTP 503."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.attempts = 0
+
+    def request(self, image, api_key, folder_id, mime_type):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise VisionError("HTTP 503", status=503, transient=True)
+        self.attempts = 0
+        return {"fullText": "ok"}
+
+
+def test_retried_errors_do_not_trip_breaker(ocr_cache):
+    breaker = make_breaker(min_calls=2)
+    caller = ResilientVisionCaller(
+        FlakyClient(failures=2), breaker=breaker, max_retries=2,
+    )
+    for _ in range(5):
+        assert caller.recognize(b"img", "key", "folder") == (
+            {"fullText": "ok"}, None,
+        )
+    assert not breaker.is_open()
+    assert caller.stats()["retries"] == 10
+
+
+def test_exhausted_retries_count_once(ocr_cache):
+    breaker = make_breaker(min_calls=2)
+    caller = ResilientVisionCaller(
+        FlakyClient(failures=100), breaker=breaker, max_retries=2,
+    )
+    ta, error = caller.recognize(b"img", "key", "folder")
+    assert ta is None and error == "HTTP 503"
+    # Три неудачные попытки — одна неудача вызова, ниже min_calls
+    assert not breaker.is_open()
+    caller.recognize(b"img", "key", "folder")
+    assert breaker.is_open()
+    assert caller.recognize(b"img", "key", "folder") == (
+        None, BREAKER_OPEN_MESSAGE,
+    )
@@ -0,0 +1,93 @@
+"""
+Тесты геометрии строк (ocr/layout.py) и поиска значений рядом с подписью.
+"""
+from apps.website.ocr import sts_parser
+from apps.website.ocr.layout import LineLayout
+
+
+def _line(text, x0, y0, x1, y1):
+    return {
+        "text": text,
+        "boundingBox": {"vertices": [
+            {"x": str(x0), "y": str(y0)},
+            {"x": str(x0), "y": str(y1)},
+            {"x": str(x1), "y": str(y1)},
+            {"x": str(x1), "y": str(y0)},
+        ]},
+    }
+
+
+def _layout(*lines, width=720):
+    return LineLayout.from_text_annotation({
+        "width": str(width),
+        "blocks": [{"lines": [line]} for line in lines],
+    })
+
+
+def test_lines_sorted_by_y_with_boxes():
+    layout = _layout(
+        _line("Год выпуска ТС", 60, 200, 300, 220),
+        _line("Марка, модель", 60, 100, 280, 120),
+        _line("2014", 330, 201, 390, 219),
+    )
+    assert layout.texts == ["Марка, модель", "Год выпуска ТС", "2014"]
+    assert layout.box(2) == (330, 201, 60, 18)
+
+
+def test_value_right_of_label_found_even_if_listed_first():
+    # OCR отдал значение раньше подписи: середина по Y та же
+    layout = _layout(
+        _line("2014", 450, 660, 525, 682),
+        _line("Год выпуска ТС", 209, 660, 439, 682),
+        _line("Шасси (рама) № ОТСУТСТВУЕТ", 210, 696, 695, 719),
+    )
+    label = layout.texts.index("Год выпуска ТС")
+    assert [layout.texts[j] for j in layout.right_of(label)] == ["2014"]
+
+
+def test_below_skips_other_column_and_counts_rows():
+    layout = _layout(
+        _line("Кузов (кабина, прицеп) №", 35, 670, 465, 690),
+        _line("1578", 560, 705, 640, 725),
+        _line("XTA217230E0256412", 85, 707, 450, 728),
+        _line("Цвет ЧЕРНЫЙ", 35, 740, 275, 770),
+        _line("Мощность двигателя", 38, 780, 520, 810),
+    )
+    texts = [layout.texts[j] for j in layout.below(0, 2)]
+    assert texts == ["XTA217230E0256412", "Цвет ЧЕРНЫЙ"]
+
+
+def test_without_boxes_rows_are_reading_order():
+    layout = LineLayout.from_text_annotation({"blocks": [{"lines": [
+        {"text": "Паспорт ТС"}, {"text": "77"}, {"text": "УР"},
+        {"text": "958764"},
+    ]}]})
+    assert not layout.has_geometry
+    assert list(layout.right_of(0)) == []
+    assert list(layout.near(0, 2)) == [1, 2]
+
+
+def test_max_lines_truncates():
+    layout = LineLayout.from_text_annotation(
+        {"blocks": [{"lines": [{"text": str(i)} for i in range(5)]}]},
+        max_lines=3,
+    )
+    assert layout.truncated
+    assert len(layout) == 3
+
+
+def test_pts_series_and_number_to_the_right_of_label():
+    ta = {
+        "width": "720",
+        "fullText": "Паспорт ТС серия\n78УВ\nNo\n536168\n",
+        "blocks": [{"lines": [
+            _line("Паспорт ТС серия", 74, 867, 364, 884),
+            _line("78УВ", 378, 867, 455, 884),
+            _line("No", 445, 867, 481, 884),
+            _line("536168", 505, 867, 609, 884),
+        ]}],
+    }
+    doc = sts_parser._LineTable(
+        LineLayout.from_text_annotation(ta), ta["fullText"],
+    )
+    assert sts_parser._extract_pts(doc) == "78УВ536168"
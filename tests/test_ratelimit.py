@@ -0,0 +1,85 @@
+"""
+Тесты общего ведра токенов (ocr/ratelimit.py).
+"""
+import pytest
+
+from apps.website.ocr import ratelimit
+from apps.website.ocr.errors import VisionBusyError
+from apps.website.ocr.ratelimit import TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+def test_burst_admitted_then_rejected(ocr_cache):
+    bucket = TokenBucket(rate=2, burst=2)
+    assert bucket.acquire(0) == 0
+    assert bucket.acquire(0) == 0
+    with pytest.raises(VisionBusyError) as exc_info:
+        bucket.acquire(0)
+    # Токена нет, следующий — через 0.5 с, Retry-After округляется вверх
+    assert exc_info.value.retry_after == 1
+    stats = bucket.stats()
+    assert (stats["admitted"], stats["queued"], stats["rejected"]) == (2, 0, 1)
+    assert stats["total_admitted"] == 2
+    assert stats["total_rejected"] == 1
+
+
+def test_waiters_reserve_tokens_in_arrival_order(ocr_cache):
+    bucket = TokenBucket(rate=1, burst=1)
+    assert bucket._reserve(5) == 0
+    # Ведро уходит в минус: каждый следующий ждёт на токен дольше
+    assert bucket._reserve(5) == pytest.approx(1.0)
+    assert bucket._reserve(5) == pytest.approx(2.0)
+    with pytest.raises(VisionBusyError) as exc_info:
+        bucket.acquire(2.5)
+    assert exc_info.value.retry_after == 3
+
+
+def test_queued_request_sleeps_for_its_slot(ocr_cache, clock):
+    bucket = TokenBucket(rate=4, burst=1)
+    bucket.acquire(0)
+    assert bucket.acquire(1) == pytest.approx(0.25)
+    assert clock.sleeps == [pytest.approx(0.25)]
+    assert bucket.stats()["queued"] == 1
+
+
+def test_rejected_request_takes_no_token(ocr_cache, clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.acquire(0)
+    with pytest.raises(VisionBusyError):
+        bucket.acquire(0.5)
+    clock.now += 1
+    assert bucket.acquire(0) == 0
+
+
+def test_refill_is_capped_at_burst(ocr_cache, clock):
+    bucket = TokenBucket(rate=10, burst=3)
+    bucket.acquire(0)
+    clock.now += 3600
+    for _ in range(3):
+        assert bucket.acquire(0) == 0
+    with pytest.raises(VisionBusyError):
+        bucket.acquire(0)
+
+
+def test_workers_share_one_bucket(ocr_cache):
+    # Два экземпляра — как два воркера gunicorn с общим кэшем
+    first = TokenBucket(rate=1, burst=1)
+    second = TokenBucket(rate=1, burst=1)
+    first.acquire(0)
+    with pytest.raises(VisionBusyError):
+        second.acquire(0)
+    assert second.stats()["total_admitted"] == 1
+
+
+def test_without_shared_cache_bucket_is_per_process():
+    first = TokenBucket(rate=1, burst=1, alias="missing")
+    second = TokenBucket(rate=1, burst=1, alias="missing")
+    first.acquire(0)
+    assert second.acquire(0) == 0
+    with pytest.raises(VisionBusyError):
+        first.acquire(0)